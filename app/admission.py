@@ -0,0 +1,164 @@
+"""Admission control for the retrieval and LLM stages: bounded concurrency, bounded fair queue."""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+from app.config import Config
+
+logger = logging.getLogger(__name__)
+
+REJECT_QUEUE_FULL = "queue_full"
+REJECT_DEADLINE = "queue_deadline"
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request is shed instead of queued; ``reason`` says why."""
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class _Waiter:
+    __slots__ = ("future", "queued_at")
+
+    def __init__(self, future: asyncio.Future):
+        self.future = future
+        self.queued_at = time.monotonic()
+
+
+class AdmissionController:
+    """Let at most ``max_concurrent`` requests run; queue a bounded number more.
+
+    Waiting requests are kept in one FIFO queue per user, and a freed slot
+    goes to the users in turn, so one user sending many messages cannot
+    starve the others. A request is rejected immediately when the queue
+    already holds ``max_queue`` requests, or when its expected wait (its
+    place in the rotation times the recent average service time) exceeds
+    ``max_wait`` seconds; one still waiting after ``max_wait`` is rejected
+    then.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = Config.ADMISSION_MAX_CONCURRENT,
+        max_queue: int = Config.ADMISSION_QUEUE_MAX,
+        max_wait: float = Config.ADMISSION_MAX_WAIT,
+    ):
+        """Initialize with all slots free."""
+        self.max_concurrent = max(max_concurrent, 1)
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.active = 0
+        self._queues: OrderedDict[int, deque[_Waiter]] = OrderedDict()
+        self._waiting = 0
+        self._service_time: Optional[float] = None  # moving average, seconds
+
+        self.admitted = 0
+        self.rejected = {REJECT_QUEUE_FULL: 0, REJECT_DEADLINE: 0}
+        self.max_queue_depth = 0
+        self.total_wait = 0.0
+        self.max_wait_seen = 0.0
+
+    @asynccontextmanager
+    async def slot(self, user_id: int) -> AsyncIterator[None]:
+        """Hold a slot for the duration of the block (raises AdmissionRejected)."""
+        await self._acquire(user_id)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            elapsed = time.monotonic() - started
+            self._service_time = elapsed if self._service_time is None else 0.8 * self._service_time + 0.2 * elapsed
+            self._release()
+
+    def expected_wait(self, user_id: int) -> float:
+        """Estimated seconds a new request from user_id would wait (0 until a request completes)."""
+        if self._service_time is None:
+            return 0.0
+        # Each user ahead in the rotation gets at most as many turns as this user's place in line
+        place = len(self._queues.get(user_id, ())) + 1
+        ahead = sum(min(len(queue), place) for uid, queue in self._queues.items() if uid != user_id) + place
+        return ahead / self.max_concurrent * self._service_time
+
+    async def _acquire(self, user_id: int) -> None:
+        if self.active < self.max_concurrent and not self._waiting:
+            self.active += 1
+            self._admit(0.0)
+            return
+        if self._waiting >= self.max_queue:
+            self._reject(REJECT_QUEUE_FULL, user_id)
+        if self.expected_wait(user_id) > self.max_wait:
+            self._reject(REJECT_DEADLINE, user_id)
+
+        waiter = _Waiter(asyncio.get_running_loop().create_future())
+        self._queues.setdefault(user_id, deque()).append(waiter)
+        self._waiting += 1
+        self.max_queue_depth = max(self.max_queue_depth, self._waiting)
+        try:
+            await asyncio.wait_for(waiter.future, self.max_wait)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # Granted a slot just as we gave up; pass it on
+                self._release()
+            else:
+                self._forget(user_id, waiter)
+            if isinstance(e, asyncio.TimeoutError):
+                self._reject(REJECT_DEADLINE, user_id)
+            raise
+
+    def _release(self) -> None:
+        """Free a slot and hand it to the next user in the rotation."""
+        self.active -= 1
+        while self._queues:
+            user_id, queue = self._queues.popitem(last=False)
+            waiter = queue.popleft()
+            if queue:
+                self._queues[user_id] = queue  # back of the rotation
+            self._waiting -= 1
+            if waiter.future.done():
+                continue  # timed out or cancelled, not yet cleaned up by its owner
+            self.active += 1
+            self._admit(time.monotonic() - waiter.queued_at)
+            waiter.future.set_result(None)
+            return
+
+    def _forget(self, user_id: int, waiter: _Waiter) -> None:
+        """Remove a waiter that gave up."""
+        queue = self._queues.get(user_id)
+        if queue is not None and waiter in queue:
+            queue.remove(waiter)
+            self._waiting -= 1
+            if not queue:
+                del self._queues[user_id]
+
+    def _admit(self, waited: float) -> None:
+        self.admitted += 1
+        self.total_wait += waited
+        self.max_wait_seen = max(self.max_wait_seen, waited)
+
+    def _reject(self, reason: str, user_id: int) -> None:
+        self.rejected[reason] += 1
+        logger.warning(
+            f"Shedding request from user {user_id} ({reason}): "
+            f"{self.active} running, {self._waiting} queued"
+        )
+        raise AdmissionRejected(reason)
+
+    def stats(self) -> dict:
+        """Queue depth, wait time and rejection metrics."""
+        return {
+            "active": self.active,
+            "queue_depth": self._waiting,
+            "max_queue_depth": self.max_queue_depth,
+            "admitted": self.admitted,
+            "rejected_queue_full": self.rejected[REJECT_QUEUE_FULL],
+            "rejected_deadline": self.rejected[REJECT_DEADLINE],
+            "avg_wait_ms": round(self.total_wait / self.admitted * 1000, 1) if self.admitted else 0.0,
+            "max_wait_ms": round(self.max_wait_seen * 1000, 1),
+            "avg_service_s": round(self._service_time or 0.0, 2),
+        }
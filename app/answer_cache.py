@@ -0,0 +1,121 @@
+"""Semantic cache of sanitized LLM answers for near-duplicate questions."""
+
+import logging
+import math
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from app.config import Config
+
+logger = logging.getLogger(__name__)
+
+
+def _norm(vector: list[float]) -> float:
+    return math.sqrt(sum(x * x for x in vector))
+
+
+class _Entry:
+    """A cached answer and the question embedding it was produced for."""
+
+    __slots__ = ("embedding", "norm", "answer", "created_at")
+
+    def __init__(self, embedding: list[float], answer: str):
+        self.embedding = embedding
+        self.norm = _norm(embedding)
+        self.answer = answer
+        self.created_at = time.time()
+
+
+class SemanticAnswerCache:
+    """Reuse answers for questions that are close in embedding space.
+
+    An answer is served from the cache only when the new question's embedding
+    is within ``max_distance`` cosine distance of a cached question AND the
+    retrieval returned the same chunk IDs in the same order, so the LLM
+    would have seen identical context. Entries are tagged with the knowledge
+    base version and all of them are dropped once the version changes.
+    """
+
+    def __init__(
+        self,
+        max_distance: float = Config.ANSWER_CACHE_MAX_DISTANCE,
+        max_entries: int = Config.ANSWER_CACHE_MAX_ENTRIES,
+        ttl: float = Config.ANSWER_CACHE_TTL_SECONDS,
+    ):
+        """Initialize the cache."""
+        self.max_distance = max_distance
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._kb_version: Optional[int] = None
+        # Keyed by the retrieved chunk IDs; most recently used groups last
+        self._groups: OrderedDict[tuple[str, ...], list[_Entry]] = OrderedDict()
+        self._size = 0
+
+        self.hits = 0
+        self.misses = 0
+
+    def _check_version(self, kb_version: int) -> bool:
+        """Drop everything if the knowledge base changed; False if ``kb_version`` is already outdated."""
+        if self._kb_version is not None and kb_version < self._kb_version:
+            return False
+        if kb_version != self._kb_version:
+            if self._size:
+                logger.info(f"Knowledge base version changed to {kb_version}, dropping {self._size} cached answers")
+            self._groups.clear()
+            self._size = 0
+            self._kb_version = kb_version
+        return True
+
+    def lookup(self, embedding: list[float], chunk_ids: list[str], kb_version: int) -> Optional[str]:
+        """Return a cached answer for a near-identical question, or None."""
+        key = tuple(chunk_ids)
+        entries = self._groups.get(key) if self._check_version(kb_version) else None
+        if not entries:
+            self.misses += 1
+            return None
+
+        now = time.time()
+        norm = _norm(embedding)
+        best: Optional[_Entry] = None
+        best_distance = self.max_distance
+        for entry in entries:
+            if now - entry.created_at > self.ttl or not norm or not entry.norm:
+                continue
+            dot = sum(a * b for a, b in zip(embedding, entry.embedding))
+            distance = 1 - dot / (norm * entry.norm)
+            if distance <= best_distance:
+                best, best_distance = entry, distance
+
+        if best is None:
+            self.misses += 1
+            return None
+
+        self._groups.move_to_end(key)
+        self.hits += 1
+        logger.debug(f"Answer cache hit (distance={best_distance:.4f})")
+        return best.answer
+
+    def store(self, embedding: list[float], chunk_ids: list[str], kb_version: int, answer: str) -> None:
+        """Cache a sanitized answer retrieved at ``kb_version`` (dropped if the knowledge base changed since)."""
+        if not self._check_version(kb_version):
+            return
+        key = tuple(chunk_ids)
+        self._groups.setdefault(key, []).append(_Entry(embedding, answer))
+        self._groups.move_to_end(key)
+        self._size += 1
+
+        # Evict least recently used groups
+        while self._size > self.max_entries and self._groups:
+            _, evicted = self._groups.popitem(last=False)
+            self._size -= len(evicted)
+
+    def stats(self) -> dict:
+        """Hit/miss counters."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "entries": self._size,
+        }
@@ -0,0 +1,305 @@
+"""Token-aware, structure-aware text chunking.
+
+Kept free of vector store and network imports so it can run in ingestion
+worker processes. Token counts come from ``tiktoken``; the ``tokens``
+chunker refuses to run without it, while reports fall back to a
+word/punctuation approximation.
+"""
+
+import itertools
+import logging
+import os
+import re
+from functools import lru_cache
+from typing import Callable, Iterable, Optional
+
+from app.config import Config
+
+logger = logging.getLogger(__name__)
+
+CHUNKER_CHARS = "chars"
+CHUNKER_TOKENS = "tokens"
+
+_HEADING_RE = re.compile(r"^\s{0,3}#{1,6}\s+\S")
+_LIST_ITEM_RE = re.compile(r"^\s*(?:[-*+•]|\d{1,3}[.)])\s+\S")
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?])\s+")
+_APPROX_TOKEN_RE = re.compile(r"\w{1,4}|[^\w\s]")
+
+# Names the block an oversized piece was split from
+_origins = itertools.count()
+
+
+@lru_cache(maxsize=1)
+def _encoder():
+    """The tiktoken encoder, or None if tiktoken or its encoding file is unavailable."""
+    # Downloaded once into the data directory instead of the system temp directory
+    os.environ["TIKTOKEN_CACHE_DIR"] = str(Config.TIKTOKEN_CACHE_DIR)
+    try:
+        import tiktoken
+
+        return tiktoken.get_encoding(Config.RAG_TOKENIZER)
+    except Exception as e:
+        logger.warning(f"tiktoken unavailable ({e}), approximating token counts")
+        return None
+
+
+def check_tokenizer(name: str = Config.RAG_CHUNKER) -> None:
+    """Raise unless the named chunker can count tokens exactly.
+
+    Chunking with the approximation would give other chunks, and another
+    chunker signature, than a host with tiktoken, so only reports use it.
+    """
+    if name == CHUNKER_TOKENS and _encoder() is None:
+        raise RuntimeError(
+            f"RAG_CHUNKER=tokens needs tiktoken and its {Config.RAG_TOKENIZER} encoding: "
+            f"install requirements.txt, and on hosts without internet access copy the encoding "
+            f"file into TIKTOKEN_CACHE_DIR ({Config.TIKTOKEN_CACHE_DIR})"
+        )
+
+
+def count_tokens(text: str) -> int:
+    """Number of tokens in text."""
+    encoder = _encoder()
+    if encoder is not None:
+        return len(encoder.encode(text, disallowed_special=()))
+    # Roughly one token per short word or word piece of up to 4 characters
+    return len(_APPROX_TOKEN_RE.findall(text))
+
+
+def tokenizer_name() -> str:
+    """Name of the tokenizer in use."""
+    return Config.RAG_TOKENIZER if _encoder() is not None else "approx"
+
+
+class _Block:
+    """A heading, paragraph or list item, or a piece of one (``origin`` names the whole)."""
+
+    def __init__(self, kind: str, text: str, origin: Optional[int] = None):
+        self.kind = kind
+        self.text = text
+        self.origin = origin
+        self.tokens = count_tokens(text)
+
+
+def split_blocks(text: str) -> list[_Block]:
+    """Split text into headings, paragraphs and list items."""
+    blocks: list[_Block] = []
+    lines: list[str] = []
+    kind = "paragraph"
+
+    def flush() -> None:
+        if lines:
+            joined = "\n".join(lines).strip()
+            if joined:
+                blocks.append(_Block(kind, joined))
+            lines.clear()
+
+    for line in text.splitlines():
+        if not line.strip():
+            flush()
+            kind = "paragraph"
+        elif _HEADING_RE.match(line):
+            flush()
+            blocks.append(_Block("heading", line.strip()))
+            kind = "paragraph"
+        elif _LIST_ITEM_RE.match(line):
+            flush()
+            kind = "item"
+            lines.append(line.rstrip())
+        else:
+            lines.append(line.rstrip())
+    flush()
+    return blocks
+
+
+def _split_word(word: str, max_tokens: int) -> list[str]:
+    """Cut a word longer than max_tokens (base64, a URL, text extracted without spaces) into pieces."""
+    pieces: list[str] = []
+    while count_tokens(word) > max_tokens:
+        # Longest prefix that fits; every token is at least one character
+        low, high = max_tokens, len(word) - 1
+        while low < high:
+            middle = (low + high + 1) // 2
+            if count_tokens(word[:middle]) <= max_tokens:
+                low = middle
+            else:
+                high = middle - 1
+        pieces.append(word[:low])
+        word = word[low:]
+    pieces.append(word)
+    return pieces
+
+
+def _split_oversized(block: _Block, max_tokens: int) -> list[_Block]:
+    """Split a block longer than max_tokens at sentence, then word, then character boundaries."""
+    pieces: list[_Block] = []
+    origin = next(_origins)
+    for sentence in _SENTENCE_END_RE.split(block.text):
+        sentence_block = _Block(block.kind, sentence, origin)
+        if sentence_block.tokens <= max_tokens:
+            pieces.append(sentence_block)
+            continue
+        words: list[str] = []
+        for word in sentence.split():
+            if words and count_tokens(" ".join(words + [word])) > max_tokens:
+                pieces.append(_Block(block.kind, " ".join(words), origin))
+                words = []
+            if count_tokens(word) > max_tokens:
+                *cut, word = _split_word(word, max_tokens)
+                pieces.extend(_Block(block.kind, piece, origin) for piece in cut)
+            words.append(word)
+        if words:
+            pieces.append(_Block(block.kind, " ".join(words), origin))
+    return pieces
+
+
+def _tail_sentences(text: str, max_tokens: int) -> str:
+    """Trailing whole sentences of text totalling at most max_tokens."""
+    tail: list[str] = []
+    tokens = 0
+    for sentence in reversed(_SENTENCE_END_RE.split(text)):
+        sentence_tokens = count_tokens(sentence)
+        if tokens + sentence_tokens > max_tokens:
+            break
+        tail.insert(0, sentence)
+        tokens += sentence_tokens
+    return " ".join(tail)
+
+
+def _join(blocks: list[_Block]) -> str:
+    """Join blocks, keeping consecutive list items on adjacent lines and pieces of one block inline."""
+    parts: list[str] = []
+    for i, block in enumerate(blocks):
+        if i:
+            previous = blocks[i - 1]
+            if block.origin is not None and block.origin == previous.origin:
+                parts.append(" ")
+            elif block.kind == "item" and previous.kind == "item":
+                parts.append("\n")
+            else:
+                parts.append("\n\n")
+        parts.append(block.text)
+    return "".join(parts)
+
+
+def chunk_text_tokens(
+    text: str,
+    max_tokens: int = Config.RAG_CHUNK_TOKENS,
+    overlap_tokens: int = Config.RAG_CHUNK_OVERLAP_TOKENS,
+) -> list[str]:
+    """Split text into chunks of at most ``max_tokens`` along its structure.
+
+    Headings, paragraphs and list items are kept whole when they fit, and a
+    heading always starts a new chunk. A chunk that continues a section
+    starts with the section heading and up to ``overlap_tokens`` of whole
+    trailing sentences from the previous chunk, instead of a fixed
+    character overlap.
+    """
+    chunks: list[str] = []
+    current: list[_Block] = []
+    current_tokens = 0
+    heading: Optional[_Block] = None
+
+    def flush() -> None:
+        nonlocal current, current_tokens
+        if any(block.kind != "heading" for block in current):
+            chunks.append(_join(current))
+        current, current_tokens = [], 0
+
+    def start_continuation(last: _Block) -> None:
+        nonlocal current_tokens
+        if heading is not None and heading.tokens < max_tokens // 4:
+            current.append(heading)
+            current_tokens += heading.tokens
+        tail = _tail_sentences(last.text, overlap_tokens) if overlap_tokens > 0 else ""
+        if tail:
+            block = _Block(last.kind, tail, last.origin)
+            current.append(block)
+            current_tokens += block.tokens
+
+    for block in split_blocks(text):
+        if block.kind == "heading":
+            flush()
+            heading = block
+            current.append(block)
+            current_tokens += block.tokens
+            continue
+
+        pieces = [block] if block.tokens <= max_tokens else _split_oversized(block, max_tokens)
+        for piece in pieces:
+            if current_tokens + piece.tokens > max_tokens and any(b.kind != "heading" for b in current):
+                last = current[-1]
+                flush()
+                start_continuation(last)
+                if current_tokens + piece.tokens > max_tokens:
+                    current, current_tokens = [], 0
+            current.append(piece)
+            current_tokens += piece.tokens
+
+    flush()
+    return chunks
+
+
+def chunk_text(text: str, chunk_size: int = 1000, overlap: int = 200) -> list[str]:
+    """Split text into overlapping chunks."""
+    chunks = []
+    start = 0
+
+    while start < len(text):
+        end = start + chunk_size
+        chunk = text[start:end]
+        chunks.append(chunk)
+        start = end - overlap
+
+    return [c.strip() for c in chunks if c.strip()]
+
+
+def chunk_text_chars(text: str) -> list[str]:
+    """Fixed character windows (the original chunker)."""
+    return chunk_text(text, chunk_size=Config.RAG_CHUNK_SIZE, overlap=Config.RAG_CHUNK_OVERLAP)
+
+
+CHUNKERS: dict[str, Callable[[str], list[str]]] = {
+    CHUNKER_CHARS: chunk_text_chars,
+    CHUNKER_TOKENS: chunk_text_tokens,
+}
+
+
+def get_chunker(name: str = Config.RAG_CHUNKER) -> Callable[[str], list[str]]:
+    """Chunking function by name."""
+    try:
+        chunker = CHUNKERS[name]
+    except KeyError:
+        raise ValueError(f"Unknown RAG_CHUNKER: {name}") from None
+    check_tokenizer(name)
+    return chunker
+
+
+def chunker_signature(name: str = Config.RAG_CHUNKER) -> str:
+    """Identifies the chunker and its settings; a change means documents must be re-chunked."""
+    if name == CHUNKER_TOKENS:
+        check_tokenizer(name)
+        return f"{name}:{Config.RAG_CHUNK_TOKENS}:{Config.RAG_CHUNK_OVERLAP_TOKENS}:{tokenizer_name()}"
+    return f"{name}:{Config.RAG_CHUNK_SIZE}:{Config.RAG_CHUNK_OVERLAP}"
+
+
+def compare_chunkers(pages: Iterable[str]) -> dict[str, dict]:
+    """Chunk count and token totals of every chunker over the same pages.
+
+    ``source_tokens`` is the size of the text itself; ``chunk_tokens`` is
+    what embedding all chunks costs, so the difference is overlap overhead.
+    """
+    pages = list(pages)
+    source_tokens = sum(count_tokens(page) for page in pages)
+    report = {}
+    for name, chunker in CHUNKERS.items():
+        chunks = [chunk for page in pages for chunk in chunker(page)]
+        chunk_tokens = sum(count_tokens(chunk) for chunk in chunks)
+        report[name] = {
+            "chunks": len(chunks),
+            "chunk_tokens": chunk_tokens,
+            "source_tokens": source_tokens,
+            "max_chunk_tokens": max((count_tokens(chunk) for chunk in chunks), default=0),
+            "overhead": round(chunk_tokens / source_tokens - 1, 3) if source_tokens else 0.0,
+        }
+    return report
@@ -0,0 +1,67 @@
+"""Single-flight coalescing of identical concurrent questions."""
+
+import asyncio
+import logging
+from typing import Awaitable, Callable, Hashable, Optional, TypeVar
+
+from app.embed_cache import normalize_query
+from app.progress import ReplyFanout, StreamingReply
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+def question_key(text: str, kb_version: int) -> tuple[str, int]:
+    """Coalescing key: questions equal after normalization, asked of the same knowledge base."""
+    return normalize_query(text), kb_version
+
+
+class SingleFlight:
+    """Run one computation per key at a time and share its result.
+
+    The first caller for a key starts the computation; callers arriving
+    while it is in flight wait for the same result (or exception) instead of
+    starting their own. The computation runs as its own task, so a caller
+    that goes away does not cancel it for the others. Callers may attach a
+    ``StreamingReply`` to see streamed output, including what was streamed
+    before they joined.
+    """
+
+    def __init__(self):
+        """Initialize with nothing in flight."""
+        self._flights: dict[Hashable, tuple[asyncio.Task, ReplyFanout]] = {}
+        self.leaders = 0
+        self.followers = 0
+
+    async def run(
+        self,
+        key: Hashable,
+        compute: Callable[[ReplyFanout], Awaitable[T]],
+        reply: Optional[StreamingReply] = None,
+    ) -> T:
+        """Get the result of ``compute(fanout)`` for key, joining an in-flight run if there is one."""
+        flight = self._flights.get(key)
+        if flight is None:
+            self.leaders += 1
+            fanout = ReplyFanout()
+            task = asyncio.create_task(compute(fanout))
+            self._flights[key] = flight = (task, fanout)
+            task.add_done_callback(lambda _: self._flights.pop(key, None))
+        else:
+            self.followers += 1
+            logger.debug(f"Joined in-flight computation for {key!r}")
+        task, fanout = flight
+        if reply is not None:
+            fanout.add(reply)
+        return await asyncio.shield(task)
+
+    def stats(self) -> dict:
+        """Coalescing counters."""
+        total = self.leaders + self.followers
+        return {
+            "computed": self.leaders,
+            "coalesced": self.followers,
+            "in_flight": len(self._flights),
+            "coalesced_rate": round(self.followers / total, 3) if total else 0.0,
+        }
@@ -1,6 +1,7 @@
 """Configuration management."""
 
 import os
+import re
 from pathlib import Path
 from typing import Optional
 
@@ -17,15 +18,63 @@ class Config:
     TELEGRAM_ADMIN_IDS: list[int] = [
         int(uid.strip()) for uid in os.getenv("TELEGRAM_ADMIN_IDS", "").split(",") if uid.strip()
     ]
+    TELEGRAM_EDIT_INTERVAL: float = float(os.getenv("TELEGRAM_EDIT_INTERVAL", "2"))  # seconds between message edits
+
+    # Update delivery: "polling" or "webhook"
+    BOT_MODE: str = os.getenv("BOT_MODE", "polling").lower()
+    WEBHOOK_URL: str = os.getenv("WEBHOOK_URL", "")  # public URL to register with Telegram (empty = don't register)
+    WEBHOOK_PATH: str = os.getenv("WEBHOOK_PATH", "/webhook")
+    WEBHOOK_HOST: str = os.getenv("WEBHOOK_HOST", "0.0.0.0")
+    WEBHOOK_PORT: int = int(os.getenv("WEBHOOK_PORT", "8080"))
+    WEBHOOK_SECRET: str = os.getenv("WEBHOOK_SECRET", "")
+    WEBHOOK_MAX_CONNECTIONS: int = int(os.getenv("WEBHOOK_MAX_CONNECTIONS", "40"))  # parallel deliveries from Telegram
+    WEBHOOK_CONCURRENCY: int = int(os.getenv("WEBHOOK_CONCURRENCY", "64"))  # updates handled at once
+    WEBHOOK_REUSE_PORT: bool = os.getenv("WEBHOOK_REUSE_PORT", "false").lower() == "true"  # share the port between workers
+
+    # Multi-process deployment (set per worker by the supervisor)
+    WORKERS: int = int(os.getenv("WORKERS", "2"))  # worker processes started by app.supervisor
+    WORKER_ID: int = int(os.getenv("WORKER_ID", "0"))
+    JOB_WORKER: bool = os.getenv("JOB_WORKER", "true").lower() == "true"  # run ingest jobs in this process
+
+    # Shared state backends
+    FSM_STORAGE: str = os.getenv("FSM_STORAGE", "memory").lower()  # memory | redis | file
+    FSM_STORAGE_PATH: Path = Path(os.getenv("FSM_STORAGE_PATH", "./data/fsm.db"))
+    REDIS_URL: str = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+    EVENTS_BACKEND: str = os.getenv("EVENTS_BACKEND", "local").lower()  # local | redis | file
+    EVENTS_PATH: Path = Path(os.getenv("EVENTS_PATH", "./data/events.jsonl"))
+    EVENTS_POLL_INTERVAL: float = float(os.getenv("EVENTS_POLL_INTERVAL", "0.5"))
 
     # OpenRouter
     OPENROUTER_API_KEY: str = os.getenv("OPENROUTER_API_KEY", "")
     OR_CHAT_MODEL: str = os.getenv("OR_CHAT_MODEL", "openrouter/auto")
     OR_EMBED_MODEL: str = os.getenv("OR_EMBED_MODEL", "openai/text-embedding-3-small")
-    OPENROUTER_BASE_URL: str = "https://openrouter.ai/api/v1"
+    OPENROUTER_BASE_URL: str = os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1")
+    OR_CHAT_STREAM: bool = os.getenv("OR_CHAT_STREAM", "true").lower() == "true"
+    OR_EMBED_BATCH_SIZE: int = int(os.getenv("OR_EMBED_BATCH_SIZE", "64"))
+    OR_EMBED_BATCH_MAX_TOKENS: int = int(os.getenv("OR_EMBED_BATCH_MAX_TOKENS", "50000"))
+
+    # OpenRouter HTTP connection pool
+    OR_HTTP_MAX_CONNECTIONS: int = int(os.getenv("OR_HTTP_MAX_CONNECTIONS", "20"))
+    OR_HTTP_MAX_KEEPALIVE: int = int(os.getenv("OR_HTTP_MAX_KEEPALIVE", "10"))
+    OR_HTTP_KEEPALIVE_EXPIRY: float = float(os.getenv("OR_HTTP_KEEPALIVE_EXPIRY", "30"))
+    OR_HTTP2: bool = os.getenv("OR_HTTP2", "false").lower() == "true"
+
+    # OpenRouter retries, circuit breaker and hedging
+    OR_RETRY_MAX: int = int(os.getenv("OR_RETRY_MAX", "3"))  # retries after the first attempt
+    OR_RETRY_BASE_DELAY: float = float(os.getenv("OR_RETRY_BASE_DELAY", "0.5"))
+    OR_RETRY_MAX_DELAY: float = float(os.getenv("OR_RETRY_MAX_DELAY", "10"))
+    OR_BREAKER_FAILURES: int = int(os.getenv("OR_BREAKER_FAILURES", "5"))
+    OR_BREAKER_RESET: float = float(os.getenv("OR_BREAKER_RESET", "30"))
+    OR_HEDGE: bool = os.getenv("OR_HEDGE", "false").lower() == "true"  # embeddings requests
+    OR_HEDGE_CHAT: bool = os.getenv("OR_HEDGE_CHAT", "false").lower() == "true"  # also non-streamed chat (pays twice)
+    OR_HEDGE_PERCENTILE: float = float(os.getenv("OR_HEDGE_PERCENTILE", "95"))
+    OR_HEDGE_MIN_DELAY: float = float(os.getenv("OR_HEDGE_MIN_DELAY", "0.5"))
 
     # Vector store
-    CHROMA_PERSIST_DIR: Path = Path(os.getenv("CHROMA_PERSIST_DIR", "./data/chroma"))
+    CHROMA_PERSIST_DIR: Path = Path(os.getenv("CHROMA_PERSIST_DIR", "./data/chroma"))  # also holds the index manifest
+    CHROMA_MODE: str = os.getenv("CHROMA_MODE", "embedded").lower()  # embedded | http
+    CHROMA_HOST: str = os.getenv("CHROMA_HOST", "localhost")
+    CHROMA_PORT: int = int(os.getenv("CHROMA_PORT", "8000"))
     DOCS_DIR: Path = Path(os.getenv("DOCS_DIR", "./data/docs"))
 
     # RAG parameters
@@ -33,13 +82,74 @@ class Config:
     RAG_SIMILARITY_THRESHOLD: float = float(os.getenv("RAG_SIMILARITY_THRESHOLD", "0.3"))
     RAG_CHUNK_SIZE: int = int(os.getenv("RAG_CHUNK_SIZE", "1000"))
     RAG_CHUNK_OVERLAP: int = int(os.getenv("RAG_CHUNK_OVERLAP", "200"))
+    RAG_CHUNKER: str = os.getenv("RAG_CHUNKER", "chars")  # chars | tokens
+    RAG_CHUNK_TOKENS: int = int(os.getenv("RAG_CHUNK_TOKENS", "256"))
+    RAG_CHUNK_OVERLAP_TOKENS: int = int(os.getenv("RAG_CHUNK_OVERLAP_TOKENS", "32"))
+    RAG_TOKENIZER: str = os.getenv("RAG_TOKENIZER", "cl100k_base")
+    # Where tiktoken keeps its encoding files; copy them here on hosts without internet access
+    TIKTOKEN_CACHE_DIR: Path = Path(os.getenv("TIKTOKEN_CACHE_DIR", "./data/tiktoken"))
+
+    # Duplicate chunk collapsing
+    INGEST_DEDUP: bool = os.getenv("INGEST_DEDUP", "true").lower() == "true"
+    DEDUP_THRESHOLD: float = float(os.getenv("DEDUP_THRESHOLD", "0.85"))  # shingle Jaccard similarity
+    DEDUP_NUM_PERM: int = int(os.getenv("DEDUP_NUM_PERM", "64"))
+    DEDUP_BANDS: int = int(os.getenv("DEDUP_BANDS", "16"))
+    DEDUP_SHINGLE_SIZE: int = int(os.getenv("DEDUP_SHINGLE_SIZE", "5"))  # words
+
+    # Ingestion pipeline
+    INGEST_EXTRACT_WORKERS: int = int(os.getenv("INGEST_EXTRACT_WORKERS", "0"))  # 0 = one per CPU
+    INGEST_EMBED_CONCURRENCY: int = int(os.getenv("INGEST_EMBED_CONCURRENCY", "4"))
+    INGEST_EMBED_RATE_LIMIT: float = float(os.getenv("INGEST_EMBED_RATE_LIMIT", "0"))  # requests/s, 0 = unlimited
+    INGEST_PAGE_WINDOW: int = int(os.getenv("INGEST_PAGE_WINDOW", "8"))
+
+    # Query embedding cache
+    EMBED_CACHE_PATH: Path = Path(os.getenv("EMBED_CACHE_PATH", "./data/embed_cache.db"))
+    EMBED_CACHE_MEMORY_SIZE: int = int(os.getenv("EMBED_CACHE_MEMORY_SIZE", "2048"))
+    EMBED_CACHE_MAX_ENTRIES: int = int(os.getenv("EMBED_CACHE_MAX_ENTRIES", "100000"))
+    EMBED_CACHE_TTL_SECONDS: int = int(os.getenv("EMBED_CACHE_TTL_SECONDS", str(30 * 24 * 3600)))
+
+    # Admission control for retrieval + LLM: running slots, queue length, max queue wait (seconds)
+    ADMISSION_MAX_CONCURRENT: int = int(os.getenv("ADMISSION_MAX_CONCURRENT", "8"))
+    ADMISSION_QUEUE_MAX: int = int(os.getenv("ADMISSION_QUEUE_MAX", "50"))
+    ADMISSION_MAX_WAIT: float = float(os.getenv("ADMISSION_MAX_WAIT", "20"))
+
+    # Time budget for answering a question, from arrival to reply (seconds); the LLM call
+    # is skipped, escalating early, if less than ANSWER_DEADLINE_MIN_CHAT is left for it
+    ANSWER_DEADLINE: float = float(os.getenv("ANSWER_DEADLINE", "45"))
+    ANSWER_DEADLINE_MIN_CHAT: float = float(os.getenv("ANSWER_DEADLINE_MIN_CHAT", "5"))
+
+    # Identical questions asked at the same time share one answer computation
+    QUESTION_COALESCING: bool = os.getenv("QUESTION_COALESCING", "true").lower() == "true"
+
+    # Micro-batching of concurrent question embeddings (0 ms = off)
+    QUERY_EMBED_BATCH_WINDOW_MS: float = float(os.getenv("QUERY_EMBED_BATCH_WINDOW_MS", "5"))
+    QUERY_EMBED_BATCH_MAX: int = int(os.getenv("QUERY_EMBED_BATCH_MAX", "32"))
+
+    # Semantic answer cache
+    ANSWER_CACHE_ENABLED: bool = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+    ANSWER_CACHE_MAX_DISTANCE: float = float(os.getenv("ANSWER_CACHE_MAX_DISTANCE", "0.05"))
+    ANSWER_CACHE_MAX_ENTRIES: int = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "1000"))
+    ANSWER_CACHE_TTL_SECONDS: int = int(os.getenv("ANSWER_CACHE_TTL_SECONDS", "86400"))
 
     # Confidentiality enforcement
     ENFORCE_CONFIDENTIALITY: bool = os.getenv("ENFORCE_CONFIDENTIALITY", "true").lower() == "true"
+    PREFILTER_KEYWORDS_PATH: Path = Path(
+        os.getenv("PREFILTER_KEYWORDS_PATH", str(Path(__file__).parent / "prefilter_keywords.json"))
+    )
+    PREFILTER_RELOAD_INTERVAL: float = float(os.getenv("PREFILTER_RELOAD_INTERVAL", "5"))  # seconds
 
     # Database
     DB_PATH: Path = Path(os.getenv("DB_PATH", "./data/bot.db"))
 
+    # Interaction log writer (buffered, batched inserts)
+    LOG_BATCH_SIZE: int = int(os.getenv("LOG_BATCH_SIZE", "50"))
+    LOG_FLUSH_INTERVAL_MS: int = int(os.getenv("LOG_FLUSH_INTERVAL_MS", "500"))
+    LOG_QUEUE_MAX: int = int(os.getenv("LOG_QUEUE_MAX", "10000"))
+    LOG_QUEUE_POLICY: str = os.getenv("LOG_QUEUE_POLICY", "block")  # block | drop
+    LOG_BACKEND: str = os.getenv("LOG_BACKEND", "local").lower()  # local | service (app.logservice writes)
+    LOG_SERVICE_HOST: str = os.getenv("LOG_SERVICE_HOST", "127.0.0.1")
+    LOG_SERVICE_PORT: int = int(os.getenv("LOG_SERVICE_PORT", "8091"))
+
     # Logging
     LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
 
@@ -50,6 +160,18 @@ class Config:
             raise ValueError("TELEGRAM_BOT_TOKEN not set in .env")
         if not cls.OPENROUTER_API_KEY:
             raise ValueError("OPENROUTER_API_KEY not set in .env")
+        if cls.BOT_MODE not in ("polling", "webhook"):
+            raise ValueError(f"BOT_MODE must be 'polling' or 'webhook', got '{cls.BOT_MODE}'")
+        if cls.BOT_MODE == "webhook" and not re.fullmatch(r"[A-Za-z0-9_-]{1,256}", cls.WEBHOOK_SECRET):
+            raise ValueError("WEBHOOK_SECRET must be set in .env for webhook mode (1-256 of A-Z, a-z, 0-9, _ and -)")
+        for name, value, allowed in (
+            ("FSM_STORAGE", cls.FSM_STORAGE, ("memory", "redis", "file")),
+            ("CHROMA_MODE", cls.CHROMA_MODE, ("embedded", "http")),
+            ("LOG_BACKEND", cls.LOG_BACKEND, ("local", "service")),
+            ("EVENTS_BACKEND", cls.EVENTS_BACKEND, ("local", "redis", "file")),
+        ):
+            if value not in allowed:
+                raise ValueError(f"{name} must be one of {', '.join(allowed)}, got '{value}'")
 
     @classmethod
     def ensure_dirs(cls) -> None:
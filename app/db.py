@@ -1,96 +1,175 @@
 """Database layer for user state and logs."""
 
+import asyncio
+import json
 import logging
 import sqlite3
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from functools import partial
 from pathlib import Path
-from typing import Optional
+from typing import Any, Callable, Optional
 
 from app.config import Config
 
 logger = logging.getLogger(__name__)
 
+# Applied to every connection: WAL lets readers run alongside the writer, and
+# synchronous=NORMAL is durable across crashes in WAL mode without an fsync per commit.
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-16000",
+)
 
-class Database:
-    """SQLite database wrapper."""
 
-    def __init__(self, db_path: Path = Config.DB_PATH):
-        """Initialize database."""
+class SQLiteStore(ABC):
+    """Base for async SQLite stores.
+
+    Holds one persistent connection that is only ever used from a dedicated
+    worker thread, so queries never block the event loop. Subclasses create
+    their tables in ``_init_schema`` and wrap blocking methods with ``_run``.
+    """
+
+    def __init__(self, db_path: Path):
+        """Open the database and create the schema."""
         self.db_path = db_path
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
-        self._init_schema()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite")
+        self._conn: Optional[sqlite3.Connection] = None
+        self._executor.submit(self._open).result()
 
-    def _get_connection(self) -> sqlite3.Connection:
-        """Get database connection."""
-        conn = sqlite3.connect(str(self.db_path))
+    def _open(self) -> None:
+        """Open the connection, apply pragmas and create the schema (DB thread)."""
+        conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
         conn.row_factory = sqlite3.Row
-        return conn
+        for pragma in SQLITE_PRAGMAS:
+            conn.execute(pragma)
+        self._conn = conn
+        self._init_schema()
+
+    @abstractmethod
+    def _init_schema(self) -> None:
+        """Create tables (DB thread)."""
+
+    async def _run(self, func: Callable[..., Any], *args: Any) -> Any:
+        """Run a blocking function on the database thread."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(func, *args))
+
+    async def close(self) -> None:
+        """Close the connection and stop the database thread."""
+        if self._conn is not None:
+            await self._run(self._conn.close)
+            self._conn = None
+        self._executor.shutdown(wait=True)
+        logger.info(f"Closed {self.db_path.name}")
+
+
+class Database(SQLiteStore):
+    """SQLite store for users, interaction logs and background jobs."""
+
+    def __init__(self, db_path: Path = Config.DB_PATH):
+        """Initialize database."""
+        super().__init__(db_path)
 
     def _init_schema(self) -> None:
         """Initialize database schema."""
-        conn = self._get_connection()
-        cursor = conn.cursor()
-
-        cursor.execute(
-            """
-            CREATE TABLE IF NOT EXISTS users (
-                telegram_id INTEGER PRIMARY KEY,
-                language TEXT NOT NULL DEFAULT 'en',
-                created_at TEXT NOT NULL
+        with self._conn:
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS users (
+                    telegram_id INTEGER PRIMARY KEY,
+                    language TEXT NOT NULL DEFAULT 'en',
+                    created_at TEXT NOT NULL
+                )
+                """
             )
-            """
-        )
 
-        cursor.execute(
-            """
-            CREATE TABLE IF NOT EXISTS logs (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                telegram_id INTEGER NOT NULL,
-                question TEXT NOT NULL,
-                action TEXT NOT NULL,
-                internal_sources TEXT,
-                retrieval_scores TEXT,
-                created_at TEXT NOT NULL,
-                FOREIGN KEY (telegram_id) REFERENCES users(telegram_id)
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS logs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    telegram_id INTEGER NOT NULL,
+                    question TEXT NOT NULL,
+                    action TEXT NOT NULL,
+                    internal_sources TEXT,
+                    retrieval_scores TEXT,
+                    created_at TEXT NOT NULL,
+                    FOREIGN KEY (telegram_id) REFERENCES users(telegram_id)
+                )
+                """
+            )
+
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_logs_telegram_created ON logs (telegram_id, created_at)"
+            )
+
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    kind TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    telegram_id INTEGER NOT NULL,
+                    chat_id INTEGER NOT NULL,
+                    message_id INTEGER,
+                    staging TEXT,
+                    result TEXT,
+                    error TEXT,
+                    created_at TEXT NOT NULL,
+                    updated_at TEXT NOT NULL
+                )
+                """
+            )
+
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, id)")
+
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS job_checkpoints (
+                    job_id INTEGER NOT NULL,
+                    filename TEXT NOT NULL,
+                    chunk_id TEXT NOT NULL,
+                    content_hash TEXT NOT NULL,
+                    PRIMARY KEY (job_id, filename, chunk_id),
+                    FOREIGN KEY (job_id) REFERENCES jobs(id)
+                )
+                """
             )
-            """
-        )
 
-        conn.commit()
-        conn.close()
         logger.info("Database schema initialized")
 
-    def get_user(self, telegram_id: int) -> Optional[dict]:
+    async def get_user(self, telegram_id: int) -> Optional[dict]:
         """Get user by telegram_id."""
-        conn = self._get_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM users WHERE telegram_id = ?", (telegram_id,))
-        row = cursor.fetchone()
-        conn.close()
+        return await self._run(self._get_user, telegram_id)
+
+    def _get_user(self, telegram_id: int) -> Optional[dict]:
+        row = self._conn.execute(
+            "SELECT * FROM users WHERE telegram_id = ?", (telegram_id,)
+        ).fetchone()
         return dict(row) if row else None
 
-    def set_user_language(self, telegram_id: int, language: str) -> None:
+    async def set_user_language(self, telegram_id: int, language: str) -> None:
         """Create or update user (language param kept for compatibility, always uses en)."""
-        conn = self._get_connection()
-        cursor = conn.cursor()
-        now = datetime.utcnow().isoformat()
+        await self._run(self._set_user_language, telegram_id)
 
-        existing = self.get_user(telegram_id)
-        if existing:
-            cursor.execute(
-                "UPDATE users SET language = ? WHERE telegram_id = ?",
-                ("en", telegram_id),
-            )
-        else:
-            cursor.execute(
-                "INSERT INTO users (telegram_id, language, created_at) VALUES (?, ?, ?)",
+    def _set_user_language(self, telegram_id: int) -> None:
+        now = datetime.utcnow().isoformat()
+        with self._conn:
+            self._conn.execute(
+                """
+                INSERT INTO users (telegram_id, language, created_at) VALUES (?, ?, ?)
+                ON CONFLICT (telegram_id) DO UPDATE SET language = excluded.language
+                """,
                 (telegram_id, "en", now),
             )
 
-        conn.commit()
-        conn.close()
-
-    def log_interaction(
+    async def log_interaction(
         self,
         telegram_id: int,
         question: str,
@@ -99,36 +178,237 @@ class Database:
         retrieval_scores: Optional[str] = None,
     ) -> int:
         """Log a user interaction. Returns log ID."""
-        conn = self._get_connection()
-        cursor = conn.cursor()
+        return await self._run(
+            self._log_interaction,
+            telegram_id,
+            question,
+            action,
+            internal_sources,
+            retrieval_scores,
+        )
+
+    def _log_interaction(
+        self,
+        telegram_id: int,
+        question: str,
+        action: str,
+        internal_sources: Optional[str],
+        retrieval_scores: Optional[str],
+    ) -> int:
         now = datetime.utcnow().isoformat()
+        with self._conn:
+            cursor = self._conn.execute(
+                """
+                INSERT INTO logs (telegram_id, question, action, internal_sources, retrieval_scores, created_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                (telegram_id, question, action, internal_sources, retrieval_scores, now),
+            )
+        return cursor.lastrowid
 
-        cursor.execute(
-            """
-            INSERT INTO logs (telegram_id, question, action, internal_sources, retrieval_scores, created_at)
-            VALUES (?, ?, ?, ?, ?, ?)
-            """,
-            (telegram_id, question, action, internal_sources, retrieval_scores, now),
-        )
+    async def log_interactions(self, records: list[tuple]) -> None:
+        """Write many log records in one transaction.
 
-        log_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
-        return log_id
+        Each record is ``(telegram_id, question, action, internal_sources,
+        retrieval_scores, created_at)``.
+        """
+        await self._run(self._log_interactions, records)
 
-    def get_last_log(self, telegram_id: int) -> Optional[dict]:
+    def _log_interactions(self, records: list[tuple]) -> None:
+        with self._conn:
+            self._conn.executemany(
+                """
+                INSERT INTO logs (telegram_id, question, action, internal_sources, retrieval_scores, created_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                records,
+            )
+
+    async def get_last_log(self, telegram_id: int) -> Optional[dict]:
         """Get the last log entry for a user (admin use only)."""
-        conn = self._get_connection()
-        cursor = conn.cursor()
-        cursor.execute(
+        return await self._run(self._get_last_log, telegram_id)
+
+    def _get_last_log(self, telegram_id: int) -> Optional[dict]:
+        row = self._conn.execute(
             "SELECT * FROM logs WHERE telegram_id = ? ORDER BY created_at DESC LIMIT 1",
             (telegram_id,),
+        ).fetchone()
+        return dict(row) if row else None
+
+    async def create_job(
+        self,
+        kind: str,
+        payload: dict,
+        telegram_id: int,
+        chat_id: int,
+        message_id: Optional[int] = None,
+    ) -> int:
+        """Queue a background job. Returns job ID."""
+        return await self._run(
+            self._create_job, kind, json.dumps(payload), telegram_id, chat_id, message_id
         )
-        row = cursor.fetchone()
-        conn.close()
+
+    def _create_job(
+        self,
+        kind: str,
+        payload: str,
+        telegram_id: int,
+        chat_id: int,
+        message_id: Optional[int],
+    ) -> int:
+        now = datetime.utcnow().isoformat()
+        with self._conn:
+            cursor = self._conn.execute(
+                """
+                INSERT INTO jobs (kind, payload, status, telegram_id, chat_id, message_id, created_at, updated_at)
+                VALUES (?, ?, 'queued', ?, ?, ?, ?, ?)
+                """,
+                (kind, payload, telegram_id, chat_id, message_id, now, now),
+            )
+        return cursor.lastrowid
+
+    async def claim_next_job(self) -> Optional[dict]:
+        """Mark the oldest queued job as running and return it, or None."""
+        return await self._run(self._claim_next_job)
+
+    def _claim_next_job(self) -> Optional[dict]:
+        while True:
+            with self._conn:
+                row = self._conn.execute(
+                    "SELECT * FROM jobs WHERE status = 'queued' ORDER BY id LIMIT 1"
+                ).fetchone()
+                if not row:
+                    return None
+                # Another process sharing the database may claim the same job first
+                claimed = self._conn.execute(
+                    "UPDATE jobs SET status = 'running', updated_at = ? WHERE id = ? AND status = 'queued'",
+                    (datetime.utcnow().isoformat(), row["id"]),
+                ).rowcount
+            if claimed:
+                break
+        job = dict(row)
+        job["status"] = "running"
+        job["payload"] = json.loads(job["payload"])
+        return job
+
+    async def requeue_running_jobs(self) -> int:
+        """Put jobs left running by a previous process back in the queue. Returns count."""
+        return await self._run(self._requeue_running_jobs)
+
+    def _requeue_running_jobs(self) -> int:
+        with self._conn:
+            return self._conn.execute(
+                "UPDATE jobs SET status = 'queued', updated_at = ? WHERE status = 'running'",
+                (datetime.utcnow().isoformat(),),
+            ).rowcount
+
+    async def finish_job(
+        self,
+        job_id: int,
+        status: str,
+        result: Optional[dict] = None,
+        error: Optional[str] = None,
+    ) -> None:
+        """Record a job's final status and drop its checkpoints."""
+        await self._run(
+            self._finish_job, job_id, status, json.dumps(result) if result is not None else None, error
+        )
+
+    def _finish_job(self, job_id: int, status: str, result: Optional[str], error: Optional[str]) -> None:
+        with self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, updated_at = ? WHERE id = ?",
+                (status, result, error, datetime.utcnow().isoformat(), job_id),
+            )
+            self._conn.execute("DELETE FROM job_checkpoints WHERE job_id = ?", (job_id,))
+
+    async def cancel_queued_job(self, job_id: int) -> bool:
+        """Cancel a job that has not started. Returns False if it is not queued."""
+        return await self._run(self._cancel_queued_job, job_id)
+
+    def _cancel_queued_job(self, job_id: int) -> bool:
+        with self._conn:
+            return self._conn.execute(
+                "UPDATE jobs SET status = 'cancelled', updated_at = ? WHERE id = ? AND status = 'queued'",
+                (datetime.utcnow().isoformat(), job_id),
+            ).rowcount > 0
+
+    async def get_job(self, job_id: int) -> Optional[dict]:
+        """Get a job by ID."""
+        return await self._run(self._get_job, job_id)
+
+    def _get_job(self, job_id: int) -> Optional[dict]:
+        row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
         return dict(row) if row else None
 
+    async def list_jobs(self, limit: int = 10) -> list[dict]:
+        """Most recent jobs, newest first."""
+        return await self._run(self._list_jobs, limit)
+
+    def _list_jobs(self, limit: int) -> list[dict]:
+        rows = self._conn.execute("SELECT * FROM jobs ORDER BY id DESC LIMIT ?", (limit,)).fetchall()
+        return [dict(row) for row in rows]
+
+    async def set_job_staging(self, job_id: int, staging: str) -> None:
+        """Record the staging collection a full rebuild job writes into."""
+        await self._run(self._set_job_staging, job_id, staging)
+
+    def _set_job_staging(self, job_id: int, staging: str) -> None:
+        with self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET staging = ?, updated_at = ? WHERE id = ?",
+                (staging, datetime.utcnow().isoformat(), job_id),
+            )
+
+    async def add_job_checkpoint(self, job_id: int, filename: str, chunks: dict[str, str]) -> None:
+        """Record chunks (``chunk_id -> content hash``) a job has written."""
+        await self._run(self._add_job_checkpoint, job_id, filename, chunks)
+
+    def _add_job_checkpoint(self, job_id: int, filename: str, chunks: dict[str, str]) -> None:
+        with self._conn:
+            self._conn.executemany(
+                """
+                INSERT OR REPLACE INTO job_checkpoints (job_id, filename, chunk_id, content_hash)
+                VALUES (?, ?, ?, ?)
+                """,
+                [(job_id, filename, chunk_id, content_hash) for chunk_id, content_hash in chunks.items()],
+            )
+
+    async def get_job_checkpoints(self, job_id: int) -> dict[str, dict[str, str]]:
+        """Chunks a job has written so far, as ``filename -> {chunk_id: content hash}``."""
+        return await self._run(self._get_job_checkpoints, job_id)
+
+    def _get_job_checkpoints(self, job_id: int) -> dict[str, dict[str, str]]:
+        written: dict[str, dict[str, str]] = {}
+        rows = self._conn.execute(
+            "SELECT filename, chunk_id, content_hash FROM job_checkpoints WHERE job_id = ?",
+            (job_id,),
+        )
+        for row in rows:
+            written.setdefault(row["filename"], {})[row["chunk_id"]] = row["content_hash"]
+        return written
+
+
+# Process-lifetime instance, managed by init_db() / close_db()
+_db: Optional[Database] = None
+
+
+def init_db() -> Database:
+    """Create the shared database (call once at startup)."""
+    global _db
+    if _db is None:
+        _db = Database()
+    return _db
+
+
+async def close_db() -> None:
+    """Tear down the shared database (call once at shutdown)."""
+    global _db
+    if _db is not None:
+        await _db.close()
+        _db = None
+
 
 def get_db() -> Database:
-    """Get database instance."""
-    return Database()
+    """Get the shared database instance, initializing it on first use."""
+    return _db or init_db()
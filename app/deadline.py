@@ -0,0 +1,88 @@
+"""End-to-end time budget for answering a question."""
+
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator, Optional
+
+from app.config import Config
+
+logger = logging.getLogger(__name__)
+
+STAGE_EMBED = "embed"
+STAGE_SEARCH = "search"
+STAGE_CHAT = "chat"
+
+# Deadline of the stage running in the current task, for clients that size their own timeouts
+_current: ContextVar[Optional["Deadline"]] = ContextVar("deadline", default=None)
+
+
+class DeadlineExceeded(Exception):
+    """Raised when a stage is skipped or cut off because the budget ran out; ``stage`` says which."""
+
+    def __init__(self, stage: str):
+        super().__init__(stage)
+        self.stage = stage
+
+
+class Deadline:
+    """A time budget consumed by the stages of one request.
+
+    Each stage runs in ``stage()``, which gives it whatever time is left. A
+    stage that needs more than is left is not started, and one still running
+    when the budget runs out is cancelled; both raise ``DeadlineExceeded``.
+    """
+
+    def __init__(self, seconds: float = Config.ANSWER_DEADLINE):
+        """Start the budget now."""
+        self.started = time.monotonic()
+        self.expires = self.started + seconds
+
+    def remaining(self) -> float:
+        """Seconds left (negative once expired)."""
+        return self.expires - time.monotonic()
+
+    def elapsed(self) -> float:
+        """Seconds since the budget started."""
+        return time.monotonic() - self.started
+
+    @asynccontextmanager
+    async def stage(self, name: str, min_seconds: float = 0.0) -> AsyncIterator[None]:
+        """Run a block within the remaining budget if at least ``min_seconds`` are left."""
+        remaining = self.remaining()
+        if remaining <= min_seconds:
+            self._exceeded(name, started=False)
+        token = _current.set(self)
+        try:
+            async with asyncio.timeout(remaining):
+                yield
+        except TimeoutError:
+            self._exceeded(name, started=True)
+        except Exception:
+            # A client timeout sized to the budget can fire just before ours
+            if self.remaining() <= 0:
+                self._exceeded(name, started=True)
+            raise
+        finally:
+            _current.reset(token)
+
+    def _exceeded(self, name: str, started: bool) -> None:
+        action = "cut off" if started else "skipped"
+        logger.warning(f"Deadline exceeded: {name} stage {action} after {self.elapsed():.2f}s")
+        raise DeadlineExceeded(name)
+
+
+def budget_timeout(default: float) -> float:
+    """``default`` capped to what is left of the current stage's deadline, if any."""
+    deadline = _current.get()
+    if deadline is None:
+        return default
+    return max(min(default, deadline.remaining()), 0.001)
+
+
+def budget_allows(delay: float) -> bool:
+    """Whether waiting ``delay`` seconds still leaves time in the current deadline, if any."""
+    deadline = _current.get()
+    return deadline is None or deadline.remaining() > delay
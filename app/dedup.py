@@ -0,0 +1,212 @@
+"""Exact and near-duplicate chunk detection (MinHash signatures with LSH banding)."""
+
+import copy
+import hashlib
+import json
+import random
+import re
+from collections import defaultdict
+from functools import lru_cache
+from typing import Callable, Optional
+
+from app.config import Config
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_WORD_RE = re.compile(r"\w+")
+
+
+@lru_cache(maxsize=4)
+def _permutations(num_perm: int) -> list[tuple[int, int]]:
+    """Hash permutation coefficients (seeded, so signatures are stable across runs)."""
+    rng = random.Random(num_perm)
+    return [
+        (rng.randrange(1, _MERSENNE_PRIME), rng.randrange(0, _MERSENNE_PRIME))
+        for _ in range(num_perm)
+    ]
+
+
+def shingles(text: str, size: int = Config.DEDUP_SHINGLE_SIZE) -> set[int]:
+    """Hashed word n-grams of text (case-insensitive, punctuation ignored)."""
+    words = _WORD_RE.findall(text.casefold())
+    grams = [" ".join(words[i:i + size]) for i in range(max(len(words) - size + 1, 1))] if words else []
+    return {int.from_bytes(hashlib.blake2b(g.encode(), digest_size=8).digest(), "big") for g in grams}
+
+
+def minhash(shingle_set: set[int], num_perm: int = Config.DEDUP_NUM_PERM) -> list[int]:
+    """MinHash signature of a shingle set."""
+    if not shingle_set:
+        return [_MERSENNE_PRIME] * num_perm
+    return [min((a * x + b) % _MERSENNE_PRIME for x in shingle_set) for a, b in _permutations(num_perm)]
+
+
+def lsh_bands(signature: list[int], bands: int = Config.DEDUP_BANDS) -> list[str]:
+    """LSH band keys: texts sharing any key are near-duplicate candidates."""
+    rows = max(len(signature) // bands, 1)
+    return [
+        f"{i}:" + hashlib.blake2b(repr(signature[i * rows:(i + 1) * rows]).encode(), digest_size=8).hexdigest()
+        for i in range(bands)
+    ]
+
+
+def jaccard(a: set[int], b: set[int]) -> float:
+    """Jaccard similarity of two sets."""
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+class DuplicateIndex:
+    """Groups of indexed chunks whose text is stored once.
+
+    Each group is keyed by the ID its text is stored under in the vector
+    store and records that text's content hash, its LSH band keys and its
+    members (``chunk_id -> [filename, page]``). A chunk joins an existing
+    group if its content hash matches, or if an LSH candidate's shingle
+    Jaccard similarity is at least ``threshold``.
+
+    Changes made between ``begin`` and ``rollback`` can be undone, so a
+    failed vector store write leaves the index as it was.
+    """
+
+    def __init__(self, groups: Optional[dict[str, dict]] = None, threshold: float = Config.DEDUP_THRESHOLD):
+        """Initialize from saved groups."""
+        self.groups: dict[str, dict] = groups or {}
+        self.threshold = threshold
+        self._member_of: dict[str, str] = {}
+        self._by_hash: dict[str, str] = {}
+        self._by_band: dict[str, set[str]] = defaultdict(set)
+        self._undo: Optional[dict[str, Optional[dict]]] = None
+        for stored_id, group in self.groups.items():
+            self._index(stored_id, group)
+
+    def _index(self, stored_id: str, group: dict) -> None:
+        for chunk_id in group["members"]:
+            self._member_of[chunk_id] = stored_id
+        self._by_hash[group["hash"]] = stored_id
+        for band in group["bands"]:
+            self._by_band[band].add(stored_id)
+
+    def _unindex(self, stored_id: str, group: dict) -> None:
+        for chunk_id in group["members"]:
+            if self._member_of.get(chunk_id) == stored_id:
+                del self._member_of[chunk_id]
+        if self._by_hash.get(group["hash"]) == stored_id:
+            del self._by_hash[group["hash"]]
+        for band in group["bands"]:
+            self._by_band[band].discard(stored_id)
+            if not self._by_band[band]:
+                del self._by_band[band]
+
+    def _touch(self, stored_id: str) -> None:
+        """Remember a group's state before its first change in a transaction."""
+        if self._undo is not None and stored_id not in self._undo:
+            self._undo[stored_id] = copy.deepcopy(self.groups.get(stored_id))
+
+    def begin(self) -> None:
+        """Start recording changes."""
+        self._undo = {}
+
+    def commit(self) -> None:
+        """Keep the changes made since ``begin``."""
+        self._undo = None
+
+    def rollback(self) -> None:
+        """Undo the changes made since ``begin``."""
+        undo, self._undo = self._undo or {}, None
+        for stored_id, original in undo.items():
+            current = self.groups.pop(stored_id, None)
+            if current is not None:
+                self._unindex(stored_id, current)
+            if original is not None:
+                self.groups[stored_id] = original
+                self._index(stored_id, original)
+
+    def stored_id(self, chunk_id: str) -> str:
+        """ID a chunk's text is stored under."""
+        return self._member_of.get(chunk_id, chunk_id)
+
+    def is_stored(self, stored_id: str) -> bool:
+        """Whether an ID holds text shared by a group."""
+        return stored_id in self.groups
+
+    def find(
+        self,
+        text: str,
+        content_hash: str,
+        stored_texts: Callable[[list[str]], dict[str, str]],
+    ) -> tuple[Optional[str], list[str]]:
+        """Find the group a chunk duplicates.
+
+        ``stored_texts`` fetches the text of candidate groups by stored ID.
+        Returns the group's stored ID (or None) and the chunk's band keys.
+        """
+        text_shingles = shingles(text)
+        bands = lsh_bands(minhash(text_shingles))
+        exact = self._by_hash.get(content_hash)
+        if exact is not None:
+            return exact, bands
+
+        candidates = sorted(set().union(*(self._by_band.get(band, ()) for band in bands)))
+        if not candidates:
+            return None, bands
+        best_id, best_score = None, 0.0
+        for stored_id, stored_text in stored_texts(candidates).items():
+            score = jaccard(text_shingles, shingles(stored_text))
+            if score > best_score:
+                best_id, best_score = stored_id, score
+        return (best_id if best_score >= self.threshold else None), bands
+
+    def create(self, stored_id: str, content_hash: str, bands: list[str], filename: str, page: int) -> None:
+        """Start a group whose text is stored under the ID of its first member."""
+        self._touch(stored_id)
+        group = {"hash": content_hash, "bands": bands, "members": {stored_id: [filename, page]}}
+        self.groups[stored_id] = group
+        self._index(stored_id, group)
+
+    def add(self, stored_id: str, chunk_id: str, filename: str, page: int) -> None:
+        """Add a chunk to a group."""
+        self._touch(stored_id)
+        self.groups[stored_id]["members"][chunk_id] = [filename, page]
+        self._member_of[chunk_id] = stored_id
+
+    def release(self, chunk_id: str) -> Optional[str]:
+        """Remove a chunk from its group, dropping the group if it empties.
+
+        Returns the group's stored ID, or None if the chunk was in no group.
+        """
+        stored_id = self._member_of.get(chunk_id)
+        if stored_id is None:
+            return None
+        self._touch(stored_id)
+        group = self.groups[stored_id]
+        del group["members"][chunk_id]
+        del self._member_of[chunk_id]
+        if not group["members"]:
+            self._unindex(stored_id, group)
+            del self.groups[stored_id]
+        return stored_id
+
+    def rehome(self, stored_id: str) -> str:
+        """Move a group to one of its members' IDs so ``stored_id`` can be reused. Returns the new ID."""
+        group = self.groups[stored_id]
+        new_id = next(chunk_id for chunk_id in group["members"] if chunk_id != stored_id)
+        self._touch(stored_id)
+        self._touch(new_id)
+        self._unindex(stored_id, group)
+        del self.groups[stored_id]
+        self.groups[new_id] = group
+        self._index(new_id, group)
+        return new_id
+
+    def sources(self, stored_id: str) -> str:
+        """JSON list of the files and pages a stored chunk appears in."""
+        members = self.groups[stored_id]["members"].values()
+        return json.dumps([{"filename": f, "page": p} for f, p in sorted({(f, p) for f, p in members})])
+
+    def first_source(self, stored_id: str) -> tuple[str, int]:
+        """File and page to show for a stored chunk."""
+        return min((f, p) for f, p in self.groups[stored_id]["members"].values())
+
+    def collapsed(self) -> int:
+        """Number of chunks not stored because they duplicate another."""
+        return sum(len(group["members"]) - 1 for group in self.groups.values())
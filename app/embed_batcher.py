@@ -0,0 +1,104 @@
+"""Dynamic micro-batching of concurrent query embeddings."""
+
+import asyncio
+import contextvars
+import logging
+import time
+from collections import Counter
+from typing import Awaitable, Callable, Optional
+
+from app.config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingBatcher:
+    """Combine concurrent single-text embedding calls into batched requests.
+
+    The first call starts a window of ``window_ms`` milliseconds; every call
+    arriving within it joins the same request, which is sent when the window
+    closes or as soon as ``max_batch`` distinct texts are waiting. Identical
+    texts in a batch are embedded once. Results are handed back to each
+    caller in order; if the request fails, every caller in it gets the error.
+    """
+
+    def __init__(
+        self,
+        embed_batch: Callable[[list[str]], Awaitable[list[list[float]]]],
+        window_ms: float = Config.QUERY_EMBED_BATCH_WINDOW_MS,
+        max_batch: int = Config.QUERY_EMBED_BATCH_MAX,
+    ):
+        """Initialize the batcher around a batch embedding function."""
+        self.embed_batch = embed_batch
+        self.window = window_ms / 1000
+        self.max_batch = max(max_batch, 1)
+        self._pending: dict[str, list[tuple[asyncio.Future, float]]] = {}
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._in_flight: set[asyncio.Task] = set()  # keeps running requests referenced
+
+        self.batches = 0
+        self.calls = 0
+        self.batch_sizes: Counter[int] = Counter()
+        self.total_delay = 0.0
+        self.max_delay = 0.0
+
+    async def embed(self, text: str) -> list[float]:
+        """Embed one text as part of the next batch."""
+        future = asyncio.get_running_loop().create_future()
+        self._pending.setdefault(text, []).append((future, time.monotonic()))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        """Send everything waiting as one request."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, {}
+
+        now = time.monotonic()
+        delays = [now - queued for waiters in batch.values() for _, queued in waiters]
+        self.batches += 1
+        self.calls += len(delays)
+        self.batch_sizes[len(delays)] += 1
+        self.total_delay += sum(delays)
+        self.max_delay = max(self.max_delay, *delays)
+
+        # The request is shared, so it must not inherit the deadline of whichever caller flushed it
+        task = asyncio.create_task(self._send(batch), context=contextvars.Context())
+        self._in_flight.add(task)
+        task.add_done_callback(self._in_flight.discard)
+
+    async def _send(self, batch: dict[str, list[tuple[asyncio.Future, float]]]) -> None:
+        """Embed a batch and resolve its callers."""
+        texts = list(batch)
+        try:
+            embeddings = await self.embed_batch(texts)
+        except Exception as e:
+            for waiters in batch.values():
+                for future, _ in waiters:
+                    if not future.done():
+                        future.set_exception(e)
+            return
+        for text, embedding in zip(texts, embeddings):
+            for future, _ in batch[text]:
+                # A caller may have been cancelled while waiting
+                if not future.done():
+                    future.set_result(embedding)
+
+    def stats(self) -> dict:
+        """Batch size and queueing delay metrics."""
+        return {
+            "batches": self.batches,
+            "calls": self.calls,
+            "avg_batch_size": round(self.calls / self.batches, 2) if self.batches else 0.0,
+            "max_batch_size": max(self.batch_sizes, default=0),
+            "batch_sizes": dict(sorted(self.batch_sizes.items())),
+            "avg_delay_ms": round(self.total_delay / self.calls * 1000, 2) if self.calls else 0.0,
+            "max_delay_ms": round(self.max_delay * 1000, 2),
+        }
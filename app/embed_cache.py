@@ -0,0 +1,320 @@
+"""Embedding caches: query embeddings (in-memory LRU + SQLite) and a content-addressed chunk store."""
+
+import hashlib
+import logging
+import re
+import time
+from array import array
+from collections import OrderedDict
+from pathlib import Path
+from typing import Awaitable, Callable, Optional
+
+from app.config import Config
+from app.db import SQLiteStore
+
+logger = logging.getLogger(__name__)
+
+# Check the on-disk size limit once per this many writes
+_EVICT_EVERY = 100
+
+_TRAILING_PUNCT_RE = re.compile(r"[\s.?!]+$")
+
+
+def normalize_query(text: str) -> str:
+    """Normalize a question for cache lookups (case, whitespace, trailing punctuation)."""
+    text = " ".join(text.casefold().split())
+    return _TRAILING_PUNCT_RE.sub("", text)
+
+
+def query_cache_key(text: str, model: str) -> str:
+    """Cache key for a question embedded with a given model."""
+    return hashlib.sha256(f"{model}\n{normalize_query(text)}".encode()).hexdigest()
+
+
+def chunk_embedding_key(text: str, model: str) -> str:
+    """Content address of a chunk embedding: hash of (model, chunk text)."""
+    return hashlib.sha256(f"{model}\n{text}".encode()).hexdigest()
+
+
+def pack_embedding(embedding: list[float]) -> bytes:
+    """Encode an embedding as a float32 blob."""
+    return array("f", embedding).tobytes()
+
+
+def unpack_embedding(blob: bytes) -> list[float]:
+    """Decode a float32 blob into an embedding."""
+    values = array("f")
+    values.frombytes(blob)
+    return values.tolist()
+
+
+class EmbeddingCacheStore(SQLiteStore):
+    """On-disk embedding store with float32 blobs.
+
+    Holds two tables: ``query_embeddings`` for user questions and
+    ``chunk_embeddings`` for document chunks, keyed by ``chunk_embedding_key``
+    so identical text is never embedded twice with the same model.
+    """
+
+    def __init__(self, db_path: Path = Config.EMBED_CACHE_PATH):
+        """Initialize the store."""
+        super().__init__(db_path)
+
+    def _init_schema(self) -> None:
+        """Initialize database schema."""
+        with self._conn:
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS query_embeddings (
+                    key TEXT PRIMARY KEY,
+                    model TEXT NOT NULL,
+                    embedding BLOB NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_used REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_query_embeddings_last_used ON query_embeddings (last_used)"
+            )
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS chunk_embeddings (
+                    key TEXT PRIMARY KEY,
+                    model TEXT NOT NULL,
+                    embedding BLOB NOT NULL,
+                    created_at REAL NOT NULL
+                )
+                """
+            )
+
+    async def get_query(self, key: str, max_age: float) -> Optional[list[float]]:
+        """Get a query embedding newer than max_age seconds, or None."""
+        return await self._run(self._get_query, key, max_age)
+
+    def _get_query(self, key: str, max_age: float) -> Optional[list[float]]:
+        now = time.time()
+        row = self._conn.execute(
+            "SELECT embedding, created_at FROM query_embeddings WHERE key = ?", (key,)
+        ).fetchone()
+        if not row:
+            return None
+        with self._conn:
+            if now - row["created_at"] > max_age:
+                self._conn.execute("DELETE FROM query_embeddings WHERE key = ?", (key,))
+                return None
+            self._conn.execute(
+                "UPDATE query_embeddings SET last_used = ? WHERE key = ?", (now, key)
+            )
+        return unpack_embedding(row["embedding"])
+
+    async def put_query(self, key: str, model: str, embedding: list[float]) -> None:
+        """Store a query embedding."""
+        await self._run(self._put_query, key, model, pack_embedding(embedding))
+
+    def _put_query(self, key: str, model: str, blob: bytes) -> None:
+        now = time.time()
+        with self._conn:
+            self._conn.execute(
+                """
+                INSERT OR REPLACE INTO query_embeddings (key, model, embedding, created_at, last_used)
+                VALUES (?, ?, ?, ?, ?)
+                """,
+                (key, model, blob, now, now),
+            )
+
+    async def evict_queries(self, max_entries: int, max_age: float) -> int:
+        """Drop expired entries, then least recently used ones above max_entries."""
+        return await self._run(self._evict_queries, max_entries, max_age)
+
+    def _evict_queries(self, max_entries: int, max_age: float) -> int:
+        with self._conn:
+            removed = self._conn.execute(
+                "DELETE FROM query_embeddings WHERE created_at < ?", (time.time() - max_age,)
+            ).rowcount
+            count = self._conn.execute("SELECT COUNT(*) FROM query_embeddings").fetchone()[0]
+            if count > max_entries:
+                removed += self._conn.execute(
+                    """
+                    DELETE FROM query_embeddings WHERE key IN (
+                        SELECT key FROM query_embeddings ORDER BY last_used ASC LIMIT ?
+                    )
+                    """,
+                    (count - max_entries,),
+                ).rowcount
+        return removed
+
+    async def get_chunks(self, keys: list[str]) -> dict[str, list[float]]:
+        """Get stored chunk embeddings for the given keys (missing keys are omitted)."""
+        return await self._run(self._get_chunks, keys)
+
+    def _get_chunks(self, keys: list[str]) -> dict[str, list[float]]:
+        found: dict[str, list[float]] = {}
+        # Stay well below SQLite's bound-parameter limit
+        for start in range(0, len(keys), 500):
+            part = keys[start:start + 500]
+            placeholders = ",".join("?" * len(part))
+            rows = self._conn.execute(
+                f"SELECT key, embedding FROM chunk_embeddings WHERE key IN ({placeholders})",
+                part,
+            ).fetchall()
+            found.update((row["key"], unpack_embedding(row["embedding"])) for row in rows)
+        return found
+
+    async def put_chunks(self, model: str, items: dict[str, list[float]]) -> None:
+        """Store chunk embeddings by key."""
+        records = [(key, model, pack_embedding(emb), time.time()) for key, emb in items.items()]
+        await self._run(self._put_chunks, records)
+
+    def _put_chunks(self, records: list[tuple]) -> None:
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO chunk_embeddings (key, model, embedding, created_at) VALUES (?, ?, ?, ?)",
+                records,
+            )
+
+    async def compact_chunks(self, referenced_keys: set[str]) -> int:
+        """Delete chunk embeddings whose key is not in referenced_keys. Returns rows removed."""
+        return await self._run(self._compact_chunks, list(referenced_keys))
+
+    def _compact_chunks(self, referenced_keys: list[str]) -> int:
+        with self._conn:
+            self._conn.execute("CREATE TEMP TABLE IF NOT EXISTS live_keys (key TEXT PRIMARY KEY)")
+            self._conn.execute("DELETE FROM live_keys")
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO live_keys (key) VALUES (?)",
+                ((key,) for key in referenced_keys),
+            )
+            removed = self._conn.execute(
+                "DELETE FROM chunk_embeddings WHERE key NOT IN (SELECT key FROM live_keys)"
+            ).rowcount
+            self._conn.execute("DELETE FROM live_keys")
+        return removed
+
+
+class QueryEmbeddingCache:
+    """Cache query embeddings by normalized question text and embedding model.
+
+    Lookups check an in-memory LRU first, then the on-disk store. Entries
+    expire after ``ttl`` seconds; the disk tier is trimmed to ``max_entries``
+    by least recent use.
+    """
+
+    def __init__(
+        self,
+        store: EmbeddingCacheStore,
+        memory_size: int = Config.EMBED_CACHE_MEMORY_SIZE,
+        max_entries: int = Config.EMBED_CACHE_MAX_ENTRIES,
+        ttl: float = Config.EMBED_CACHE_TTL_SECONDS,
+    ):
+        """Initialize the cache."""
+        self.store = store
+        self.memory_size = memory_size
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._memory: OrderedDict[str, tuple[list[float], float]] = OrderedDict()
+        self._writes = 0
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    async def get(self, text: str, model: Optional[str] = None) -> Optional[list[float]]:
+        """Get a cached embedding for a question, or None."""
+        key = query_cache_key(text, model or Config.OR_EMBED_MODEL)
+
+        entry = self._memory.get(key)
+        if entry is not None:
+            embedding, created_at = entry
+            if time.time() - created_at <= self.ttl:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return embedding
+            del self._memory[key]
+
+        try:
+            embedding = await self.store.get_query(key, self.ttl)
+        except Exception as e:
+            logger.warning(f"Embedding cache read failed: {e}")
+            embedding = None
+
+        if embedding is None:
+            self.misses += 1
+            return None
+
+        self.disk_hits += 1
+        self._remember(key, embedding)
+        return embedding
+
+    async def put(self, text: str, embedding: list[float], model: Optional[str] = None) -> None:
+        """Cache the embedding for a question."""
+        model = model or Config.OR_EMBED_MODEL
+        key = query_cache_key(text, model)
+        self._remember(key, embedding)
+
+        try:
+            await self.store.put_query(key, model, embedding)
+            self._writes += 1
+            if self._writes % _EVICT_EVERY == 0:
+                removed = await self.store.evict_queries(self.max_entries, self.ttl)
+                if removed:
+                    logger.info(f"Evicted {removed} query embeddings from disk cache")
+        except Exception as e:
+            logger.warning(f"Embedding cache write failed: {e}")
+
+    async def get_or_embed(
+        self,
+        text: str,
+        embed: Callable[[str], Awaitable[list[float]]],
+        model: Optional[str] = None,
+    ) -> list[float]:
+        """Return the cached embedding, or compute it with ``embed`` and cache it."""
+        embedding = await self.get(text, model)
+        if embedding is None:
+            embedding = await embed(text)
+            await self.put(text, embedding, model)
+        return embedding
+
+    def _remember(self, key: str, embedding: list[float]) -> None:
+        """Put an entry into the in-memory LRU."""
+        self._memory[key] = (embedding, time.time())
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def stats(self) -> dict:
+        """Hit/miss counters."""
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        hits = self.memory_hits + self.disk_hits
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+            "memory_entries": len(self._memory),
+        }
+
+
+# Process-lifetime instance, managed by init_query_cache() / close_query_cache()
+_query_cache: Optional[QueryEmbeddingCache] = None
+
+
+def init_query_cache() -> QueryEmbeddingCache:
+    """Create the shared query embedding cache (call once at startup)."""
+    global _query_cache
+    if _query_cache is None:
+        _query_cache = QueryEmbeddingCache(EmbeddingCacheStore())
+    return _query_cache
+
+
+async def close_query_cache() -> None:
+    """Close the shared query embedding cache (call once at shutdown)."""
+    global _query_cache
+    if _query_cache is not None:
+        await _query_cache.store.close()
+        _query_cache = None
+
+
+def get_query_cache() -> Optional[QueryEmbeddingCache]:
+    """Get the shared query embedding cache, if initialized."""
+    return _query_cache
@@ -0,0 +1,212 @@
+"""Event channel between worker processes, for keeping their caches and job queue in step."""
+
+import asyncio
+import json
+import logging
+import os
+import socket
+from pathlib import Path
+from typing import Callable, Optional
+
+from app.config import Config
+
+logger = logging.getLogger(__name__)
+
+EVENT_KB_CHANGED = "kb_changed"  # the index changed: reload it, drop cached answers
+EVENT_JOB_QUEUED = "job_queued"  # a job was queued: wake the job worker
+EVENT_JOB_CANCEL = "job_cancel"  # cancel a running job (payload: job_id)
+
+# Identifies this process; a process never handles its own events
+_SENDER = f"{socket.gethostname()}:{os.getpid()}"
+
+Handler = Callable[[dict], None]
+
+
+class EventChannel:
+    """Publish events to the other worker processes and handle theirs.
+
+    This base class is the single-process channel: publishing reaches no one.
+    Subclasses deliver events through a shared backend. Handlers run on the
+    event loop and should be quick; a failing handler is logged and skipped.
+    """
+
+    def __init__(self):
+        """Initialize with no handlers."""
+        self._handlers: dict[str, list[Handler]] = {}
+        self.published = 0
+        self.received = 0
+
+    def subscribe(self, event: str, handler: Handler) -> None:
+        """Call ``handler(payload)`` when another process publishes ``event``."""
+        self._handlers.setdefault(event, []).append(handler)
+
+    async def start(self) -> None:
+        """Begin receiving events."""
+
+    async def publish(self, event: str, payload: Optional[dict] = None) -> None:
+        """Send an event to the other processes."""
+        self.published += 1
+        await self._send(json.dumps({"event": event, "payload": payload or {}, "sender": _SENDER}))
+
+    async def _send(self, message: str) -> None:
+        """Deliver a serialized event (no-op for a single process)."""
+
+    def _dispatch(self, message: str) -> None:
+        """Run the handlers for a serialized event from another process."""
+        try:
+            data = json.loads(message)
+        except ValueError:
+            logger.warning(f"Ignoring malformed event: {message[:100]!r}")
+            return
+        if data.get("sender") == _SENDER:
+            return
+        self.received += 1
+        for handler in self._handlers.get(data.get("event"), ()):
+            try:
+                handler(data.get("payload") or {})
+            except Exception as e:
+                logger.error(f"Handler for event {data.get('event')} failed: {e}")
+
+    async def close(self) -> None:
+        """Stop receiving events."""
+
+
+class FileEventChannel(EventChannel):
+    """Events appended as JSON lines to a shared file and tailed by every process.
+
+    A stand-in for Redis when all workers run on one host. Each event is one
+    ``O_APPEND`` write, so lines from different processes do not interleave.
+    """
+
+    def __init__(self, path: Path = Config.EVENTS_PATH, poll_interval: float = Config.EVENTS_POLL_INTERVAL):
+        """Initialize the channel on ``path``."""
+        super().__init__()
+        self.path = path
+        self.poll_interval = poll_interval
+        self._offset = 0
+        self._partial = b""
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        """Start tailing the file from its current end."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.touch()
+        self._offset = self.path.stat().st_size
+        if self._task is None:
+            self._task = asyncio.create_task(self._tail())
+
+    async def _send(self, message: str) -> None:
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, (message + "\n").encode())
+        finally:
+            os.close(fd)
+
+    async def _tail(self) -> None:
+        """Read and dispatch new lines every poll_interval."""
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                self._read_new()
+            except OSError as e:
+                logger.warning(f"Could not read events from {self.path}: {e}")
+
+    def _read_new(self) -> None:
+        """Dispatch the complete lines appended since the last read."""
+        size = self.path.stat().st_size
+        if size < self._offset:
+            # Truncated (e.g. by a supervisor restart): start over
+            self._offset, self._partial = 0, b""
+        if size == self._offset:
+            return
+        with open(self.path, "rb") as f:
+            f.seek(self._offset)
+            data = self._partial + f.read(size - self._offset)
+        self._offset = size
+        *lines, self._partial = data.split(b"\n")
+        for line in lines:
+            if line:
+                self._dispatch(line.decode())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+
+class RedisEventChannel(EventChannel):
+    """Events over Redis pub/sub (requires ``pip install redis``)."""
+
+    CHANNEL = "jgglsup:events"
+
+    def __init__(self, url: str = Config.REDIS_URL):
+        """Initialize the channel (connects in start())."""
+        super().__init__()
+        self.url = url
+        self._redis = None
+        self._pubsub = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        """Connect and subscribe."""
+        from redis import asyncio as redis
+
+        self._redis = redis.from_url(self.url)
+        self._pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+        await self._pubsub.subscribe(self.CHANNEL)
+        if self._task is None:
+            self._task = asyncio.create_task(self._listen())
+
+    async def _send(self, message: str) -> None:
+        await self._redis.publish(self.CHANNEL, message)
+
+    async def _listen(self) -> None:
+        """Dispatch messages as they arrive, reconnecting after errors."""
+        while True:
+            try:
+                async for message in self._pubsub.listen():
+                    data = message["data"]
+                    self._dispatch(data.decode() if isinstance(data, bytes) else data)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Redis event subscription failed, retrying: {e}")
+                await asyncio.sleep(1)
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._pubsub is not None:
+            await self._pubsub.aclose()
+            await self._redis.aclose()
+            self._pubsub = self._redis = None
+
+
+# Process-lifetime instance, managed by init_event_channel() / close_event_channel()
+_channel: Optional[EventChannel] = None
+
+
+async def init_event_channel() -> EventChannel:
+    """Create and start the shared event channel for EVENTS_BACKEND (call once at startup)."""
+    global _channel
+    if _channel is None:
+        if Config.EVENTS_BACKEND == "redis":
+            _channel = RedisEventChannel()
+        elif Config.EVENTS_BACKEND == "file":
+            _channel = FileEventChannel()
+        else:
+            _channel = EventChannel()
+        await _channel.start()
+        logger.info(f"Event channel ready ({Config.EVENTS_BACKEND})")
+    return _channel
+
+
+async def close_event_channel() -> None:
+    """Stop the shared event channel (call once at shutdown)."""
+    global _channel
+    if _channel is not None:
+        await _channel.close()
+        _channel = None
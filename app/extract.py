@@ -0,0 +1,118 @@
+"""Text extraction and chunking.
+
+Kept free of vector store and network imports so it can run cheaply in
+ingestion worker processes.
+"""
+
+import hashlib
+import logging
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
+
+from pypdf import PdfReader
+
+from app.chunking import chunk_text, get_chunker  # noqa: F401 (chunk_text re-exported)
+from app.manifest import hash_text
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_EXTENSIONS = {".pdf", ".txt", ".md"}
+
+
+def iter_pdf_pages(pdf_path: Path, start: int = 1, stop: Optional[int] = None) -> Iterator[tuple[int, str]]:
+    """Yield ``(page number, text)`` for non-empty PDF pages, one page at a time.
+
+    ``start`` and ``stop`` select a 1-based, half-open page range. Read
+    errors are raised: a page that could not be read must not look empty.
+    """
+    reader = PdfReader(pdf_path)
+    last = len(reader.pages) if stop is None else min(stop - 1, len(reader.pages))
+    for page_num in range(start, last + 1):
+        text = reader.pages[page_num - 1].extract_text()
+        if text.strip():
+            yield page_num, text
+
+
+def count_pdf_pages(pdf_path: Path) -> int:
+    """Number of pages in a PDF."""
+    return len(PdfReader(pdf_path).pages)
+
+
+def extract_pdf_text(pdf_path: Path) -> dict[int, str]:
+    """Extract text from PDF by page."""
+    pages: dict[int, str] = {}
+    try:
+        for page_num, text in iter_pdf_pages(pdf_path):
+            pages[page_num] = text
+    except Exception as e:
+        logger.error(f"Error reading PDF {pdf_path}: {e}")
+    logger.info(f"Extracted {len(pages)} pages from {pdf_path.name}")
+    return pages
+
+
+def extract_text_file(text_path: Path) -> str:
+    """Extract text from plain text file."""
+    try:
+        content = text_path.read_text(encoding="utf-8")
+        logger.info(f"Read text file {text_path.name}")
+        return content
+    except Exception as e:
+        logger.error(f"Error reading text file {text_path}: {e}")
+        return ""
+
+
+def create_chunk_id(filename: str, page: int, chunk_num: int) -> str:
+    """Generate unique chunk ID."""
+    data = f"{filename}:p{page}:c{chunk_num}".encode()
+    return hashlib.md5(data).hexdigest()[:12]
+
+
+def chunk_page(filename: str, page_num: int, page_text: str) -> list[dict]:
+    """Chunk one page of text into chunk dicts with the configured chunker."""
+    chunks = get_chunker()(page_text)
+
+    return [
+        {
+            "chunk_id": create_chunk_id(filename, page_num, chunk_num),
+            "text": chunk,
+            "filename": filename,
+            "page": page_num,
+            "content_hash": hash_text(chunk),
+        }
+        for chunk_num, chunk in enumerate(chunks)
+    ]
+
+
+def count_pages(file_path: Path) -> int:
+    """Number of pages ingestion will walk through (text files are one page)."""
+    if file_path.suffix.lower() == ".pdf":
+        return count_pdf_pages(file_path)
+    return 1
+
+
+def extract_chunks(file_path: Path, start: int = 1, stop: Optional[int] = None) -> tuple[int, list[dict]]:
+    """Extract and chunk a page range of a document.
+
+    Returns (non-empty pages read, chunk dicts). Lets callers walk a large PDF
+    a window of pages at a time instead of holding all of its text at once.
+    Read errors are raised, so the caller never mistakes an unreadable page
+    for a removed one.
+    """
+    if file_path.suffix.lower() == ".pdf":
+        pages: Iterable[tuple[int, str]] = iter_pdf_pages(file_path, start, stop)
+    elif file_path.suffix.lower() in [".txt", ".md"] and start == 1:
+        pages = [(1, file_path.read_text(encoding="utf-8"))]
+    else:
+        pages = []
+
+    pages_read = 0
+    chunks_out: list[dict] = []
+    for page_num, page_text in pages:
+        pages_read += 1
+        chunks_out.extend(chunk_page(file_path.name, page_num, page_text))
+    return pages_read, chunks_out
+
+
+def build_chunks(file_path: Path) -> tuple[int, list[dict]]:
+    """Extract and chunk a whole document. Returns (page count, chunk dicts)."""
+    return extract_chunks(file_path)
@@ -0,0 +1,103 @@
+"""FSM storage backends shared by worker processes."""
+
+import json
+import logging
+from pathlib import Path
+from typing import Any, Mapping, Optional
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+
+from app.config import Config
+from app.db import SQLiteStore
+
+logger = logging.getLogger(__name__)
+
+
+def _storage_key(key: StorageKey) -> str:
+    """Flatten a StorageKey into one string."""
+    parts = (
+        key.bot_id,
+        key.chat_id,
+        key.user_id,
+        key.thread_id,
+        getattr(key, "business_connection_id", None),
+        key.destiny,
+    )
+    return ":".join("" if part is None else str(part) for part in parts)
+
+
+class SQLiteStorage(SQLiteStore, BaseStorage):
+    """FSM states and data in a SQLite file that every worker process opens.
+
+    A stand-in for Redis when all workers run on one host: WAL mode lets the
+    processes read concurrently, and writes are single-row upserts.
+    """
+
+    def __init__(self, db_path: Path = Config.FSM_STORAGE_PATH):
+        """Open the storage file."""
+        super().__init__(db_path)
+
+    def _init_schema(self) -> None:
+        with self._conn:
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS fsm (
+                    key TEXT PRIMARY KEY,
+                    state TEXT,
+                    data TEXT NOT NULL DEFAULT '{}'
+                )
+                """
+            )
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        """Set the state for a key."""
+        value = state.state if isinstance(state, State) else state
+        await self._run(self._set_state, _storage_key(key), value)
+
+    def _set_state(self, key: str, state: Optional[str]) -> None:
+        with self._conn:
+            self._conn.execute(
+                "INSERT INTO fsm (key, state) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET state = excluded.state",
+                (key, state),
+            )
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        """Get the state for a key."""
+        return await self._run(self._get_column, _storage_key(key), "state")
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        """Replace the data for a key."""
+        await self._run(self._set_data, _storage_key(key), json.dumps(dict(data)))
+
+    def _set_data(self, key: str, data: str) -> None:
+        with self._conn:
+            self._conn.execute(
+                "INSERT INTO fsm (key, data) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET data = excluded.data",
+                (key, data),
+            )
+
+    async def get_data(self, key: StorageKey) -> dict[str, Any]:
+        """Get the data for a key."""
+        data = await self._run(self._get_column, _storage_key(key), "data")
+        return json.loads(data) if data else {}
+
+    def _get_column(self, key: str, column: str) -> Optional[str]:
+        row = self._conn.execute(f"SELECT {column} FROM fsm WHERE key = ?", (key,)).fetchone()
+        return row[column] if row else None
+
+
+def create_fsm_storage() -> BaseStorage:
+    """FSM storage for FSM_STORAGE: per-process memory, Redis, or a shared SQLite file."""
+    if Config.FSM_STORAGE == "redis":
+        try:
+            from aiogram.fsm.storage.redis import RedisStorage
+        except ImportError as e:
+            raise RuntimeError("FSM_STORAGE=redis requires the 'redis' package (pip install redis)") from e
+        logger.info("FSM storage: Redis")
+        return RedisStorage.from_url(Config.REDIS_URL)
+    if Config.FSM_STORAGE == "file":
+        logger.info(f"FSM storage: {Config.FSM_STORAGE_PATH}")
+        return SQLiteStorage()
+    return MemoryStorage()
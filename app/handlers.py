@@ -2,23 +2,34 @@
 
 import json
 import logging
+import time
+from contextlib import aclosing
 from typing import Optional
 
 from aiogram import F, Router
-from aiogram.filters import Command, CommandStart
+from aiogram.filters import Command, CommandObject, CommandStart
 from aiogram.types import Message
 
+from app.admission import AdmissionController, AdmissionRejected
+from app.answer_cache import SemanticAnswerCache
+from app.coalesce import SingleFlight, question_key
 from app.config import Config
-from app.db import get_db
-from app.ingest import ingest_document
-from app.openrouter import get_openrouter_client
+from app.db import Database
+from app.deadline import STAGE_CHAT, STAGE_EMBED, STAGE_SEARCH, Deadline, DeadlineExceeded
+from app.jobs import JOB_INGEST, JOB_REINDEX, UPLOAD_FAILED, JobWorker, format_job
+from app.logsink import InteractionLogSink
+from app.openrouter import OpenRouterClient, get_openrouter_client
+from app.prefilter import SENSITIVE, SOURCE_REQUEST, get_prefilter
+from app.progress import ReplyFanout, StreamingReply
 from app.prompts import (
     SYSTEM_PROMPT,
     ESCALATION_TEMPLATE,
     SOURCES_REFUSAL,
     SENSITIVE_REFUSAL,
 )
-from app.rag import get_rag_system
+from app.rag import RAGSystem
+from app.resilience import resilience_stats
+from app.sanitizer import AnswerSanitizer, sanitize_user_answer
 
 logger = logging.getLogger(__name__)
 
@@ -35,108 +46,188 @@ def is_private_chat(message: Message) -> bool:
     return message.chat.type == "private"
 
 
-def is_source_request(text: str) -> bool:
-    """Detect if user is asking for sources or documents."""
-    # Always ask for language, even if set (to reset)
-    keywords = [
-        "sources", "references", "links", "documentation", "docs",
-        "where did you get", "source", "cite", "citation",
-    ]
-    text_lower = text.lower()
-    return any(keyword in text_lower for keyword in keywords)
-
-
-def is_sensitive_topic(text: str) -> bool:
-    """Detect if user is asking about sensitive topics."""
-    keywords = [
-        "forging", "forge", "fake", "faking", "fake doc", "fake identity",
-        "evading", "evade", "sanctions", "bypass", "bypassing", "circumvent",
-        "laundering", "money launder", "aml", "kyc bypass", "skip kyc",
-        "tax", "legal advice", "lawyer", "attorney", "law", "crypto law",
-        "illegal", "legality", "legal question", "is it legal"
-    ]
-    text_lower = text.lower()
-    return any(keyword in text_lower for keyword in keywords)
+class Answer:
+    """Outcome of answering a question, shared by everyone who asked it at the same time."""
 
+    __slots__ = ("status", "text", "internal_sources", "retrieval_scores")
 
-def normalize_answer_style(text: str) -> Optional[str]:
-    """
-    Enforce support-style output: no bold, no emojis, clean formatting.
-    
-    Returns:
-        - Cleaned text if compliant
-        - None if violations detected (should escalate)
-    """
-    import re
-    import unicodedata
-    
-    # Check for remaining markdown emphasis markers that shouldn't be there
-    has_bold = '**' in text or '__' in text
-    
-    # Check for emojis (Unicode categories S and C)
-    has_emoji = any(unicodedata.category(char)[0] in ('S', 'C') 
-                    for char in text 
-                    if char not in (' ', '\n', '\t', '-', '.', ',', ':', ';', '!', '?', '(', ')', '[', ']', '{', '}', '/', '\\', '"', "'", '"', '"', ''', '''))
-    
-    # If strong violations, escalate
-    if has_bold or has_emoji:
-        logger.warning(f"Style violation detected (bold={has_bold}, emoji={has_emoji}), escalating")
-        return None
-    
-    return text
+    def __init__(
+        self,
+        status: str,
+        text: str,
+        internal_sources: Optional[str] = None,
+        retrieval_scores: Optional[str] = None,
+    ):
+        self.status = status
+        self.text = text
+        self.internal_sources = internal_sources
+        self.retrieval_scores = retrieval_scores
 
 
-def sanitize_user_answer(text: str) -> str:
-    """
-    Sanitize LLM output to remove citations, sources, and formatting markers.
-    Only escalates (returns empty) on strong source leakage patterns.
-    
-    Returns:
-        - Cleaned text if safe
-        - Empty string if strong source leakage detected (triggers escalation)
+def escalation(reason: str) -> Answer:
+    """Escalate to staff; reason is logged as internal_sources."""
+    return Answer("escalated", ESCALATION_TEMPLATE, internal_sources=reason)
+
+
+async def answer_question(
+    user_text: str,
+    user_id: int,
+    rag: RAGSystem,
+    answer_cache: Optional[SemanticAnswerCache],
+    fanout: Optional[ReplyFanout],
+    deadline: Deadline,
+) -> Answer:
+    """Retrieve context and produce a sanitized answer (or an escalation).
+
+    If ``fanout`` is given, the LLM answer is streamed into it. Each stage
+    runs within what is left of ``deadline``. Errors become escalations, so
+    the result can be shared with every waiting user.
     """
-    import re
-    
-    # Check for STRONG source leakage patterns only (not just file extensions in normal text)
-    has_sources_header = 'Sources:' in text or 'References:' in text
-    has_internal_filename = any(re.search(rf'\b[\w-]+{ext}\b', text, re.IGNORECASE) 
-                                 for ext in ['.pdf', '.md', '.txt', '.doc', '.docx'])
-    
-    # Only escalate if we have CLEAR source leakage
-    if has_sources_header or has_internal_filename:
-        logger.warning("Strong source leakage pattern detected - returning empty string to force escalation")
-        return ""
-    
-    cleaned = text
-    
-    # Remove markdown emphasis markers
-    cleaned = cleaned.replace('**', '').replace('__', '')
-    
-    # Remove bracket citations [anything]
-    cleaned = re.sub(r'\[.*?\]', '', cleaned)
-    
-    # Remove emojis and non-ASCII symbols (keep basic punctuation)
-    cleaned = ''.join(
-        char for char in cleaned
-        if ord(char) < 128 or char in ('\n', '\t')  # Keep ASCII + line breaks
+    # The version the answer is built from; the index may change while the LLM runs
+    kb_version = rag.kb_version
+
+    # Retrieve relevant chunks
+    try:
+        async with deadline.stage(STAGE_EMBED):
+            query_embedding = await rag.embed_query(user_text)
+        async with deadline.stage(STAGE_SEARCH):
+            retrieved_chunks = await rag.retrieve(
+                query=user_text,
+                top_k=Config.RAG_TOP_K,
+                threshold=Config.RAG_SIMILARITY_THRESHOLD,
+                query_embedding=query_embedding,
+            )
+    except DeadlineExceeded as e:
+        return escalation(f"deadline:{e.stage}")
+    except Exception as e:
+        logger.error(f"RAG retrieval failed: {e}")
+        return escalation("retrieval_error")
+
+    # Check if we have relevant chunks
+    if not retrieved_chunks:
+        logger.info(f"No chunks retrieved for user {user_id}: {user_text}")
+        return escalation("no_chunks")
+
+    # Build context from retrieved chunks (internal only, NOT for user)
+    context = "\n\n".join(
+        [
+            f"[{chunk['metadata']['filename']}:p{chunk['metadata']['page']}]\n{chunk['text']}"
+            for chunk in retrieved_chunks
+        ]
     )
-    
-    # Clean up excessive whitespace
-    cleaned = re.sub(r'\s+', ' ', cleaned).strip()
-    
-    return cleaned
+
+    # Store internal metadata for logging (NOT sent to user)
+    internal_sources = json.dumps([
+        {
+            "filename": chunk['metadata']['filename'],
+            "page": chunk['metadata']['page'],
+            "chunk_id": chunk['metadata']['chunk_id'],
+            "similarity": chunk['similarity'],
+            **({"sources": json.loads(chunk['metadata']['sources'])} if "sources" in chunk['metadata'] else {}),
+        }
+        for chunk in retrieved_chunks
+    ])
+
+    retrieval_scores = json.dumps([
+        {
+            "chunk_id": chunk['metadata']['chunk_id'],
+            "similarity": round(chunk['similarity'], 3),
+        }
+        for chunk in retrieved_chunks
+    ])
+
+    # Reuse the answer to a near-identical question over the same chunks
+    chunk_ids = [chunk["chunk_id"] for chunk in retrieved_chunks]
+    if answer_cache is not None:
+        cached_answer = answer_cache.lookup(query_embedding, chunk_ids, kb_version)
+        if cached_answer:
+            logger.info(f"Answer for user {user_id} served from answer cache")
+            return Answer("answered", cached_answer, internal_sources, retrieval_scores)
+
+    # Call LLM
+    or_client = get_openrouter_client()
+    try:
+        messages = [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {
+                "role": "user",
+                "content": f"Context from knowledge base:\n\n{context}\n\n---\n\nUser question: {user_text}",
+            },
+        ]
+
+        # Sanitize ONLY LLM-generated responses to remove citations, sources, formatting
+        # Static messages (/start, /help, templates) are never sanitized
+        async with deadline.stage(STAGE_CHAT, min_seconds=Config.ANSWER_DEADLINE_MIN_CHAT):
+            if fanout is not None:
+                sanitized_response = await stream_answer(or_client, messages, fanout, user_id)
+            else:
+                response = await or_client.chat(
+                    messages=messages,
+                    temperature=0.5,
+                    max_tokens=500,
+                )
+                sanitized_response = sanitize_user_answer(response)
+    except DeadlineExceeded as e:
+        return escalation(f"deadline:{e.stage}")
+    except Exception as e:
+        logger.error(f"LLM call failed: {e}")
+        return escalation("llm_error")
+
+    # Check if strong source leakage was detected (empty string returned)
+    if not sanitized_response:
+        logger.warning(f"Source leakage detected in response for user {user_id}, escalating")
+        return escalation("source_leakage")
+
+    if answer_cache is not None:
+        answer_cache.store(query_embedding, chunk_ids, kb_version, sanitized_response)
+    return Answer("answered", sanitized_response, internal_sources, retrieval_scores)
+
+
+async def stream_answer(
+    or_client: OpenRouterClient,
+    messages: list[dict],
+    reply: ReplyFanout,
+    user_id: int,
+) -> str:
+    """Stream the LLM answer into the replies, sanitizing it as it arrives.
+
+    Returns the sanitized answer, or an empty string if source leakage was
+    detected, in which case the stream is stopped right there.
+    """
+    sanitizer = AnswerSanitizer()
+    started = time.monotonic()
+    first_token = True
+    stream = or_client.chat_stream(messages=messages, temperature=0.5, max_tokens=500)
+    async with aclosing(stream):
+        async for delta in stream:
+            if first_token:
+                first_token = False
+                logger.info(f"First LLM token for user {user_id} after {time.monotonic() - started:.2f}s")
+            reply.append(sanitizer.feed(delta))
+            if sanitizer.leaked:
+                return ""
+    reply.append(sanitizer.finish())
+    logger.info(f"LLM answer for user {user_id} streamed in {time.monotonic() - started:.2f}s")
+    return "" if sanitizer.leaked else sanitizer.text
+
+
+async def send_final(message: Message, reply: Optional[StreamingReply], text: str) -> None:
+    """Send the final answer or escalation, replacing any partially streamed answer."""
+    if reply is not None:
+        await reply.finish(text)
+    else:
+        await message.answer(text)
 
 
 @router.message(CommandStart())
-async def cmd_start(message: Message) -> None:
+async def cmd_start(message: Message, db: Database) -> None:
     """Handle /start command."""
     user_id = message.from_user.id
-    db = get_db()
-    user = db.get_user(user_id)
+    user = await db.get_user(user_id)
 
     if not user:
         # Create new user
-        db.set_user_language(user_id, "en")
+        await db.set_user_language(user_id, "en")
 
     await message.answer("Hi! My name is Jiggley. I'm an artificial intelligence assistant that will help you set everything up.")
     await message.answer("Tell me which exchange/platform you're using, what step you're on, and what error you see (a screenshot helps).")
@@ -150,7 +241,10 @@ async def cmd_help(message: Message) -> None:
         "Just ask a question and I'll try to answer based on the provided materials.\n"
         "If I'm not sure, I'll escalate to support.\n\n"
         "/upload_doc — Upload a document (admin only)\n"
-        "/reindex — Reindex all documents (admin only)"
+        "/reindex — Reindex changed documents, /reindex full to rebuild (admin only)\n"
+        "/jobs — Show ingest jobs, /jobs cancel <id> to cancel one (admin only)\n"
+        "/stats — Show index and cache statistics (admin only)\n"
+        "/compact_embeddings — Drop unused stored embeddings (admin only)"
     )
     await message.answer(help_text)
 
@@ -167,38 +261,87 @@ async def cmd_upload_doc(message: Message) -> None:
 
 
 @router.message(Command("reindex"))
-async def cmd_reindex(message: Message) -> None:
-    """Handle /reindex command (admin only, private chat)."""
+async def cmd_reindex(message: Message, command: CommandObject, jobs: JobWorker) -> None:
+    """Handle /reindex command (admin only, private chat).
+
+    Only changed files and chunks are re-embedded; ``/reindex full`` rebuilds
+    the whole index. The work runs as a background job.
+    """
     if not is_admin(message.from_user.id) or not is_private_chat(message):
         await message.answer("This command is not available.")
         return
 
-    await message.answer("Reindexing all documents... This may take a moment.")
+    full = (command.args or "").strip().lower() == "full"
+    status = await message.answer("Queued reindex...")
+    job_id = await jobs.submit(
+        JOB_REINDEX, {"full": full}, message.from_user.id, message.chat.id, status.message_id
+    )
+    await status.edit_text(f"Queued reindex as job #{job_id}. Use /jobs to check or cancel it.")
 
-    try:
-        from app.ingest import reindex_all_documents
 
-        stats = await reindex_all_documents()
+@router.message(Command("jobs"))
+async def cmd_jobs(message: Message, command: CommandObject, db: Database, jobs: JobWorker) -> None:
+    """Handle /jobs command (admin only, private chat).
+
+    ``/jobs`` lists recent ingest jobs; ``/jobs cancel <id>`` cancels one.
+    """
+    if not is_admin(message.from_user.id) or not is_private_chat(message):
+        await message.answer("This command is not available.")
+        return
+
+    args = (command.args or "").split()
+    if args and args[0].lower() == "cancel":
+        if len(args) != 2 or not args[1].lstrip("#").isdigit():
+            await message.answer("Usage: /jobs cancel <id>")
+            return
+        job_id = int(args[1].lstrip("#"))
+        if await jobs.cancel(job_id):
+            await message.answer(f"Cancelling job #{job_id}.")
+        else:
+            await message.answer(f"Job #{job_id} is not queued or running.")
+        return
+
+    recent = await db.list_jobs()
+    if not recent:
+        await message.answer("No jobs yet.")
+        return
+    await message.answer("\n\n".join(format_job(job, jobs.progress(job["id"])) for job in recent))
+
+
+@router.message(Command("compact_embeddings"))
+async def cmd_compact_embeddings(message: Message, rag: RAGSystem) -> None:
+    """Handle /compact_embeddings command (admin only, private chat).
+
+    Drop stored chunk embeddings that no chunk in the index uses any more.
+    """
+    if not is_admin(message.from_user.id) or not is_private_chat(message):
+        await message.answer("This command is not available.")
+        return
+
+    try:
+        stats = await rag.compact_embedding_store()
         await message.answer(
-            f"✅ Reindexing complete!\n\n"
-            f"Files: {stats['total_files']}\n"
-            f"Chunks: {stats['total_chunks']}"
+            f"✅ Embedding store compacted.\n\n"
+            f"Referenced: {stats['referenced']}\n"
+            f"Removed: {stats['removed']}"
         )
     except Exception as e:
-        logger.error(f"Reindex failed: {e}")
-        await message.answer(f"❌ Reindex failed: {e}")
+        logger.error(f"Embedding store compaction failed: {e}")
+        await message.answer(f"❌ Compaction failed: {e}")
 
 
 @router.message(Command("case_last"))
-async def cmd_case_last(message: Message) -> None:
+async def cmd_case_last(message: Message, db: Database, log_sink: InteractionLogSink) -> None:
     """Handle /case_last command (admin only, private chat). Show last case with internal sources."""
     if not is_admin(message.from_user.id) or not is_private_chat(message):
         await message.answer("This command is not available.")
         return
 
-    db = get_db()
+    # Write buffered log records first so the latest interaction is visible
+    await log_sink.flush()
+
     # Get the admin's own user ID (message sender)
-    log_entry = db.get_last_log(message.from_user.id)
+    log_entry = await db.get_last_log(message.from_user.id)
 
     if not log_entry:
         await message.answer("No cases found.")
@@ -219,8 +362,100 @@ async def cmd_case_last(message: Message) -> None:
     await message.answer(case_text, parse_mode="Markdown")
 
 
+@router.message(Command("stats"))
+async def cmd_stats(
+    message: Message,
+    rag: RAGSystem,
+    answer_cache: Optional[SemanticAnswerCache] = None,
+    question_flights: Optional[SingleFlight] = None,
+    admission: Optional[AdmissionController] = None,
+) -> None:
+    """Handle /stats command (admin only, private chat). Show index and cache statistics."""
+    if not is_admin(message.from_user.id) or not is_private_chat(message):
+        await message.answer("This command is not available.")
+        return
+
+    index_stats = rag.get_collection_stats()
+    lines = [
+        "Bot statistics",
+        "",
+        f"Chunks indexed: {index_stats['total_chunks']}",
+        f"Duplicate chunks collapsed: {index_stats['collapsed_duplicates']}",
+    ]
+
+    if rag.query_cache is not None:
+        cache_stats = rag.query_cache.stats()
+        lines += [
+            "",
+            "Query embedding cache:",
+            f"Memory hits: {cache_stats['memory_hits']}",
+            f"Disk hits: {cache_stats['disk_hits']}",
+            f"Misses: {cache_stats['misses']}",
+            f"Hit rate: {cache_stats['hit_rate']:.1%}",
+        ]
+
+    if rag.query_batcher is not None:
+        batch_stats = rag.query_batcher.stats()
+        sizes = ", ".join(f"{size}x{count}" for size, count in batch_stats["batch_sizes"].items())
+        lines += [
+            "",
+            "Query embedding batches:",
+            f"Batches: {batch_stats['batches']} for {batch_stats['calls']} questions",
+            f"Batch size: avg {batch_stats['avg_batch_size']}, max {batch_stats['max_batch_size']}",
+            f"Sizes: {sizes or '-'}",
+            f"Queueing delay: avg {batch_stats['avg_delay_ms']} ms, max {batch_stats['max_delay_ms']} ms",
+        ]
+
+    if answer_cache is not None:
+        cache_stats = answer_cache.stats()
+        lines += [
+            "",
+            "Answer cache:",
+            f"Entries: {cache_stats['entries']}",
+            f"Hits: {cache_stats['hits']}",
+            f"Misses: {cache_stats['misses']}",
+            f"Hit rate: {cache_stats['hit_rate']:.1%}",
+        ]
+
+    if admission is not None:
+        admission_stats = admission.stats()
+        lines += [
+            "",
+            "Answer admission:",
+            f"Running: {admission_stats['active']}/{admission.max_concurrent}",
+            f"Queued: {admission_stats['queue_depth']} (max seen {admission_stats['max_queue_depth']})",
+            f"Queue wait: avg {admission_stats['avg_wait_ms']} ms, max {admission_stats['max_wait_ms']} ms",
+            f"Admitted: {admission_stats['admitted']}",
+            f"Shed: {admission_stats['rejected_queue_full']} queue full, "
+            f"{admission_stats['rejected_deadline']} over deadline",
+        ]
+
+    if question_flights is not None:
+        flight_stats = question_flights.stats()
+        lines += [
+            "",
+            "Identical questions in flight:",
+            f"Computed: {flight_stats['computed']}",
+            f"Coalesced: {flight_stats['coalesced']} ({flight_stats['coalesced_rate']:.1%})",
+        ]
+
+    provider_stats = resilience_stats()
+    p95 = ", ".join(f"{endpoint} {seconds}s" for endpoint, seconds in provider_stats["p95_seconds"].items())
+    lines += [
+        "",
+        "OpenRouter:",
+        f"Circuit breaker: {provider_stats['state']} (opened {provider_stats['times_opened']} times, "
+        f"{provider_stats['rejected']} calls failed fast)",
+        f"Retries: {provider_stats['retries']}",
+        f"Hedged: {provider_stats['hedges']} ({provider_stats['hedge_wins']} won by the hedge)",
+        f"p95 latency: {p95 or '-'}",
+    ]
+
+    await message.answer("\n".join(lines))
+
+
 @router.message(F.document)
-async def handle_document(message: Message) -> None:
+async def handle_document(message: Message, jobs: JobWorker) -> None:
     """Handle document uploads (admin only, private chat)."""
     if not is_admin(message.from_user.id) or not is_private_chat(message):
         return  # Silently ignore non-admin doc uploads
@@ -247,143 +482,83 @@ async def handle_document(message: Message) -> None:
 
         logger.info(f"Downloaded document: {file_name}")
 
-        # Ingest
-        stats = await ingest_document(file_path)
-        
-        # Return confidential response - no file details, chunks, or pages exposed
-        await message.answer("Document uploaded and indexed successfully.")
-        logger.info(f"Ingested {file_name}: {stats['chunks_added']} chunks from {stats['pages']} pages")
+        # Ingest in the background; the job edits this message with progress and the result
+        status = await message.answer("Document received. Indexing...")
+        await jobs.submit(
+            JOB_INGEST, {"path": str(file_path)}, message.from_user.id, message.chat.id, status.message_id
+        )
 
     except Exception as e:
         logger.error(f"Failed to process document: {e}")
-        await message.answer(
-            "Upload failed. Please contact staff bot: https://t.me/JGGLSTAFFBOT"
-        )
+        await message.answer(UPLOAD_FAILED)
 
 
 @router.message(F.text)
-async def handle_message(message: Message) -> None:
+async def handle_message(
+    message: Message,
+    db: Database,
+    rag: RAGSystem,
+    log_sink: InteractionLogSink,
+    answer_cache: Optional[SemanticAnswerCache] = None,
+    question_flights: Optional[SingleFlight] = None,
+    admission: Optional[AdmissionController] = None,
+) -> None:
     """Handle text messages."""
+    deadline = Deadline()
     user_id = message.from_user.id
     user_text = message.text.strip()
-    db = get_db()
-    user = db.get_user(user_id)
+    user = await db.get_user(user_id)
 
     # Create user if not exists
     if not user:
-        db.set_user_language(user_id, "en")
+        await db.set_user_language(user_id, "en")
 
-    # Check for sensitive/banned topics
-    if is_sensitive_topic(user_text):
+    # Check for sensitive/banned topics and source/document requests in one pass
+    categories = get_prefilter().classify(user_text)
+    if SENSITIVE in categories:
         logger.warning(f"Sensitive topic detected from user {user_id}: {user_text[:50]}")
         await message.answer(SENSITIVE_REFUSAL)
-        db.log_interaction(user_id, user_text, "refused", internal_sources="sensitive_topic")
+        await log_sink.log_interaction(user_id, user_text, "refused", internal_sources="sensitive_topic")
         return
 
-    # Check for source/document requests
-    if is_source_request(user_text):
+    if SOURCE_REQUEST in categories:
         logger.info(f"Source request from user {user_id}: {user_text[:50]}")
         await message.answer(SOURCES_REFUSAL)
-        db.log_interaction(user_id, user_text, "refused", internal_sources="source_request")
+        await log_sink.log_interaction(user_id, user_text, "refused", internal_sources="source_request")
         return
 
-    # Retrieve relevant chunks
-    rag_system = get_rag_system()
-    try:
-        retrieved_chunks = await rag_system.retrieve(
-            query=user_text,
-            top_k=Config.RAG_TOP_K,
-            threshold=Config.RAG_SIMILARITY_THRESHOLD,
-        )
-    except Exception as e:
-        logger.error(f"RAG retrieval failed: {e}")
-        await message.answer(ESCALATION_TEMPLATE)
-        db.log_interaction(user_id, user_text, "escalated", internal_sources="retrieval_error")
-        return
-
-    # Check if we have relevant chunks
-    if not retrieved_chunks:
-        logger.info(f"No chunks retrieved for user {user_id}: {user_text}")
-        await message.answer(ESCALATION_TEMPLATE)
-        db.log_interaction(user_id, user_text, "escalated", internal_sources="no_chunks")
-        return
-
-    # Build context from retrieved chunks (internal only, NOT for user)
-    context = "\n\n".join(
-        [
-            f"[{chunk['metadata']['filename']}:p{chunk['metadata']['page']}]\n{chunk['text']}"
-            for chunk in retrieved_chunks
-        ]
+    reply = StreamingReply(message) if Config.OR_CHAT_STREAM else None
+
+    async def compute(fanout: ReplyFanout) -> Answer:
+        stream = fanout if reply is not None else None
+        if admission is None:
+            return await answer_question(user_text, user_id, rag, answer_cache, stream, deadline)
+        try:
+            async with admission.slot(user_id):
+                return await answer_question(user_text, user_id, rag, answer_cache, stream, deadline)
+        except AdmissionRejected as e:
+            # Overloaded: escalate now rather than keep the user waiting for a likely timeout
+            return escalation(e.reason)
+
+    if question_flights is not None:
+        answer = await question_flights.run(question_key(user_text, rag.kb_version), compute, reply)
+    else:
+        fanout = ReplyFanout()
+        if reply is not None:
+            fanout.add(reply)
+        answer = await compute(fanout)
+
+    # Every user gets their own reply and log row, even for a shared answer
+    await send_final(message, reply, answer.text)
+    await log_sink.log_interaction(
+        user_id,
+        user_text,
+        answer.status,
+        internal_sources=answer.internal_sources,
+        retrieval_scores=answer.retrieval_scores,
     )
-
-    # Store internal metadata for logging (NOT sent to user)
-    internal_sources = json.dumps([
-        {
-            "filename": chunk['metadata']['filename'],
-            "page": chunk['metadata']['page'],
-            "chunk_id": chunk['metadata']['chunk_id'],
-            "similarity": chunk['similarity'],
-        }
-        for chunk in retrieved_chunks
-    ])
-
-    retrieval_scores = json.dumps([
-        {
-            "chunk_id": chunk['metadata']['chunk_id'],
-            "similarity": round(chunk['similarity'], 3),
-        }
-        for chunk in retrieved_chunks
-    ])
-
-    # Call LLM
-    or_client = get_openrouter_client()
-    try:
-        messages = [
-            {"role": "system", "content": SYSTEM_PROMPT},
-            {
-                "role": "user",
-                "content": f"Context from knowledge base:\n\n{context}\n\n---\n\nUser question: {user_text}",
-            },
-        ]
-
-        response = await or_client.chat(
-            messages=messages,
-            temperature=0.5,
-            max_tokens=500,
-        )
-
-        # Sanitize ONLY LLM-generated responses to remove citations, sources, formatting
-        # Static messages (/start, /help, templates) are never sanitized
-        sanitized_response = sanitize_user_answer(response)
-        
-        # Check if strong source leakage was detected (empty string returned)
-        if not sanitized_response:
-            logger.warning(f"Source leakage detected in response for user {user_id}, escalating")
-            await message.answer(ESCALATION_TEMPLATE)
-            db.log_interaction(user_id, user_text, "escalated", internal_sources="source_leakage")
-        else:
-            # Send cleaned response to user
-            await message.answer(sanitized_response)
-            
-            # Log interaction with internal metadata (server-side only)
-            db.log_interaction(
-                user_id,
-                user_text,
-                "answered",
-                internal_sources=internal_sources,
-                retrieval_scores=retrieval_scores,
-            )
-            logger.info(f"Answered user {user_id}: {user_text[:50]}...")
-
-    except Exception as e:
-        logger.error(f"LLM call failed: {e}")
-        await message.answer(ESCALATION_TEMPLATE)
-        db.log_interaction(
-            user_id,
-            user_text,
-            "escalated",
-            internal_sources="llm_error",
-        )
+    if answer.status == "answered":
+        logger.info(f"Answered user {user_id}: {user_text[:50]}...")
 
 
 @router.message()
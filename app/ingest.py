@@ -1,142 +1,155 @@
 """Document ingestion and chunking."""
 
-import hashlib
+import asyncio
 import logging
-import re
 from pathlib import Path
-from typing import Optional
-
-from pypdf import PdfReader
+from typing import Callable, Optional
 
 from app.config import Config
-from app.rag import get_rag_system
+from app.extract import (  # noqa: F401 (re-exported)
+    SUPPORTED_EXTENSIONS,
+    build_chunks,
+    chunk_text,
+    create_chunk_id,
+    extract_pdf_text,
+    extract_text_file,
+)
+from app.ingest_pipeline import IngestCheckpoint, IngestPipeline
+from app.rag import RAGSystem, get_rag_system
 
 logger = logging.getLogger(__name__)
 
 
-def chunk_text(text: str, chunk_size: int = 1000, overlap: int = 200) -> list[str]:
-    """Split text into overlapping chunks."""
-    chunks = []
-    start = 0
+async def ingest_document(
+    file_path: Path,
+    rag_system: Optional[RAGSystem] = None,
+    save_manifest: bool = True,
+    progress: Optional[Callable[[dict], None]] = None,
+    checkpoint: Optional[IngestCheckpoint] = None,
+) -> dict:
+    """Ingest a single document (PDF or text) incrementally.
+
+    Unchanged files are skipped. For changed files only new or edited chunks
+    are embedded, and chunks that no longer exist are deleted. Extraction
+    runs in the ingestion process pool, off the event loop, a window of
+    pages at a time. ``progress`` receives pipeline progress snapshots;
+    ``checkpoint`` records written chunks so an interrupted run can resume.
+    """
+    if not file_path.exists():
+        raise FileNotFoundError(f"File not found: {file_path}")
 
-    while start < len(text):
-        end = start + chunk_size
-        chunk = text[start:end]
-        chunks.append(chunk)
-        start = end - overlap
+    rag_system = rag_system or get_rag_system()
+    result = await IngestPipeline(rag_system, progress=progress, checkpoint=checkpoint).run([file_path])
+    stats = result["files"][file_path.name]
+    if "error" in stats:
+        raise RuntimeError(f"Failed to ingest {file_path.name}: {stats['error']}")
 
-    return [c.strip() for c in chunks if c.strip()]
+    if save_manifest:
+        rag_system.manifest.save()
+    return stats
 
 
-def extract_pdf_text(pdf_path: Path) -> dict[int, str]:
-    """Extract text from PDF by page."""
-    pages = {}
+def remove_document(filename: str, rag_system: RAGSystem) -> int:
+    """Delete a file's chunks from the index. Returns the number removed."""
+    removed = rag_system.delete_chunks(list(rag_system.manifest.chunks(filename)))
+    rag_system.manifest.remove_file(filename)
+    logger.info(f"Removed {filename} from index: {removed} chunks")
+    return removed
+
+
+async def reindex_all_documents(
+    rag_system: Optional[RAGSystem] = None,
+    full: bool = False,
+    progress: Optional[Callable[[dict], None]] = None,
+    checkpoint: Optional[IngestCheckpoint] = None,
+) -> dict:
+    """Bring the index in line with data/docs/.
+
+    By default only new or changed files are re-chunked and only changed
+    chunks are embedded; files deleted from the docs directory are removed
+    from the index. With ``full=True`` the index is rebuilt into a side
+    collection which replaces the live one only if every file ingested and
+    the chunk count validates, so queries are served throughout and a
+    failed rebuild leaves the previous index in place.
+
+    With a ``checkpoint``, a rebuild interrupted by cancellation keeps its
+    staging collection, and running again with the same checkpoint resumes
+    it instead of starting over.
+    """
+    rag_system = rag_system or get_rag_system()
+    if not full:
+        return await sync_documents(rag_system, progress, checkpoint)
+
+    staging = rag_system.create_staging_index(checkpoint.staging if checkpoint else None)
     try:
-        reader = PdfReader(pdf_path)
-        for page_num, page in enumerate(reader.pages, 1):
-            text = page.extract_text()
-            if text.strip():
-                pages[page_num] = text
-        logger.info(f"Extracted {len(pages)} pages from {pdf_path.name}")
-    except Exception as e:
-        logger.error(f"Error reading PDF {pdf_path}: {e}")
-    return pages
-
-
-def extract_text_file(text_path: Path) -> str:
-    """Extract text from plain text file."""
-    try:
-        content = text_path.read_text(encoding="utf-8")
-        logger.info(f"Read text file {text_path.name}")
-        return content
-    except Exception as e:
-        logger.error(f"Error reading text file {text_path}: {e}")
-        return ""
-
-
-def create_chunk_id(filename: str, page: int, chunk_num: int) -> str:
-    """Generate unique chunk ID."""
-    data = f"{filename}:p{page}:c{chunk_num}".encode()
-    return hashlib.md5(data).hexdigest()[:12]
-
-
-async def ingest_document(file_path: Path) -> dict:
-    """Ingest a single document (PDF or text)."""
-    if not file_path.exists():
-        raise FileNotFoundError(f"File not found: {file_path}")
-
-    rag_system = get_rag_system()
-    stats = {"file": file_path.name, "chunks_added": 0, "pages": 0}
-
-    if file_path.suffix.lower() == ".pdf":
-        pages = extract_pdf_text(file_path)
-        stats["pages"] = len(pages)
-
-        for page_num, page_text in pages.items():
-            chunks = chunk_text(
-                page_text,
-                chunk_size=Config.RAG_CHUNK_SIZE,
-                overlap=Config.RAG_CHUNK_OVERLAP,
-            )
-
-            for chunk_num, chunk in enumerate(chunks):
-                chunk_id = create_chunk_id(file_path.name, page_num, chunk_num)
-                await rag_system.add_chunk(
-                    chunk_id=chunk_id,
-                    text=chunk,
-                    filename=file_path.name,
-                    page=page_num,
-                )
-                stats["chunks_added"] += 1
-
-    elif file_path.suffix.lower() in [".txt", ".md"]:
-        text = extract_text_file(file_path)
-        stats["pages"] = 1
-
-        chunks = chunk_text(
-            text,
-            chunk_size=Config.RAG_CHUNK_SIZE,
-            overlap=Config.RAG_CHUNK_OVERLAP,
-        )
-
-        for chunk_num, chunk in enumerate(chunks):
-            chunk_id = create_chunk_id(file_path.name, 1, chunk_num)
-            await rag_system.add_chunk(
-                chunk_id=chunk_id,
-                text=chunk,
-                filename=file_path.name,
-                page=1,
-            )
-            stats["chunks_added"] += 1
-
-    logger.info(f"Ingested {file_path.name}: {stats['chunks_added']} chunks")
-    return stats
+        if checkpoint is not None:
+            await checkpoint.set_staging(staging.collection.name)
+        all_stats = await sync_documents(staging, progress, checkpoint)
+        if all_stats["failed_files"]:
+            raise RuntimeError(f"{all_stats['failed_files']} file(s) failed to ingest")
+        rag_system.promote_index(staging)
+    except asyncio.CancelledError:
+        if checkpoint is None:
+            rag_system.discard_index(staging)
+        raise
+    except Exception:
+        rag_system.discard_index(staging)
+        raise
+    return all_stats
 
 
-async def reindex_all_documents() -> dict:
-    """Rebuild index from all documents in data/docs/."""
-    rag_system = get_rag_system()
-    rag_system.clear()
+async def sync_documents(
+    rag_system: RAGSystem,
+    progress: Optional[Callable[[dict], None]] = None,
+    checkpoint: Optional[IngestCheckpoint] = None,
+) -> dict:
+    """Incrementally sync a RAG system's collection with data/docs/."""
+    all_stats = {
+        "total_files": 0,
+        "changed_files": 0,
+        "removed_files": 0,
+        "failed_files": 0,
+        "total_chunks": 0,
+        "unchanged_chunks": 0,
+        "removed_chunks": 0,
+        "throughput": {},
+    }
 
     if not Config.DOCS_DIR.exists():
         logger.warning(f"Docs directory not found: {Config.DOCS_DIR}")
-        return {"total_files": 0, "total_chunks": 0}
-
-    all_stats = {"total_files": 0, "total_chunks": 0}
-    supported_extensions = {".pdf", ".txt", ".md"}
-
-    for file_path in Config.DOCS_DIR.iterdir():
-        if file_path.is_file() and file_path.suffix.lower() in supported_extensions:
-            try:
-                stats = await ingest_document(file_path)
-                all_stats["total_files"] += 1
-                all_stats["total_chunks"] += stats["chunks_added"]
-                logger.info(f"Added {stats['chunks_added']} chunks from {file_path.name}")
-            except Exception as e:
-                logger.error(f"Failed to ingest {file_path.name}: {e}")
+        return all_stats
+
+    doc_files = [
+        file_path
+        for file_path in Config.DOCS_DIR.iterdir()
+        if file_path.is_file() and file_path.suffix.lower() in SUPPORTED_EXTENSIONS
+    ]
+
+    # Drop files that are no longer in the docs directory
+    present = {file_path.name for file_path in doc_files}
+    for filename in [name for name in rag_system.manifest.files if name not in present]:
+        all_stats["removed_chunks"] += await asyncio.to_thread(remove_document, filename, rag_system)
+        all_stats["removed_files"] += 1
+
+    result = await IngestPipeline(rag_system, progress=progress, checkpoint=checkpoint).run(doc_files)
+    for filename, stats in result["files"].items():
+        if "error" in stats:
+            all_stats["failed_files"] += 1
+            logger.error(f"Failed to ingest {filename}: {stats['error']}")
+            continue
+        all_stats["total_files"] += 1
+        all_stats["changed_files"] += 0 if stats["skipped"] else 1
+        all_stats["total_chunks"] += stats["chunks_added"]
+        all_stats["unchanged_chunks"] += stats["chunks_unchanged"]
+        all_stats["removed_chunks"] += stats["chunks_removed"]
+    all_stats["throughput"] = result["stages"]
+
+    rag_system.manifest.save()
 
     logger.info(
-        f"Reindexed complete: {all_stats['total_files']} files, "
-        f"{all_stats['total_chunks']} total chunks"
+        f"Reindexed complete: {all_stats['total_files']} files "
+        f"({all_stats['changed_files']} changed, {all_stats['removed_files']} removed, "
+        f"{all_stats['failed_files']} failed), "
+        f"{all_stats['total_chunks']} chunks embedded, {all_stats['removed_chunks']} removed"
     )
     return all_stats
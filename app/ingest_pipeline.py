@@ -0,0 +1,441 @@
+"""Staged, concurrent document ingestion pipeline.
+
+extract (process pool) -> embed (bounded concurrency, rate limited) -> write (bulk upsert)
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, Optional
+
+from app.chunking import chunker_signature
+from app.config import Config
+from app.extract import count_pages, extract_chunks
+from app.manifest import hash_file
+from app.rag import RAGSystem
+
+logger = logging.getLogger(__name__)
+
+# Process pool for CPU-heavy extraction, shared across ingestion runs
+_extract_pool: Optional[ProcessPoolExecutor] = None
+
+
+def extract_workers() -> int:
+    """Number of extraction processes."""
+    return Config.INGEST_EXTRACT_WORKERS or os.cpu_count() or 1
+
+
+def get_extract_pool() -> ProcessPoolExecutor:
+    """Get the extraction process pool, creating it on first use."""
+    global _extract_pool
+    if _extract_pool is None:
+        # spawn: never fork a process that is running threads (SQLite, HTTP pool)
+        _extract_pool = ProcessPoolExecutor(
+            max_workers=extract_workers(),
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _extract_pool
+
+
+def close_extract_pool() -> None:
+    """Shut down the extraction process pool (call once at shutdown)."""
+    global _extract_pool
+    if _extract_pool is not None:
+        _extract_pool.shutdown(wait=True, cancel_futures=True)
+        _extract_pool = None
+
+
+class RateLimiter:
+    """Spaces out calls to at most ``rate`` per second (0 disables limiting)."""
+
+    def __init__(self, rate: float):
+        """Initialize the limiter."""
+        self.interval = 1 / rate if rate > 0 else 0.0
+        self._next_slot = 0.0
+
+    async def acquire(self) -> None:
+        """Wait for the next free slot."""
+        if not self.interval:
+            return
+        now = time.monotonic()
+        slot = max(now, self._next_slot)
+        self._next_slot = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+class StageStats:
+    """Item count and wall-clock span of one pipeline stage."""
+
+    def __init__(self, unit: str):
+        """Initialize the counters."""
+        self.unit = unit
+        self.items = 0
+        self.busy = 0.0
+        self._first: Optional[float] = None
+        self._last: Optional[float] = None
+
+    def record(self, items: int, started: float) -> None:
+        """Record ``items`` processed by work that began at ``started``."""
+        now = time.monotonic()
+        self.items += items
+        self.busy += now - started
+        self._first = started if self._first is None else min(self._first, started)
+        self._last = now
+
+    def as_dict(self) -> dict:
+        """Throughput summary."""
+        seconds = (self._last - self._first) if self._first is not None else 0.0
+        return {
+            "unit": self.unit,
+            "items": self.items,
+            "seconds": round(seconds, 2),
+            "per_second": round(self.items / seconds, 1) if seconds > 0 else 0.0,
+        }
+
+
+class _FileJob:
+    """Per-file bookkeeping while its chunks move through the pipeline."""
+
+    def __init__(self, path: Path, file_hash: str, indexed: dict[str, str]):
+        self.path = path
+        self.file_hash = file_hash
+        self.indexed = indexed
+        self.current: dict[str, str] = {}
+        self.pending = 0
+        self.extracted = False
+        self.error: Optional[str] = None
+        self.stats = {
+            "file": path.name,
+            "chunks_added": 0,
+            "chunks_unchanged": 0,
+            "chunks_removed": 0,
+            "pages": 0,
+            "skipped": False,
+        }
+
+
+class IngestCheckpoint:
+    """Chunks already written by an earlier, interrupted run of the same work.
+
+    The pipeline treats recorded chunks as indexed, so a resumed run embeds
+    and writes only what is still missing. This base class keeps state in
+    memory; subclasses persist it by overriding ``record`` and ``set_staging``.
+    """
+
+    def __init__(
+        self,
+        written: Optional[dict[str, dict[str, str]]] = None,
+        staging: Optional[str] = None,
+    ):
+        """Initialize from ``filename -> {chunk_id: content hash}`` and a staging collection name."""
+        self.written = written or {}
+        self.staging = staging
+
+    def chunks(self, filename: str) -> dict[str, str]:
+        """Chunks of a file written so far."""
+        return self.written.get(filename, {})
+
+    async def record(self, filename: str, chunks: dict[str, str]) -> None:
+        """Record chunks of a file as written."""
+        self.written.setdefault(filename, {}).update(chunks)
+
+    async def set_staging(self, staging: str) -> None:
+        """Record the staging collection a full rebuild writes into."""
+        self.staging = staging
+
+
+_DONE = object()
+
+
+class IngestPipeline:
+    """Ingest files through extract, embed and write stages running concurrently.
+
+    Files are hashed and, if changed since the last index (or indexed with a
+    different chunker), extracted and chunked in a process pool
+    ``page_window`` pages at a time, so a large PDF is never held in memory
+    whole. Changed chunks are sent in batches to ``embed_concurrency``
+    embedding workers (at most ``rate_limit`` requests per second), and a
+    single writer upserts each embedded batch into Chroma. When all of a
+    file's chunks are written, chunks that no longer exist are deleted and
+    the manifest is updated. Chroma writes and deletes run in threads, one
+    at a time, so questions are answered while a large ingest runs.
+    """
+
+    def __init__(
+        self,
+        rag_system: RAGSystem,
+        embed_concurrency: int = Config.INGEST_EMBED_CONCURRENCY,
+        rate_limit: float = Config.INGEST_EMBED_RATE_LIMIT,
+        batch_size: int = Config.OR_EMBED_BATCH_SIZE,
+        page_window: int = Config.INGEST_PAGE_WINDOW,
+        progress: Optional[Callable[[dict], None]] = None,
+        checkpoint: Optional[IngestCheckpoint] = None,
+    ):
+        """Initialize the pipeline.
+
+        ``progress``, if given, is called with a snapshot dict (``pages_done``,
+        ``pages_total``, ``chunks_embedded``, ``eta_seconds``) as work completes.
+        ``checkpoint``, if given, is told about every written batch and
+        supplies the chunks an interrupted run already wrote.
+        """
+        self.rag_system = rag_system
+        self.embed_concurrency = max(embed_concurrency, 1)
+        self.batch_size = batch_size
+        self.page_window = max(page_window, 1)
+        self.progress = progress
+        self.checkpoint = checkpoint
+        self.chunker = chunker_signature()
+        self.pages_total = 0
+        self.pages_done = 0
+        self.chunks_queued = 0
+        self.chunks_embedded = 0
+        self._started = time.monotonic()
+        self.rate_limiter = RateLimiter(rate_limit)
+        self.stages = {
+            "extract": StageStats("pages"),
+            "embed": StageStats("chunks"),
+            "write": StageStats("chunks"),
+        }
+        self.reused = 0
+        # Serializes changes to the collection and manifest across stages
+        self._store_lock = asyncio.Lock()
+
+    async def run(self, files: list[Path]) -> dict:
+        """Ingest files. Returns per-file stats and per-stage throughput."""
+        started = self._started = time.monotonic()
+        embed_queue: asyncio.Queue = asyncio.Queue(maxsize=self.embed_concurrency * 2)
+        write_queue: asyncio.Queue = asyncio.Queue(maxsize=self.embed_concurrency * 2)
+        jobs: list[_FileJob] = []
+
+        embedders = [
+            asyncio.create_task(self._embed_worker(embed_queue, write_queue))
+            for _ in range(self.embed_concurrency)
+        ]
+        writer = asyncio.create_task(self._write_worker(write_queue))
+
+        try:
+            # Extraction is bounded by the pool size so chunk lists do not pile up
+            extract_slots = asyncio.Semaphore(extract_workers())
+            await asyncio.gather(
+                *(self._extract(path, extract_slots, embed_queue, jobs) for path in files)
+            )
+            for _ in embedders:
+                await embed_queue.put(_DONE)
+            await asyncio.gather(*embedders)
+            await write_queue.put(_DONE)
+            await writer
+        finally:
+            for task in (*embedders, writer):
+                task.cancel()
+
+        stages = {name: stage.as_dict() for name, stage in self.stages.items()}
+        elapsed = time.monotonic() - started
+        logger.info(
+            f"Ingest pipeline finished in {elapsed:.1f}s: "
+            + ", ".join(
+                f"{name} {s['items']} {s['unit']} ({s['per_second']}/s)" for name, s in stages.items()
+            )
+            + f", {self.reused} embeddings reused"
+        )
+
+        return {
+            "files": {job.path.name: self._file_result(job) for job in jobs},
+            "stages": stages,
+            "seconds": round(elapsed, 2),
+        }
+
+    async def _extract(
+        self,
+        path: Path,
+        slots: asyncio.Semaphore,
+        embed_queue: asyncio.Queue,
+        jobs: list[_FileJob],
+    ) -> None:
+        """Stage 1: hash, extract and chunk a file, then queue its changed chunks."""
+        manifest = self.rag_system.manifest
+        indexed = manifest.chunks(path.name)
+        if self.checkpoint is not None:
+            indexed.update(self.checkpoint.chunks(path.name))
+        job = _FileJob(path, "", indexed)
+        jobs.append(job)
+        try:
+            job.file_hash = await asyncio.to_thread(hash_file, path)
+        except OSError as e:
+            job.error = f"read failed: {e}"
+            logger.error(f"Failed to read {path.name}: {e}")
+            return
+
+        if manifest.is_current(path.name, job.file_hash, self.chunker):
+            job.stats["skipped"] = True
+            job.stats["chunks_unchanged"] = len(job.indexed)
+            logger.info(f"Skipped {path.name}: unchanged since last index")
+            return
+
+        loop = asyncio.get_running_loop()
+        pool = get_extract_pool()
+        try:
+            total_pages = await loop.run_in_executor(pool, count_pages, path)
+        except Exception as e:
+            job.error = f"extraction failed: {e}"
+            logger.error(f"Failed to open {path.name}: {e}")
+            return
+        self.pages_total += total_pages
+
+        # Walk the document a window of pages at a time; the bounded embed
+        # queue holds extraction back when embedding falls behind
+        for start in range(1, total_pages + 1, self.page_window):
+            if job.error:
+                break
+            stop = min(start + self.page_window, total_pages + 1)
+            async with slots:
+                started = time.monotonic()
+                try:
+                    pages, chunks = await loop.run_in_executor(
+                        pool, extract_chunks, path, start, stop
+                    )
+                except Exception as e:
+                    job.error = f"extraction failed: {e}"
+                    logger.error(f"Failed to extract {path.name}: {e}")
+                    break
+                self.stages["extract"].record(stop - start, started)
+
+            self.pages_done += stop - start
+            job.stats["pages"] += pages
+            job.current.update((c["chunk_id"], c["content_hash"]) for c in chunks)
+            changed = [c for c in chunks if job.indexed.get(c["chunk_id"]) != c["content_hash"]]
+            job.stats["chunks_unchanged"] += len(chunks) - len(changed)
+            job.pending += len(changed)
+            self.chunks_queued += len(changed)
+            self._report()
+
+            for offset in range(0, len(changed), self.batch_size):
+                await embed_queue.put((job, changed[offset:offset + self.batch_size]))
+
+        job.extracted = True
+        if job.pending == 0:
+            await self._finish(job)
+
+    async def _embed_worker(self, embed_queue: asyncio.Queue, write_queue: asyncio.Queue) -> None:
+        """Stage 2: embed chunk batches."""
+        while True:
+            item = await embed_queue.get()
+            if item is _DONE:
+                return
+            job, batch = item
+            if job.error:
+                await self._settle(job, len(batch))
+                continue
+
+            await self.rate_limiter.acquire()
+            started = time.monotonic()
+            try:
+                embeddings, reused = await self.rag_system.embed_chunks([c["text"] for c in batch])
+            except Exception as e:
+                job.error = f"embedding failed: {e}"
+                logger.error(f"Failed to embed chunks of {job.path.name}: {e}")
+                await self._settle(job, len(batch))
+                continue
+            self.reused += reused
+            self.stages["embed"].record(len(batch), started)
+            await write_queue.put((job, batch, embeddings))
+
+    async def _write_worker(self, write_queue: asyncio.Queue) -> None:
+        """Stage 3: bulk upsert embedded batches into Chroma."""
+        while True:
+            item = await write_queue.get()
+            if item is _DONE:
+                return
+            job, batch, embeddings = item
+            if not job.error:
+                started = time.monotonic()
+                async with self._store_lock:
+                    try:
+                        await asyncio.to_thread(self.rag_system.write_chunks, batch, embeddings)
+                        job.stats["chunks_added"] += len(batch)
+                        self.chunks_embedded += len(batch)
+                        self.stages["write"].record(len(batch), started)
+                        self._report()
+                    except Exception as e:
+                        job.error = f"write failed: {e}"
+                        logger.error(f"Failed to write chunks of {job.path.name}: {e}")
+                    else:
+                        await self._checkpoint(job, batch)
+            await self._settle(job, len(batch))
+
+    async def _checkpoint(self, job: _FileJob, batch: list[dict]) -> None:
+        """Record a written batch with the checkpoint (called holding the store lock).
+
+        With duplicate collapsing the manifest is saved first: the batch may
+        have added chunks to duplicate groups, and a resumed run must find
+        those groups alongside the checkpointed chunk IDs.
+        """
+        if self.checkpoint is None:
+            return
+        try:
+            manifest = self.rag_system.manifest
+            if manifest.duplicates is not None:
+                manifest.save()
+            await self.checkpoint.record(
+                job.path.name, {c["chunk_id"]: c["content_hash"] for c in batch}
+            )
+        except Exception as e:
+            # Only costs re-writing this batch if the run is resumed
+            logger.warning(f"Failed to checkpoint chunks of {job.path.name}: {e}")
+
+    async def _settle(self, job: _FileJob, count: int) -> None:
+        """Mark ``count`` of a file's chunks as done; finish the file when none remain."""
+        job.pending -= count
+        if job.pending == 0 and job.extracted:
+            await self._finish(job)
+
+    def _report(self) -> None:
+        """Send a progress snapshot to the progress callback."""
+        if self.progress is None:
+            return
+        elapsed = time.monotonic() - self._started
+        # Extrapolate from pages while extracting, then from chunks left to embed
+        eta = None
+        if 0 < self.pages_done < self.pages_total:
+            eta = elapsed / self.pages_done * (self.pages_total - self.pages_done)
+        elif 0 < self.chunks_embedded < self.chunks_queued:
+            eta = elapsed / self.chunks_embedded * (self.chunks_queued - self.chunks_embedded)
+        elif self.pages_total and self.chunks_embedded >= self.chunks_queued:
+            eta = 0.0
+        try:
+            self.progress(
+                {
+                    "pages_done": self.pages_done,
+                    "pages_total": self.pages_total,
+                    "chunks_embedded": self.chunks_embedded,
+                    "eta_seconds": eta,
+                }
+            )
+        except Exception as e:
+            logger.warning(f"Progress callback failed: {e}")
+
+    async def _finish(self, job: _FileJob) -> None:
+        """Delete chunks the file no longer has and record it in the manifest."""
+        if job.error:
+            # Leave the manifest alone so the next run retries this file
+            return
+        stale = [chunk_id for chunk_id in job.indexed if chunk_id not in job.current]
+        async with self._store_lock:
+            job.stats["chunks_removed"] = await asyncio.to_thread(self.rag_system.delete_chunks, stale)
+            self.rag_system.manifest.set_file(job.path.name, job.file_hash, job.current, self.chunker)
+        logger.info(
+            f"Ingested {job.path.name}: {job.stats['chunks_added']} embedded, "
+            f"{job.stats['chunks_unchanged']} unchanged, {job.stats['chunks_removed']} removed"
+        )
+
+    @staticmethod
+    def _file_result(job: _FileJob) -> dict:
+        """Per-file stats, with ``error`` set if the file failed."""
+        result = dict(job.stats)
+        if job.error:
+            result["error"] = job.error
+        return result
@@ -0,0 +1,289 @@
+"""Persistent background queue for ingest and reindex jobs."""
+
+import asyncio
+import logging
+from pathlib import Path
+from typing import Optional
+
+from aiogram import Bot
+
+from app.config import Config
+from app.db import Database
+from app.events import EVENT_JOB_CANCEL, EVENT_JOB_QUEUED, EVENT_KB_CHANGED, EventChannel
+from app.ingest import ingest_document, reindex_all_documents
+from app.ingest_pipeline import IngestCheckpoint
+from app.progress import ProgressReporter, format_progress
+from app.rag import RAGSystem
+
+logger = logging.getLogger(__name__)
+
+JOB_INGEST = "ingest"
+JOB_REINDEX = "reindex"
+
+UPLOAD_DONE = "Document uploaded and indexed successfully."
+UPLOAD_FAILED = "Upload failed. Please contact staff bot: https://t.me/JGGLSTAFFBOT"
+
+
+def job_title(job: dict) -> str:
+    """Heading of a job's status message."""
+    if job["kind"] == JOB_INGEST:
+        return "Indexing document..."
+    if job["payload"].get("full"):
+        return (
+            "Rebuilding the whole index... Answers keep using the current "
+            "index until the new one is ready."
+        )
+    return "Reindexing changed documents..."
+
+
+def format_reindex_result(stats: dict) -> str:
+    """Admin summary of a finished reindex."""
+    throughput = "\n".join(
+        f"{stage.capitalize()}: {s['items']} {s['unit']} in {s['seconds']}s ({s['per_second']}/s)"
+        for stage, s in stats["throughput"].items()
+    )
+    return (
+        f"✅ Reindexing complete!\n\n"
+        f"Files: {stats['total_files']} ({stats['changed_files']} changed, "
+        f"{stats['removed_files']} removed, {stats['failed_files']} failed)\n"
+        f"Chunks embedded: {stats['total_chunks']}\n"
+        f"Chunks unchanged: {stats['unchanged_chunks']}\n"
+        f"Chunks removed: {stats['removed_chunks']}"
+        + (f"\n\nThroughput:\n{throughput}" if throughput else "")
+    )
+
+
+class JobCheckpoint(IngestCheckpoint):
+    """Ingest checkpoint stored in the job_checkpoints table."""
+
+    def __init__(self, db: Database, job: dict, written: dict[str, dict[str, str]]):
+        """Initialize from a job row and the chunks it has already written."""
+        super().__init__(written, job["staging"])
+        self.db = db
+        self.job_id = job["id"]
+
+    async def record(self, filename: str, chunks: dict[str, str]) -> None:
+        """Record written chunks in the database."""
+        await self.db.add_job_checkpoint(self.job_id, filename, chunks)
+        await super().record(filename, chunks)
+
+    async def set_staging(self, staging: str) -> None:
+        """Record the staging collection in the job row."""
+        await self.db.set_job_staging(self.job_id, staging)
+        await super().set_staging(staging)
+
+
+class JobWorker:
+    """Run queued ingest and reindex jobs one at a time in the background.
+
+    Jobs live in the ``jobs`` table, so they survive restarts: on start,
+    jobs a previous process left running are queued again and resume from
+    their checkpoints (chunks already written are not embedded again, and a
+    full rebuild reopens its staging collection). Jobs run serially, which
+    also keeps index manifest updates from interleaving.
+
+    With several worker processes only one runs jobs (``run_jobs``); the
+    others queue and cancel jobs through ``events``, and the one running
+    them announces index changes so the others reload.
+    """
+
+    def __init__(
+        self,
+        db: Database,
+        rag: RAGSystem,
+        bot: Bot,
+        events: EventChannel,
+        run_jobs: bool = Config.JOB_WORKER,
+    ):
+        """Initialize the worker (call start() to begin processing)."""
+        self.db = db
+        self.rag = rag
+        self.bot = bot
+        self.events = events
+        self.run_jobs = run_jobs
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._current: Optional[tuple[int, asyncio.Task, ProgressReporter]] = None
+
+    async def start(self) -> None:
+        """Requeue interrupted jobs and start the background loop (if this process runs jobs)."""
+        if not self.run_jobs:
+            return
+        self.events.subscribe(EVENT_JOB_QUEUED, lambda _: self._wakeup.set())
+        self.events.subscribe(EVENT_JOB_CANCEL, self._cancel_requested)
+        requeued = await self.db.requeue_running_jobs()
+        if requeued:
+            logger.info(f"Resuming {requeued} interrupted job(s)")
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def submit(
+        self,
+        kind: str,
+        payload: dict,
+        telegram_id: int,
+        chat_id: int,
+        message_id: Optional[int] = None,
+    ) -> int:
+        """Queue a job. Returns its ID."""
+        job_id = await self.db.create_job(kind, payload, telegram_id, chat_id, message_id)
+        if self.run_jobs:
+            self._wakeup.set()
+        else:
+            await self.events.publish(EVENT_JOB_QUEUED, {"job_id": job_id})
+        logger.info(f"Queued job #{job_id}: {kind} {payload}")
+        return job_id
+
+    async def cancel(self, job_id: int) -> bool:
+        """Cancel a queued or running job. Returns False if it is neither."""
+        if self._current and self._current[0] == job_id:
+            self._current[1].cancel()
+            return True
+        if await self.db.cancel_queued_job(job_id):
+            return True
+        if not self.run_jobs:
+            # Running in the job worker process
+            job = await self.db.get_job(job_id)
+            if job and job["status"] == "running":
+                await self.events.publish(EVENT_JOB_CANCEL, {"job_id": job_id})
+                return True
+        return False
+
+    def _cancel_requested(self, payload: dict) -> None:
+        """Cancel the running job if another process asked to."""
+        if self._current and self._current[0] == payload.get("job_id"):
+            self._current[1].cancel()
+
+    def progress(self, job_id: int) -> Optional[dict]:
+        """Latest progress snapshot of the running job, if it is ``job_id``."""
+        if self._current and self._current[0] == job_id:
+            return self._current[2].snapshot
+        return None
+
+    async def close(self) -> None:
+        """Stop the worker. A running job stays marked running and resumes on next start."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self) -> None:
+        """Claim and run queued jobs until cancelled."""
+        while True:
+            self._wakeup.clear()
+            try:
+                job = await self.db.claim_next_job()
+            except Exception as e:
+                logger.error(f"Failed to claim job: {e}")
+                job = None
+            if job is None:
+                await self._wakeup.wait()
+                continue
+            kb_version = self.rag.kb_version
+            try:
+                await self._process(job)
+            except Exception as e:
+                logger.error(f"Job #{job['id']} could not be completed: {e}")
+            if self.rag.kb_version != kb_version:
+                try:
+                    await self.events.publish(EVENT_KB_CHANGED)
+                except Exception as e:
+                    logger.error(f"Could not announce index change: {e}")
+
+    async def _process(self, job: dict) -> None:
+        """Run one job and record its outcome."""
+        reporter = ProgressReporter(self.bot, job["chat_id"], job["message_id"], job_title(job))
+        task = asyncio.create_task(self._execute(job, reporter))
+        self._current = (job["id"], task, reporter)
+        try:
+            # Wait without propagating the job's own cancellation into the worker loop
+            await asyncio.wait({task})
+        except asyncio.CancelledError:
+            # Worker shutdown: stop the job but leave it running in the table to resume later
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            raise
+        finally:
+            self._current = None
+
+        if task.cancelled():
+            await self.db.finish_job(job["id"], "cancelled")
+            if job["kind"] == JOB_REINDEX and job["payload"].get("full"):
+                await self._discard_staging(job["id"])
+            await reporter.finish(f"Job #{job['id']} cancelled.")
+            logger.info(f"Job #{job['id']} cancelled")
+            return
+
+        error = task.exception()
+        if error is not None:
+            logger.error(f"Job #{job['id']} failed: {error}")
+            await self.db.finish_job(job["id"], "failed", error=str(error))
+            await reporter.finish(
+                UPLOAD_FAILED if job["kind"] == JOB_INGEST else f"❌ Reindex failed: {error}"
+            )
+            return
+
+        stats = task.result()
+        await self.db.finish_job(job["id"], "done", result=stats)
+        if job["kind"] == JOB_INGEST:
+            # Confidential response - no file details, chunks, or pages exposed
+            await reporter.finish(UPLOAD_DONE)
+        else:
+            await reporter.finish(format_reindex_result(stats))
+        logger.info(f"Job #{job['id']} done")
+
+    async def _execute(self, job: dict, reporter: ProgressReporter) -> dict:
+        """Run the ingest work of a job from its checkpoint."""
+        checkpoint = JobCheckpoint(self.db, job, await self.db.get_job_checkpoints(job["id"]))
+        if job["kind"] == JOB_INGEST:
+            file_path = Path(job["payload"]["path"])
+            stats = await ingest_document(
+                file_path, self.rag, progress=reporter.update, checkpoint=checkpoint
+            )
+            logger.info(f"Ingested {file_path.name}: {stats['chunks_added']} chunks from {stats['pages']} pages")
+            return stats
+        if job["kind"] == JOB_REINDEX:
+            return await reindex_all_documents(
+                self.rag,
+                full=job["payload"].get("full", False),
+                progress=reporter.update,
+                checkpoint=checkpoint,
+            )
+        raise ValueError(f"Unknown job kind: {job['kind']}")
+
+    async def _discard_staging(self, job_id: int) -> None:
+        """Drop the staging collection of a cancelled full rebuild."""
+        job = await self.db.get_job(job_id)
+        if job and job["staging"]:
+            self.rag.discard_staging(job["staging"])
+
+
+def format_job(job: dict, progress: Optional[dict] = None) -> str:
+    """One-line summary of a job for /jobs."""
+    line = f"#{job['id']} {job['kind']} — {job['status']} ({job['created_at'][:16].replace('T', ' ')})"
+    if progress:
+        line += "\n" + format_progress(progress).replace("\n", ", ")
+    if job["error"]:
+        line += f"\nError: {job['error']}"
+    return line
+
+
+# Process-lifetime instance, managed by init_job_worker() / close_job_worker()
+_job_worker: Optional[JobWorker] = None
+
+
+async def init_job_worker(db: Database, rag: RAGSystem, bot: Bot, events: EventChannel) -> JobWorker:
+    """Create and start the shared job worker (call once at startup)."""
+    global _job_worker
+    if _job_worker is None:
+        _job_worker = JobWorker(db, rag, bot, events)
+        await _job_worker.start()
+    return _job_worker
+
+
+async def close_job_worker() -> None:
+    """Stop the shared job worker (call once at shutdown, before closing the DB)."""
+    global _job_worker
+    if _job_worker is not None:
+        await _job_worker.close()
+        _job_worker = None
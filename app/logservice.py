@@ -0,0 +1,106 @@
+"""Single-writer interaction log service for multi-process deployments.
+
+Worker processes with ``LOG_BACKEND=service`` send their batched log
+records here over HTTP instead of writing to SQLite themselves, so the
+``logs`` table has exactly one writer. Run it with
+``python -m app.logservice`` (``app.supervisor`` starts it for you).
+"""
+
+import asyncio
+import logging
+import signal
+from typing import Optional
+
+import httpx
+from aiohttp import web
+
+from app.config import Config
+from app.db import Database, close_db, init_db
+
+logger = logging.getLogger(__name__)
+
+RECORD_FIELDS = 6  # telegram_id, question, action, internal_sources, retrieval_scores, timestamp
+
+
+def log_service_url() -> str:
+    """Base URL of the log service."""
+    return f"http://{Config.LOG_SERVICE_HOST}:{Config.LOG_SERVICE_PORT}"
+
+
+class LogServiceClient:
+    """Write interaction logs through the log service.
+
+    Has the same ``log_interactions`` method as ``Database``, so the log
+    sink can use either.
+    """
+
+    def __init__(self, base_url: Optional[str] = None):
+        """Initialize the client."""
+        self.base_url = (base_url or log_service_url()).rstrip("/")
+        self.http = httpx.AsyncClient(timeout=10)
+
+    async def log_interactions(self, records: list[tuple]) -> None:
+        """Send records to the service; returns once they are committed."""
+        response = await self.http.post(f"{self.base_url}/interactions", json={"records": records})
+        response.raise_for_status()
+
+    async def close(self) -> None:
+        """Close the HTTP client."""
+        await self.http.aclose()
+
+
+def build_log_service_app(db: Database) -> web.Application:
+    """aiohttp application accepting log batches on POST /interactions."""
+
+    async def write(request: web.Request) -> web.Response:
+        """Write one batch of log records."""
+        try:
+            records = [tuple(record) for record in (await request.json())["records"]]
+        except (ValueError, KeyError, TypeError):
+            return web.json_response({"error": "expected {\"records\": [[...], ...]}"}, status=400)
+        if any(len(record) != RECORD_FIELDS for record in records):
+            return web.json_response({"error": f"each record needs {RECORD_FIELDS} fields"}, status=400)
+        await db.log_interactions(records)
+        return web.json_response({"written": len(records)})
+
+    async def health(_: web.Request) -> web.Response:
+        """Report that the service is up."""
+        return web.json_response({"status": "ok"})
+
+    app = web.Application(client_max_size=16 * 1024 * 1024)
+    app.router.add_post("/interactions", write)
+    app.router.add_get("/health", health)
+    return app
+
+
+async def run_log_service() -> None:
+    """Serve the log service until SIGINT/SIGTERM."""
+    Config.ensure_dirs()
+    db = init_db()
+    runner = web.AppRunner(build_log_service_app(db))
+    await runner.setup()
+    site = web.TCPSite(runner, Config.LOG_SERVICE_HOST, Config.LOG_SERVICE_PORT)
+    await site.start()
+    logger.info(f"Log service writing to {Config.DB_PATH}, listening on {log_service_url()}")
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:  # Windows
+            pass
+    try:
+        await stop.wait()
+    finally:
+        await runner.cleanup()
+        await close_db()
+        logger.info("Log service stopped")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    )
+    asyncio.run(run_log_service())
@@ -0,0 +1,155 @@
+"""Buffered, batched writer for interaction logs."""
+
+import asyncio
+import logging
+from datetime import datetime
+from typing import Optional, Union
+
+from app.config import Config
+from app.db import Database
+from app.logservice import LogServiceClient
+
+logger = logging.getLogger(__name__)
+
+POLICY_BLOCK = "block"
+POLICY_DROP = "drop"
+
+
+class InteractionLogSink:
+    """Queue interaction log records in memory and write them in batches.
+
+    A background task flushes the buffer with one ``executemany`` transaction
+    whenever ``batch_size`` records are waiting or ``flush_interval_ms`` has
+    passed. When ``max_queue`` records are buffered, new records either wait
+    for the next flush (``block``) or are discarded and counted (``drop``).
+    Batches go to the database, or to the log service in multi-process
+    deployments.
+    """
+
+    def __init__(
+        self,
+        db: Union[Database, LogServiceClient],
+        batch_size: int = Config.LOG_BATCH_SIZE,
+        flush_interval_ms: int = Config.LOG_FLUSH_INTERVAL_MS,
+        max_queue: int = Config.LOG_QUEUE_MAX,
+        policy: str = Config.LOG_QUEUE_POLICY,
+    ):
+        """Initialize the sink (call start() to begin background flushing)."""
+        if policy not in (POLICY_BLOCK, POLICY_DROP):
+            raise ValueError(f"Unknown LOG_QUEUE_POLICY: {policy}")
+        self.db = db
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_queue = max(max_queue, batch_size)
+        self.policy = policy
+
+        self._buffer: list[tuple] = []
+        self._flush_lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._not_full = asyncio.Event()
+        self._not_full.set()
+        self._task: Optional[asyncio.Task] = None
+
+        self.written = 0
+        self.dropped = 0
+
+    def start(self) -> None:
+        """Start the background flush task."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def log_interaction(
+        self,
+        telegram_id: int,
+        question: str,
+        action: str,
+        internal_sources: Optional[str] = None,
+        retrieval_scores: Optional[str] = None,
+    ) -> None:
+        """Queue a user interaction for logging (same arguments as Database.log_interaction)."""
+        record = (
+            telegram_id,
+            question,
+            action,
+            internal_sources,
+            retrieval_scores,
+            datetime.utcnow().isoformat(),
+        )
+
+        while len(self._buffer) >= self.max_queue:
+            if self.policy == POLICY_DROP:
+                self.dropped += 1
+                logger.warning(f"Log queue full ({self.max_queue}), dropped record for user {telegram_id}")
+                return
+            self._not_full.clear()
+            self._wakeup.set()
+            await self._not_full.wait()
+
+        self._buffer.append(record)
+        if len(self._buffer) >= self.batch_size:
+            self._wakeup.set()
+
+    async def flush(self) -> None:
+        """Write everything buffered so far."""
+        async with self._flush_lock:
+            if not self._buffer:
+                return
+            batch, self._buffer = self._buffer, []
+            self._not_full.set()
+            try:
+                await self.db.log_interactions(batch)
+                self.written += len(batch)
+            except Exception as e:
+                # Put the batch back (as far as capacity allows) for the next flush
+                room = max(self.max_queue - len(self._buffer), 0)
+                self._buffer[:0] = batch[:room]
+                self.dropped += len(batch) - room
+                logger.error(f"Failed to write {len(batch)} log records: {e}")
+
+    async def _run(self) -> None:
+        """Flush every batch_size records or every flush_interval."""
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def close(self) -> None:
+        """Stop background flushing and write any remaining records."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+        logger.info(f"Log sink closed ({self.written} written, {self.dropped} dropped)")
+
+
+# Process-lifetime instance, managed by init_log_sink() / close_log_sink()
+_log_sink: Optional[InteractionLogSink] = None
+
+
+def init_log_sink(db: Database) -> InteractionLogSink:
+    """Create and start the shared log sink (call once at startup).
+
+    With ``LOG_BACKEND=service`` records are sent to the log service instead of ``db``.
+    """
+    global _log_sink
+    if _log_sink is None:
+        _log_sink = InteractionLogSink(LogServiceClient() if Config.LOG_BACKEND == "service" else db)
+        _log_sink.start()
+    return _log_sink
+
+
+async def close_log_sink() -> None:
+    """Flush and stop the shared log sink (call once at shutdown)."""
+    global _log_sink
+    if _log_sink is not None:
+        await _log_sink.close()
+        if isinstance(_log_sink.db, LogServiceClient):
+            await _log_sink.db.close()
+        _log_sink = None
@@ -3,10 +3,23 @@
 import asyncio
 import logging
 from aiogram import Bot, Dispatcher
-from aiogram.fsm.storage.memory import MemoryStorage
 
+from app.admission import AdmissionController
+from app.answer_cache import SemanticAnswerCache
+from app.chunking import check_tokenizer
+from app.coalesce import SingleFlight
 from app.config import Config
+from app.db import close_db, init_db
+from app.embed_cache import close_query_cache, init_query_cache
+from app.events import EVENT_KB_CHANGED, close_event_channel, init_event_channel
+from app.fsm_storage import create_fsm_storage
 from app.handlers import router
+from app.ingest_pipeline import close_extract_pool
+from app.jobs import close_job_worker, init_job_worker
+from app.logsink import close_log_sink, init_log_sink
+from app.openrouter import close_http_client, init_http_client
+from app.rag import close_rag_system, init_rag_system
+from app.webhook import run_webhook
 
 # Configure logging
 logging.basicConfig(
@@ -16,30 +29,72 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+async def on_startup(dispatcher: Dispatcher, bot: Bot) -> None:
+    """Create process-wide resources before handling updates.
+
+    The database, log sink, RAG system and job worker are put into the
+    dispatcher's workflow data, so handlers receive them as the ``db``,
+    ``log_sink``, ``rag`` and ``jobs`` arguments.
+    """
+    await init_http_client()
+    events = await init_event_channel()
+    dispatcher["db"] = db = init_db()
+    dispatcher["log_sink"] = init_log_sink(db)
+    dispatcher["rag"] = rag = init_rag_system(init_query_cache())
+    # Another worker changed the index: reopen it (which also drops cached answers)
+    events.subscribe(EVENT_KB_CHANGED, lambda _: rag.reload())
+    dispatcher["jobs"] = await init_job_worker(db, rag, bot, events)
+    dispatcher["admission"] = AdmissionController()
+    if Config.ANSWER_CACHE_ENABLED:
+        dispatcher["answer_cache"] = SemanticAnswerCache()
+    if Config.QUESTION_COALESCING:
+        dispatcher["question_flights"] = SingleFlight()
+
+
+async def on_shutdown() -> None:
+    """Release process-wide resources after the dispatcher stops."""
+    await close_job_worker()
+    await close_event_channel()
+    close_rag_system()
+    await close_query_cache()
+    await close_log_sink()
+    await close_db()
+    await close_http_client()
+    close_extract_pool()
+
+
 async def main() -> None:
     """Run the bot."""
     # Validate config
     Config.validate()
     Config.ensure_dirs()
+    check_tokenizer()
 
-    logger.info("Starting crypto exchange onboarding bot...")
+    logger.info(f"Starting crypto exchange onboarding bot (worker {Config.WORKER_ID})...")
     logger.info(f"Chat model: {Config.OR_CHAT_MODEL}")
     logger.info(f"Embed model: {Config.OR_EMBED_MODEL}")
-    logger.info(f"Vector store: {Config.CHROMA_PERSIST_DIR}")
+    if Config.CHROMA_MODE == "http":
+        logger.info(f"Vector store: Chroma server at {Config.CHROMA_HOST}:{Config.CHROMA_PORT}")
+    else:
+        logger.info(f"Vector store: {Config.CHROMA_PERSIST_DIR}")
     logger.info(f"Docs directory: {Config.DOCS_DIR}")
 
     # Initialize bot
     bot = Bot(token=Config.TELEGRAM_BOT_TOKEN)
-    storage = MemoryStorage()
-    dp = Dispatcher(storage=storage)
+    dp = Dispatcher(storage=create_fsm_storage())
 
-    # Register handlers
+    # Register handlers and lifecycle hooks
     dp.include_router(router)
-
-    logger.info("Bot started. Polling for messages...")
+    dp.startup.register(on_startup)
+    dp.shutdown.register(on_shutdown)
 
     try:
-        await dp.start_polling(bot)
+        if Config.BOT_MODE == "webhook":
+            logger.info("Bot started. Receiving updates by webhook...")
+            await run_webhook(dp, bot)
+        else:
+            logger.info("Bot started. Polling for messages...")
+            await dp.start_polling(bot)
     except Exception as e:
         logger.error(f"Bot error: {e}")
     finally:
@@ -0,0 +1,115 @@
+"""Manifest of indexed files and chunk content hashes."""
+
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Optional
+
+from app.config import Config
+from app.dedup import DuplicateIndex
+
+logger = logging.getLogger(__name__)
+
+
+def hash_file(path: Path) -> str:
+    """SHA-256 of a file's bytes."""
+    digest = hashlib.sha256()
+    with path.open("rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def hash_text(text: str) -> str:
+    """Short content hash of a chunk's text."""
+    return hashlib.sha256(text.encode()).hexdigest()[:16]
+
+
+DEFAULT_COLLECTION = "knowledge_base"
+
+
+class IndexManifest:
+    """Record of what is in the vector store, used for incremental reindexing.
+
+    It names the live Chroma collection and, for every indexed file, keeps
+    the file's hash, the chunker it was split with and a map of
+    ``chunk_id -> content hash`` for the chunks stored from it. With
+    ``INGEST_DEDUP`` it also holds the groups of duplicate chunks that share
+    one stored chunk (see ``DuplicateIndex``). The manifest lives next to the
+    Chroma data, so deleting the store also resets it. Saving is atomic,
+    which makes it the switch point for blue/green rebuilds.
+    """
+
+    def __init__(self, path: Path, collection: str = DEFAULT_COLLECTION, load: bool = True):
+        """Load the manifest from disk (an unreadable file starts empty)."""
+        self.path = path
+        self.collection = collection
+        self.files: dict[str, dict] = {}
+        groups: dict[str, dict] = {}
+        if load and path.exists():
+            try:
+                data = json.loads(path.read_text(encoding="utf-8"))
+                self.files = data.get("files", {})
+                self.collection = data.get("collection", collection)
+                groups = data.get("duplicates", {})
+            except (OSError, ValueError) as e:
+                logger.warning(f"Ignoring unreadable index manifest {path}: {e}")
+        self.duplicates: Optional[DuplicateIndex] = DuplicateIndex(groups) if Config.INGEST_DEDUP else None
+
+    def file_hash(self, filename: str) -> Optional[str]:
+        """Hash of the file as last indexed, or None if not indexed."""
+        entry = self.files.get(filename)
+        return entry["file_hash"] if entry else None
+
+    def is_current(self, filename: str, file_hash: str, chunker: str) -> bool:
+        """Whether a file is indexed at this hash with this chunker."""
+        entry = self.files.get(filename)
+        return bool(entry) and entry["file_hash"] == file_hash and entry.get("chunker") == chunker
+
+    def chunks(self, filename: str) -> dict[str, str]:
+        """``chunk_id -> content hash`` for a file's indexed chunks."""
+        entry = self.files.get(filename)
+        return dict(entry["chunks"]) if entry else {}
+
+    def set_file(
+        self,
+        filename: str,
+        file_hash: str,
+        chunks: dict[str, str],
+        chunker: Optional[str] = None,
+    ) -> None:
+        """Record a file as indexed."""
+        self.files[filename] = {"file_hash": file_hash, "chunker": chunker, "chunks": chunks}
+
+    def remove_file(self, filename: str) -> None:
+        """Forget a file."""
+        self.files.pop(filename, None)
+
+    def clear(self) -> None:
+        """Forget all files."""
+        self.files = {}
+        if self.duplicates is not None:
+            self.duplicates = DuplicateIndex()
+
+    def chunk_count(self) -> int:
+        """Total number of chunks recorded."""
+        return sum(len(entry["chunks"]) for entry in self.files.values())
+
+    def stored_count(self) -> int:
+        """Number of chunks the vector store should hold (duplicates are stored once)."""
+        chunk_ids = {chunk_id for entry in self.files.values() for chunk_id in entry["chunks"]}
+        if self.duplicates is None:
+            return len(chunk_ids)
+        return len({self.duplicates.stored_id(chunk_id) for chunk_id in chunk_ids})
+
+    def save(self) -> None:
+        """Write the manifest atomically."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        data = {"collection": self.collection, "files": self.files}
+        if self.duplicates is not None:
+            data["duplicates"] = self.duplicates.groups
+        tmp_path.write_text(json.dumps(data), encoding="utf-8")
+        os.replace(tmp_path, self.path)
@@ -1,39 +1,249 @@
 """OpenRouter API client wrapper."""
 
+import asyncio
+import itertools
+import json
 import logging
-from typing import Optional
+import time
+from typing import AsyncIterator, Optional
 
 import httpx
 
 from app.config import Config
+from app.deadline import budget_allows, budget_timeout
+from app.resilience import (
+    backoff_delay,
+    count,
+    get_circuit_breaker,
+    get_latency_tracker,
+    is_retryable_status,
+    retry_after_seconds,
+)
 
 logger = logging.getLogger(__name__)
 
+# Process-wide connection pool shared by every OpenRouterClient
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def _build_http_client() -> httpx.AsyncClient:
+    """Create the pooled HTTP client from configuration."""
+    http2 = Config.OR_HTTP2
+    if http2:
+        try:
+            import h2  # noqa: F401
+        except ImportError:
+            logger.warning("OR_HTTP2 is enabled but the 'h2' package is not installed, using HTTP/1.1")
+            http2 = False
+
+    return httpx.AsyncClient(
+        http2=http2,
+        timeout=60,
+        limits=httpx.Limits(
+            max_connections=Config.OR_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=Config.OR_HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=Config.OR_HTTP_KEEPALIVE_EXPIRY,
+        ),
+    )
+
+
+async def init_http_client() -> httpx.AsyncClient:
+    """Create the shared HTTP client (call once at startup)."""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = _build_http_client()
+        logger.info(
+            f"OpenRouter HTTP pool ready (max_connections={Config.OR_HTTP_MAX_CONNECTIONS}, "
+            f"max_keepalive={Config.OR_HTTP_MAX_KEEPALIVE}, http2={Config.OR_HTTP2})"
+        )
+    return _http_client
+
+
+async def close_http_client() -> None:
+    """Close the shared HTTP client (call once at shutdown)."""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+        logger.info("OpenRouter HTTP pool closed")
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Get the shared HTTP client, creating it lazily if startup did not."""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = _build_http_client()
+    return _http_client
+
 
 class OpenRouterClient:
-    """Async client for OpenRouter API."""
+    """Async client for OpenRouter API.
+
+    Requests are retried with jittered backoff on 429, 5xx and connection
+    errors (honouring ``Retry-After``), go through the shared circuit
+    breaker, and with ``OR_HEDGE`` on embeddings requests are duplicated once
+    when slower than the recent ``OR_HEDGE_PERCENTILE`` latency (non-streamed
+    chat only with ``OR_HEDGE_CHAT``, since a duplicate generation is billed
+    too). Inside a deadline stage, timeouts shrink to the time left and
+    retries stop when it runs out.
+    """
 
-    def __init__(self, api_key: str, base_url: str = "https://openrouter.ai/api/v1"):
-        """Initialize the client."""
+    def __init__(
+        self,
+        api_key: str,
+        base_url: str = "https://openrouter.ai/api/v1",
+        http_client: Optional[httpx.AsyncClient] = None,
+    ):
+        """Initialize the client.
+
+        Requests go through ``http_client`` if given, otherwise through the
+        process-wide pool from ``get_http_client()``.
+        """
         self.api_key = api_key
         self.base_url = base_url.rstrip("/")
+        self._http_client = http_client
+
+    @property
+    def http(self) -> httpx.AsyncClient:
+        """HTTP client used for requests."""
+        return self._http_client or get_http_client()
+
+    def _headers(self) -> dict:
+        """Request headers for OpenRouter."""
+        return {
+            "Authorization": f"Bearer {self.api_key}",
+            "HTTP-Referer": "https://github.com/crypto-exchange-bot",
+        }
+
+    async def _post(self, endpoint: str, payload: dict, timeout: float) -> dict:
+        """POST JSON to an endpoint with retries, the circuit breaker and hedging; returns the response JSON."""
+        url = f"{self.base_url}/{endpoint}"
+        breaker = get_circuit_breaker()
+        for attempt in itertools.count():
+            breaker.check()
+            try:
+                response = await self._send(endpoint, url, payload, budget_timeout(timeout))
+            except httpx.TransportError:
+                delay = self._retry_delay(endpoint, attempt)
+                if delay is None:
+                    raise
+            else:
+                if not is_retryable_status(response.status_code):
+                    breaker.record_success()
+                    response.raise_for_status()
+                    return response.json()
+                delay = self._retry_delay(endpoint, attempt, response)
+                if delay is None:
+                    response.raise_for_status()
+            await asyncio.sleep(delay)
+
+    async def _send(self, endpoint: str, url: str, payload: dict, timeout: float) -> httpx.Response:
+        """Send one attempt, hedged if enabled and enough latencies are known."""
+        tracker = get_latency_tracker(endpoint)
+        hedge = Config.OR_HEDGE and (endpoint == "embeddings" or Config.OR_HEDGE_CHAT)
+        hedge_after = tracker.percentile(Config.OR_HEDGE_PERCENTILE) if hedge else None
+        started = time.monotonic()
+        if hedge_after is None:
+            response = await self._request(url, payload, timeout)
+        else:
+            response = await self._hedged(url, payload, timeout, max(hedge_after, Config.OR_HEDGE_MIN_DELAY))
+        if response.status_code < 400:
+            tracker.record(time.monotonic() - started)
+        return response
+
+    async def _request(self, url: str, payload: dict, timeout: float) -> httpx.Response:
+        """Send a single POST."""
+        return await self.http.post(url, json=payload, headers=self._headers(), timeout=timeout)
+
+    async def _hedged(self, url: str, payload: dict, timeout: float, delay: float) -> httpx.Response:
+        """Send a request and, if it has not answered after ``delay`` seconds, a second copy.
+
+        The first successful response wins and the other request is cancelled.
+        """
+        primary = asyncio.create_task(self._request(url, payload, timeout))
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        if done:
+            return primary.result()
+
+        count("hedges")
+        hedge = asyncio.create_task(self._request(url, payload, timeout))
+        pending = {primary, hedge}
+        try:
+            while True:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in sorted(done, key=_failed):
+                    if _failed(task) and pending:
+                        continue  # the other copy may still succeed
+                    if task is hedge and not _failed(task):
+                        count("hedge_wins")
+                    return task.result()
+        finally:
+            for task in (primary, hedge):
+                task.cancel()
+
+    def _retry_delay(self, endpoint: str, attempt: int, response: Optional[httpx.Response] = None) -> Optional[float]:
+        """Account for a failed attempt (a connection error if no response).
+
+        Returns the seconds to wait before retrying, or None to give up.
+        """
+        if response is None or response.status_code != 429:
+            # A 429 means the provider is up but busy; only errors count toward the breaker
+            get_circuit_breaker().record_failure()
+        if attempt >= Config.OR_RETRY_MAX:
+            return None
+        retry_after = retry_after_seconds(response) if response is not None else None
+        if retry_after is None:
+            delay = backoff_delay(attempt)
+        elif retry_after > Config.OR_RETRY_MAX_DELAY:
+            return None
+        else:
+            delay = retry_after
+        if not budget_allows(delay):
+            return None
+        count("retries")
+        reason = f"HTTP {response.status_code}" if response is not None else "connection error"
+        logger.warning(
+            f"OpenRouter {endpoint} failed ({reason}), retry {attempt + 1}/{Config.OR_RETRY_MAX} in {delay:.2f}s"
+        )
+        return delay
 
     async def embed(self, text: str, model: Optional[str] = None) -> list[float]:
         """Get embeddings for text."""
         model = model or Config.OR_EMBED_MODEL
 
-        async with httpx.AsyncClient(timeout=30) as client:
-            response = await client.post(
-                f"{self.base_url}/embeddings",
-                json={"input": text, "model": model},
-                headers={
-                    "Authorization": f"Bearer {self.api_key}",
-                    "HTTP-Referer": "https://github.com/crypto-exchange-bot",
-                },
-            )
-            response.raise_for_status()
-            data = response.json()
-            return data["data"][0]["embedding"]
+        data = await self._post("embeddings", {"input": text, "model": model}, timeout=30)
+        return data["data"][0]["embedding"]
+
+    async def embed_batch(
+        self,
+        texts: list[str],
+        model: Optional[str] = None,
+        batch_size: Optional[int] = None,
+        max_tokens: Optional[int] = None,
+    ) -> list[list[float]]:
+        """Get embeddings for many texts, sending them in as few requests as possible.
+
+        Inputs are grouped so that each request carries at most ``batch_size``
+        texts and roughly ``max_tokens`` tokens. Embeddings are returned in the
+        same order as ``texts``.
+        """
+        model = model or Config.OR_EMBED_MODEL
+        batch_size = batch_size or Config.OR_EMBED_BATCH_SIZE
+        max_tokens = max_tokens or Config.OR_EMBED_BATCH_MAX_TOKENS
+
+        embeddings: list[list[float]] = []
+        for batch in _split_batches(texts, batch_size, max_tokens):
+            data = (await self._post("embeddings", {"input": batch, "model": model}, timeout=60))["data"]
+            if len(data) != len(batch):
+                raise ValueError(
+                    f"Embeddings response has {len(data)} items for {len(batch)} inputs"
+                )
+            # The API may return items out of order; "index" is authoritative
+            data.sort(key=lambda item: item.get("index", 0))
+            embeddings.extend(item["embedding"] for item in data)
+            logger.debug(f"Embedded batch of {len(batch)} texts")
+
+        return embeddings
 
     async def chat(
         self,
@@ -45,27 +255,114 @@ class OpenRouterClient:
         """Call LLM with message history."""
         model = model or Config.OR_CHAT_MODEL
 
-        async with httpx.AsyncClient(timeout=60) as client:
-            response = await client.post(
-                f"{self.base_url}/chat/completions",
-                json={
-                    "model": model,
-                    "messages": messages,
-                    "temperature": temperature,
-                    "max_tokens": max_tokens,
-                },
-                headers={
-                    "Authorization": f"Bearer {self.api_key}",
-                    "HTTP-Referer": "https://github.com/crypto-exchange-bot",
-                },
-            )
-            response.raise_for_status()
-            data = response.json()
-            return data["choices"][0]["message"]["content"]
+        data = await self._post(
+            "chat/completions",
+            {
+                "model": model,
+                "messages": messages,
+                "temperature": temperature,
+                "max_tokens": max_tokens,
+            },
+            timeout=60,
+        )
+        return data["choices"][0]["message"]["content"]
+
+    async def chat_stream(
+        self,
+        messages: list[dict],
+        model: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: int = 500,
+    ) -> AsyncIterator[str]:
+        """Call LLM with message history, yielding the answer text as it is generated.
+
+        Reads OpenRouter's server-sent events stream. Closing the iterator
+        early (e.g. breaking out of the loop) closes the connection, which
+        stops generation. Failures are retried like other requests, but only
+        until the first text has been yielded.
+        """
+        model = model or Config.OR_CHAT_MODEL
+        request = {
+            "model": model,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "stream": True,
+        }
+        breaker = get_circuit_breaker()
+        started = False
+
+        for attempt in itertools.count():
+            breaker.check()
+            try:
+                async with self.http.stream(
+                    "POST",
+                    f"{self.base_url}/chat/completions",
+                    json=request,
+                    headers=self._headers(),
+                    timeout=budget_timeout(60),
+                ) as response:
+                    if is_retryable_status(response.status_code):
+                        delay = self._retry_delay("chat/completions", attempt, response)
+                        if delay is None:
+                            response.raise_for_status()
+                    else:
+                        breaker.record_success()
+                        response.raise_for_status()
+                        async for line in response.aiter_lines():
+                            # Blank lines separate events; lines starting with ":" are keep-alive comments
+                            if not line.startswith("data:"):
+                                continue
+                            payload = line[5:].strip()
+                            if payload == "[DONE]":
+                                break
+                            data = json.loads(payload)
+                            if "error" in data:
+                                raise RuntimeError(f"OpenRouter stream error: {data['error']}")
+                            choices = data.get("choices") or []
+                            content = choices[0].get("delta", {}).get("content") if choices else None
+                            if content:
+                                started = True
+                                yield content
+                        return
+            except httpx.TransportError:
+                delay = None if started else self._retry_delay("chat/completions", attempt)
+                if delay is None:
+                    raise
+            await asyncio.sleep(delay)
+
+
+def _failed(task: asyncio.Task) -> bool:
+    """Whether a finished request task raised or got a retryable status."""
+    return task.exception() is not None or is_retryable_status(task.result().status_code)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for an input (about 4 characters per token)."""
+    return len(text) // 4 + 1
+
+
+def _split_batches(texts: list[str], batch_size: int, max_tokens: int) -> list[list[str]]:
+    """Group texts into batches bounded by item count and estimated tokens."""
+    batches: list[list[str]] = []
+    current: list[str] = []
+    current_tokens = 0
+
+    for text in texts:
+        tokens = estimate_tokens(text)
+        if current and (len(current) >= batch_size or current_tokens + tokens > max_tokens):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(text)
+        current_tokens += tokens
+
+    if current:
+        batches.append(current)
+    return batches
 
 
 def get_openrouter_client() -> OpenRouterClient:
-    """Get configured OpenRouter client."""
+    """Get configured OpenRouter client (backed by the shared connection pool)."""
     return OpenRouterClient(
         api_key=Config.OPENROUTER_API_KEY,
         base_url=Config.OPENROUTER_BASE_URL,
@@ -0,0 +1,186 @@
+"""Keyword pre-filters for incoming questions (sensitive topics, source requests)."""
+
+import json
+import logging
+import os
+import re
+import string
+import time
+from pathlib import Path
+from typing import Optional
+
+from app.config import Config
+
+logger = logging.getLogger(__name__)
+
+SOURCE_REQUEST = "source_request"
+SENSITIVE = "sensitive"
+
+
+# Punctuation becomes a word break; str.translate + split is several times faster than re.findall
+_PUNCTUATION = str.maketrans({c: " " for c in string.punctuation.replace("_", "") + "“”‘’«»…–—"})
+
+
+def _words(lowered: str) -> list[str]:
+    """Words of lowercased text."""
+    return lowered.translate(_PUNCTUATION).split()
+
+
+class _Node:
+    """Trie node: one word of a keyword phrase."""
+
+    __slots__ = ("next", "categories", "prefixes")
+
+    def __init__(self):
+        self.next: dict[str, "_Node"] = {}
+        self.categories: frozenset[str] = frozenset()
+        # (word prefix, categories) for keywords whose last word ends in ``*``
+        self.prefixes: list[tuple[str, frozenset[str]]] = []
+
+
+class KeywordMatcher:
+    """Compiled keyword lists: a word trie plus one regex for prefix keywords.
+
+    Keywords are matched on whole words (so "tax" does not match "syntax")
+    and phrases on consecutive words; a trailing ``*`` lets the last word
+    match any word starting with it ("launder*" matches "laundering").
+    """
+
+    def __init__(self, categories: dict[str, list[str]]):
+        """Compile the keyword lists."""
+        self.root = _Node()
+        root_prefixes: dict[str, frozenset[str]] = {}
+        for category, keywords in categories.items():
+            for keyword in keywords:
+                prefix = keyword.strip().endswith("*")
+                words = _words(keyword.lower().rstrip("*"))
+                if not words:
+                    continue
+                node = self.root
+                for word in words[:-1]:
+                    node = node.next.setdefault(word, _Node())
+                if prefix and node is self.root:
+                    root_prefixes[words[-1]] = root_prefixes.get(words[-1], frozenset()) | {category}
+                elif prefix:
+                    node.prefixes.append((words[-1], frozenset({category})))
+                else:
+                    node = node.next.setdefault(words[-1], _Node())
+                    node.categories = node.categories | {category}
+
+        # Single-word prefix keywords can start anywhere, so they get their own regex
+        self._root_prefixes = root_prefixes
+        self._prefix_words = tuple(root_prefixes)
+        self._prefix_re = re.compile(
+            r"\b(" + "|".join(sorted(map(re.escape, root_prefixes), key=len, reverse=True)) + r")\w*"
+        ) if root_prefixes else None
+        self._first_words = frozenset(self.root.next)
+
+    def match(self, text: str) -> set[str]:
+        """Categories of all keywords found in text."""
+        lowered = text.lower()
+        words = _words(lowered)
+        found: set[str] = set()
+
+        # Substring checks are cheap; the regex only runs when one of them hits
+        if self._prefix_re is not None and any(p in lowered for p in self._prefix_words):
+            for prefix in self._prefix_re.findall(lowered):
+                found |= self._root_prefixes[prefix]
+
+        # Most words start no keyword; only walk the trie from those that do
+        if self._first_words.isdisjoint(words):
+            return found
+        root_next = self.root.next
+        for start, word in enumerate(words):
+            node = root_next.get(word)
+            if node is None:
+                continue
+            found |= node.categories
+            for following in words[start + 1:start + 8]:
+                for prefix, categories in node.prefixes:
+                    if following.startswith(prefix):
+                        found |= categories
+                node = node.next.get(following)
+                if node is None:
+                    break
+                found |= node.categories
+        return found
+
+
+class KeywordPrefilter:
+    """Classify text into keyword categories in a single pass over its words.
+
+    Keyword lists are read from a JSON file mapping category names to
+    keywords. The file is checked for changes at most every
+    ``reload_interval`` seconds and recompiled when it changes; if a new
+    version cannot be loaded, the previous keywords stay in use.
+    """
+
+    def __init__(
+        self,
+        path: Path = Config.PREFILTER_KEYWORDS_PATH,
+        reload_interval: float = Config.PREFILTER_RELOAD_INTERVAL,
+    ):
+        """Load and compile the keyword file."""
+        self.path = path
+        self.reload_interval = reload_interval
+        self.categories: list[str] = []
+        self._matcher = KeywordMatcher({})
+        self._mtime: Optional[float] = None
+        self._next_check = 0.0
+        self._reload(force=True)
+
+    def _reload(self, force: bool = False) -> None:
+        """Recompile the keyword file if it changed."""
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError as e:
+            if force:
+                logger.error(f"Pre-filter keyword file {self.path} not found: {e}")
+            return
+        if not force and mtime == self._mtime:
+            return
+        # Remember the version even if it is broken, so it is reported once
+        self._mtime = mtime
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+            if not isinstance(data, dict) or not all(isinstance(v, list) for v in data.values()):
+                raise ValueError("expected an object mapping category names to keyword lists")
+            self._matcher = KeywordMatcher(data)
+            self.categories = list(data)
+            logger.info(f"Loaded pre-filter keywords from {self.path}: {', '.join(self.categories)}")
+        except (OSError, ValueError, AttributeError) as e:
+            logger.error(f"Failed to load pre-filter keywords from {self.path}, keeping previous ones: {e}")
+
+    def _maybe_reload(self) -> None:
+        """Check the keyword file for changes, at most once per reload interval."""
+        now = time.monotonic()
+        if now >= self._next_check:
+            self._next_check = now + self.reload_interval
+            self._reload()
+
+    def classify(self, text: str) -> set[str]:
+        """Categories whose keywords appear in text."""
+        self._maybe_reload()
+        return self._matcher.match(text)
+
+
+# Process-lifetime instance, created on first use
+_prefilter: Optional[KeywordPrefilter] = None
+
+
+def get_prefilter() -> KeywordPrefilter:
+    """Get the shared pre-filter, loading it on first use."""
+    global _prefilter
+    if _prefilter is None:
+        _prefilter = KeywordPrefilter()
+    return _prefilter
+
+
+def is_source_request(text: str) -> bool:
+    """Detect if user is asking for sources or documents."""
+    return SOURCE_REQUEST in get_prefilter().classify(text)
+
+
+def is_sensitive_topic(text: str) -> bool:
+    """Detect if user is asking about sensitive topics."""
+    return SENSITIVE in get_prefilter().classify(text)
@@ -0,0 +1,197 @@
+"""Live updates in a single, periodically edited Telegram message (progress, streamed answers)."""
+
+import asyncio
+import logging
+import time
+from typing import Optional
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import Message
+
+from app.config import Config
+
+logger = logging.getLogger(__name__)
+
+
+def format_eta(seconds: Optional[float]) -> str:
+    """Human-readable ETA."""
+    if seconds is None:
+        return "estimating..."
+    seconds = int(seconds)
+    if seconds < 60:
+        return f"{seconds}s"
+    minutes, seconds = divmod(seconds, 60)
+    if minutes < 60:
+        return f"{minutes}m {seconds}s"
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h {minutes}m"
+
+
+def format_progress(snapshot: dict) -> str:
+    """Progress text for an ingestion snapshot (see IngestPipeline)."""
+    return (
+        f"Pages: {snapshot['pages_done']}/{snapshot['pages_total']}\n"
+        f"Chunks embedded: {snapshot['chunks_embedded']}\n"
+        f"ETA: {format_eta(snapshot['eta_seconds'])}"
+    )
+
+
+class ProgressReporter:
+    """Edit one status message with ingestion progress.
+
+    ``update`` is synchronous so it can be passed as the pipeline's progress
+    callback. Edits are sent in the background at most once per
+    ``interval`` seconds (Telegram rate limits message edits); snapshots
+    arriving in between are skipped, but the latest is kept in ``snapshot``.
+    """
+
+    def __init__(
+        self,
+        bot: Bot,
+        chat_id: int,
+        message_id: Optional[int],
+        title: str,
+        interval: float = Config.TELEGRAM_EDIT_INTERVAL,
+    ):
+        """Initialize the reporter for an already sent status message."""
+        self.bot = bot
+        self.chat_id = chat_id
+        self.message_id = message_id
+        self.title = title
+        self.interval = interval
+        self.snapshot: Optional[dict] = None
+        self._last_text = ""
+        self._last_edit = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def update(self, snapshot: dict) -> None:
+        """Schedule an edit with the latest progress snapshot."""
+        self.snapshot = snapshot
+        now = time.monotonic()
+        if now - self._last_edit < self.interval or (self._task and not self._task.done()):
+            return
+        self._last_edit = now
+        self._task = asyncio.create_task(self._edit(f"{self.title}\n\n{format_progress(snapshot)}"))
+
+    async def finish(self, text: str) -> None:
+        """Replace the progress with the final result."""
+        if self._task is not None:
+            await asyncio.gather(self._task, return_exceptions=True)
+        if not await self._edit(text):
+            # The result must reach the admin even if the status message is gone
+            await self.bot.send_message(self.chat_id, text)
+
+    async def _edit(self, text: str) -> bool:
+        """Edit the status message. Returns False if the edit failed."""
+        if text == self._last_text:
+            return True
+        if self.message_id is None:
+            return False
+        try:
+            await self.bot.edit_message_text(text, chat_id=self.chat_id, message_id=self.message_id)
+            self._last_text = text
+            return True
+        except TelegramBadRequest as e:
+            if "message is not modified" in str(e):
+                return True
+            logger.warning(f"Failed to edit progress message: {e}")
+        except Exception as e:
+            logger.warning(f"Failed to edit progress message: {e}")
+        return False
+
+
+class StreamingReply:
+    """Show an answer in one reply message while it is being generated.
+
+    The first text is sent as soon as it arrives; later text is shown by
+    editing that message at most once per ``interval`` seconds, from a
+    background task so the stream is never blocked on Telegram.
+    """
+
+    def __init__(self, message: Message, interval: float = Config.TELEGRAM_EDIT_INTERVAL):
+        """Initialize a reply to ``message``."""
+        self.message = message
+        self.interval = interval
+        self.text = ""
+        self._reply: Optional[Message] = None
+        self._shown = ""
+        self._last_edit = 0.0
+        self._finished = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def append(self, text: str) -> None:
+        """Add answer text and schedule showing it."""
+        if not text:
+            return
+        self.text += text
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._pump())
+
+    async def finish(self, text: Optional[str] = None) -> None:
+        """Show the final text (the appended text by default) right away."""
+        self._finished.set()
+        if self._task is not None:
+            await asyncio.gather(self._task, return_exceptions=True)
+        text = self.text if text is None else text
+        if text and not await self._show(text) and self._reply is not None:
+            # The final answer must reach the user even if the edit failed
+            await self.message.answer(text)
+
+    async def _pump(self) -> None:
+        """Show the latest text until it is all shown, respecting the edit interval."""
+        while not self._finished.is_set() and self._shown != self.text:
+            delay = self._last_edit + self.interval - time.monotonic()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._finished.wait(), delay)
+                    return
+                except asyncio.TimeoutError:
+                    pass
+            await self._show(self.text)
+
+    async def _show(self, text: str) -> bool:
+        """Send or edit the reply. Returns False if that failed."""
+        if text == self._shown:
+            return True
+        self._last_edit = time.monotonic()
+        try:
+            if self._reply is None:
+                self._reply = await self.message.answer(text)
+            else:
+                await self._reply.edit_text(text)
+            self._shown = text
+            return True
+        except TelegramBadRequest as e:
+            if "message is not modified" in str(e):
+                self._shown = text
+                return True
+            logger.warning(f"Failed to update streamed reply: {e}")
+        except Exception as e:
+            logger.warning(f"Failed to update streamed reply: {e}")
+        return False
+
+
+class ReplyFanout:
+    """Stream the same answer text into any number of replies.
+
+    A reply added late is first given everything streamed so far.
+    """
+
+    def __init__(self):
+        """Start with no text and no replies."""
+        self.text = ""
+        self.replies: list[StreamingReply] = []
+
+    def add(self, reply: StreamingReply) -> None:
+        """Start streaming into reply."""
+        self.replies.append(reply)
+        reply.append(self.text)
+
+    def append(self, text: str) -> None:
+        """Add answer text to every reply."""
+        if not text:
+            return
+        self.text += text
+        for reply in self.replies:
+            reply.append(text)
@@ -1,33 +1,72 @@
 """RAG (Retrieval-Augmented Generation) system."""
 
+import asyncio
+import copy
 import json
 import logging
+import time
 from typing import Optional
 
 import chromadb
 from chromadb.config import Settings
 
 from app.config import Config
+from app.embed_batcher import EmbeddingBatcher
+from app.embed_cache import (
+    EmbeddingCacheStore,
+    QueryEmbeddingCache,
+    chunk_embedding_key,
+    get_query_cache,
+)
+from app.manifest import DEFAULT_COLLECTION, IndexManifest, hash_text
 from app.openrouter import get_openrouter_client
 
 logger = logging.getLogger(__name__)
 
 
+def create_chroma_client():
+    """Chroma client for CHROMA_MODE: embedded on-disk store, or a Chroma server shared by workers."""
+    settings = Settings(anonymized_telemetry=False)
+    if Config.CHROMA_MODE == "http":
+        return chromadb.HttpClient(host=Config.CHROMA_HOST, port=Config.CHROMA_PORT, settings=settings)
+    return chromadb.PersistentClient(path=str(Config.CHROMA_PERSIST_DIR), settings=settings)
+
+
 class RAGSystem:
     """Vector store and retrieval system."""
 
-    def __init__(self):
-        """Initialize RAG system with Chroma."""
-        settings = Settings(anonymized_telemetry=False)
-        self.client = chromadb.PersistentClient(
-            path=str(Config.CHROMA_PERSIST_DIR),
-            settings=settings,
-        )
+    def __init__(
+        self,
+        query_cache: Optional[QueryEmbeddingCache] = None,
+        embedding_store: Optional[EmbeddingCacheStore] = None,
+    ):
+        """Initialize RAG system with Chroma.
+
+        ``embedding_store``, if given, is consulted before embedding chunks so
+        identical text is never paid for twice.
+        """
+        self.client = create_chroma_client()
+        # The manifest names the live collection (it changes on blue/green rebuilds)
+        self.manifest = IndexManifest(Config.CHROMA_PERSIST_DIR / "manifest.json")
         self.collection = self.client.get_or_create_collection(
-            name="knowledge_base",
+            name=self.manifest.collection,
             metadata={"hnsw:space": "cosine"},
         )
         self.or_client = get_openrouter_client()
+        self.query_cache = query_cache
+        # Concurrent questions share embeddings requests
+        self.query_batcher = (
+            EmbeddingBatcher(self.or_client.embed_batch) if Config.QUERY_EMBED_BATCH_WINDOW_MS > 0 else None
+        )
+        self.embedding_store = embedding_store
+        # Bumped whenever the indexed content changes; cached answers are tagged with it
+        self.kb_version = 0
+
+        if self.manifest.files and self.collection.count() == 0:
+            # The store was wiped (or rebuilt elsewhere); the manifest no longer describes it
+            logger.warning("Vector store is empty but manifest lists files, resetting manifest")
+            self.manifest.clear()
+            self.manifest.save()
 
     async def add_chunk(
         self,
@@ -37,36 +76,249 @@ class RAGSystem:
         page: int = 1,
     ) -> None:
         """Add a text chunk to the vector store."""
-        # Get embedding
-        embedding = await self.or_client.embed(text)
-
-        # Store in Chroma with metadata
-        self.collection.add(
-            ids=[chunk_id],
-            embeddings=[embedding],
-            documents=[text],
-            metadatas=[
-                {
-                    "filename": filename,
-                    "page": page,
-                    "chunk_id": chunk_id,
-                }
-            ],
+        await self.add_chunks(
+            [{"chunk_id": chunk_id, "text": text, "filename": filename, "page": page}]
         )
-        logger.debug(f"Added chunk {chunk_id} from {filename}:p{page}")
+
+    async def add_chunks(self, chunks: list[dict]) -> int:
+        """Embed and add many chunks to the vector store in bulk.
+
+        Each chunk is a dict with ``chunk_id``, ``text``, ``filename``, ``page``
+        and optionally ``content_hash``. Embeddings are requested in batches and
+        written with one ``collection.upsert`` per batch, so existing IDs are
+        replaced. Returns the number of chunks added.
+        """
+        if not chunks:
+            return 0
+
+        batch_size = Config.OR_EMBED_BATCH_SIZE
+        reused = 0
+        for start in range(0, len(chunks), batch_size):
+            batch = chunks[start:start + batch_size]
+            embeddings, batch_reused = await self.embed_chunks([c["text"] for c in batch])
+            reused += batch_reused
+            await asyncio.to_thread(self.write_chunks, batch, embeddings)
+
+        if reused:
+            logger.info(f"Reused {reused} of {len(chunks)} chunk embeddings from the embedding store")
+        return len(chunks)
+
+    def write_chunks(self, chunks: list[dict], embeddings: list[list[float]]) -> None:
+        """Upsert already-embedded chunks (same dict shape as ``add_chunks``).
+
+        With duplicate collapsing on, a chunk that duplicates one already
+        stored is not written; it is added to that chunk's sources instead.
+        """
+        duplicates = self.manifest.duplicates
+        if duplicates is None:
+            self.collection.upsert(
+                ids=[c["chunk_id"] for c in chunks],
+                embeddings=embeddings,
+                documents=[c["text"] for c in chunks],
+                metadatas=[self._chunk_metadata(c["chunk_id"], c) for c in chunks],
+            )
+        else:
+            duplicates.begin()
+            try:
+                self._write_deduplicated(chunks, embeddings)
+            except BaseException:
+                duplicates.rollback()
+                raise
+            duplicates.commit()
+        self.kb_version += 1
+        logger.debug(f"Wrote {len(chunks)} chunks")
+
+    def _write_deduplicated(self, chunks: list[dict], embeddings: list[list[float]]) -> None:
+        """Assign chunks to duplicate groups, then apply the changes to Chroma."""
+        duplicates = self.manifest.duplicates
+        new: dict[str, tuple[dict, list[float]]] = {}
+        moved: list[tuple[str, str]] = []
+        touched: set[str] = set()
+
+        def stored_texts(ids: list[str]) -> dict[str, str]:
+            # Groups moved in this batch are still under their old ID in Chroma
+            origin = {new_id: old_id for old_id, new_id in moved}
+            texts = {i: new[i][0]["text"] for i in ids if i in new}
+            lookup = {origin.get(i, i): i for i in ids if i not in new}
+            if lookup:
+                found = self.collection.get(ids=list(lookup), include=["documents"])
+                texts.update((lookup[i], doc) for i, doc in zip(found["ids"], found["documents"]))
+            return texts
+
+        for chunk, embedding in zip(chunks, embeddings):
+            chunk_id = chunk["chunk_id"]
+            previous = duplicates.release(chunk_id)
+            if previous is not None:
+                touched.add(previous)
+            content_hash = chunk.get("content_hash") or hash_text(chunk["text"])
+            stored_id, bands = duplicates.find(chunk["text"], content_hash, stored_texts)
+            if stored_id is not None:
+                duplicates.add(stored_id, chunk_id, chunk["filename"], chunk["page"])
+                touched.add(stored_id)
+                continue
+            if duplicates.is_stored(chunk_id):
+                # Other chunks still share the text stored under this ID; move it first
+                new_id = duplicates.rehome(chunk_id)
+                moved.append((chunk_id, new_id))
+                touched.add(new_id)
+            duplicates.create(chunk_id, content_hash, bands, chunk["filename"], chunk["page"])
+            new[chunk_id] = (chunk, embedding)
+
+        for old_id, new_id in moved:
+            record = self.collection.get(ids=[old_id], include=["embeddings", "documents", "metadatas"])
+            if record["ids"]:
+                self.collection.upsert(
+                    ids=[new_id],
+                    embeddings=record["embeddings"],
+                    documents=record["documents"],
+                    metadatas=record["metadatas"],
+                )
+        if new:
+            self.collection.upsert(
+                ids=list(new),
+                embeddings=[embedding for _, embedding in new.values()],
+                documents=[chunk["text"] for chunk, _ in new.values()],
+                metadatas=[self._chunk_metadata(stored_id, chunk) for stored_id, (chunk, _) in new.items()],
+            )
+        self._sync_groups(touched - set(new))
+
+    def _chunk_metadata(self, stored_id: str, chunk: dict) -> dict:
+        """Chroma metadata for a stored chunk."""
+        metadata = {
+            "filename": chunk["filename"],
+            "page": chunk["page"],
+            "chunk_id": stored_id,
+            "content_hash": chunk.get("content_hash", ""),
+        }
+        duplicates = self.manifest.duplicates
+        if duplicates is not None and duplicates.is_stored(stored_id):
+            metadata["filename"], metadata["page"] = duplicates.first_source(stored_id)
+            metadata["sources"] = duplicates.sources(stored_id)
+        return metadata
+
+    def _sync_groups(self, stored_ids: set[str]) -> None:
+        """Refresh the sources of changed groups in Chroma and delete emptied ones."""
+        duplicates = self.manifest.duplicates
+        live = sorted(i for i in stored_ids if duplicates.is_stored(i))
+        gone = sorted(i for i in stored_ids if not duplicates.is_stored(i))
+        if live:
+            metadatas = []
+            for stored_id in live:
+                filename, page = duplicates.first_source(stored_id)
+                metadatas.append(
+                    {
+                        "filename": filename,
+                        "page": page,
+                        "chunk_id": stored_id,
+                        "content_hash": duplicates.groups[stored_id]["hash"],
+                        "sources": duplicates.sources(stored_id),
+                    }
+                )
+            self.collection.update(ids=live, metadatas=metadatas)
+        if gone:
+            self.collection.delete(ids=gone)
+
+    async def embed_chunks(self, texts: list[str]) -> tuple[list[list[float]], int]:
+        """Embed chunk texts, taking whatever the embedding store already has.
+
+        Returns the embeddings in input order and how many came from the store.
+        """
+        if self.embedding_store is None:
+            return await self.or_client.embed_batch(texts), 0
+
+        model = Config.OR_EMBED_MODEL
+        keys = [chunk_embedding_key(text, model) for text in texts]
+        known = await self.embedding_store.get_chunks(keys)
+
+        missing = {key: text for key, text in zip(keys, texts) if key not in known}
+        if missing:
+            fresh = await self.or_client.embed_batch(list(missing.values()), model=model)
+            new_items = dict(zip(missing.keys(), fresh))
+            await self.embedding_store.put_chunks(model, new_items)
+            known.update(new_items)
+
+        return [known[key] for key in keys], len(texts) - len(missing)
+
+    async def compact_embedding_store(self) -> dict:
+        """Drop stored chunk embeddings no longer referenced by the collection."""
+        if self.embedding_store is None:
+            return {"referenced": 0, "removed": 0}
+
+        model = Config.OR_EMBED_MODEL
+        referenced: set[str] = set()
+        page_size = 1000
+        offset = 0
+        while True:
+            page = self.collection.get(include=["documents"], limit=page_size, offset=offset)
+            documents = page["documents"] or []
+            referenced.update(chunk_embedding_key(text, model) for text in documents)
+            if len(documents) < page_size:
+                break
+            offset += page_size
+
+        removed = await self.embedding_store.compact_chunks(referenced)
+        logger.info(f"Compacted embedding store: {removed} removed, {len(referenced)} referenced")
+        return {"referenced": len(referenced), "removed": removed}
+
+    def delete_chunks(self, chunk_ids: list[str]) -> int:
+        """Delete chunks by ID. Returns the number of IDs deleted.
+
+        A stored chunk that other duplicates still share is kept, with the
+        deleted chunk removed from its sources.
+        """
+        if not chunk_ids:
+            return 0
+        duplicates = self.manifest.duplicates
+        if duplicates is None:
+            self.collection.delete(ids=chunk_ids)
+        else:
+            duplicates.begin()
+            try:
+                touched: set[str] = set()
+                ungrouped: list[str] = []
+                for chunk_id in chunk_ids:
+                    stored_id = duplicates.release(chunk_id)
+                    if stored_id is not None:
+                        touched.add(stored_id)
+                    elif not duplicates.is_stored(chunk_id):
+                        # Indexed before collapsing was enabled, so in no group
+                        ungrouped.append(chunk_id)
+                if ungrouped:
+                    self.collection.delete(ids=ungrouped)
+                self._sync_groups(touched)
+            except BaseException:
+                duplicates.rollback()
+                raise
+            duplicates.commit()
+        self.kb_version += 1
+        logger.debug(f"Deleted {len(chunk_ids)} chunks")
+        return len(chunk_ids)
+
+    async def embed_query(self, query: str) -> list[float]:
+        """Get the embedding for a user question, using the query cache if set."""
+        embed = self.query_batcher.embed if self.query_batcher is not None else self.or_client.embed
+        if self.query_cache is None:
+            return await embed(query)
+        return await self.query_cache.get_or_embed(query, embed)
 
     async def retrieve(
         self,
         query: str,
         top_k: int = 5,
         threshold: float = 0.6,
+        query_embedding: Optional[list[float]] = None,
     ) -> list[dict]:
-        """Retrieve relevant chunks for a query."""
+        """Retrieve relevant chunks for a query.
+
+        Pass ``query_embedding`` if the caller already embedded the query.
+        """
         # Get query embedding
-        query_embedding = await self.or_client.embed(query)
+        if query_embedding is None:
+            query_embedding = await self.embed_query(query)
 
-        # Search in Chroma
-        results = self.collection.query(
+        # Search in Chroma (in a thread, so the caller can time it out)
+        results = await asyncio.to_thread(
+            self.collection.query,
             query_embeddings=[query_embedding],
             n_results=top_k,
             include=["documents", "metadatas", "distances"],
@@ -97,22 +349,149 @@ class RAGSystem:
         )
         return retrieved
 
+    def create_staging_index(self, name: Optional[str] = None) -> "RAGSystem":
+        """Create an empty side collection to rebuild the index into.
+
+        Returns a RAGSystem view that shares this one's clients and stores but
+        writes to the new collection and its own side manifest. Queries keep
+        using the live collection until ``promote_index`` is called. Passing
+        the ``name`` of an earlier staging collection reopens it.
+        """
+        resume = name is not None and name != self.collection.name
+        name = name if resume else f"{DEFAULT_COLLECTION}_v{time.time_ns()}"
+        staging = copy.copy(self)
+        staging.collection = self.client.get_or_create_collection(
+            name=name,
+            metadata={"hnsw:space": "cosine"},
+        )
+        staging.manifest = IndexManifest(
+            self.manifest.path.with_name(f"manifest.{name}.json"),
+            collection=name,
+            load=resume,
+        )
+        staging.kb_version = 0
+        logger.info(f"{'Reopened' if resume else 'Created'} staging collection {name}")
+        return staging
+
+    def promote_index(self, staging: "RAGSystem") -> None:
+        """Validate a staging index and atomically make it the live one.
+
+        The staging collection must hold exactly the chunks its manifest
+        records, and at least one. On success the manifest (which names the
+        live collection) is replaced atomically, queries switch to the new
+        collection, and the previous collection is deleted.
+        """
+        count = staging.collection.count()
+        expected = staging.manifest.stored_count()
+        if count == 0 or count != expected:
+            raise ValueError(
+                f"Rebuilt index failed validation ({count} chunks stored, {expected} expected); "
+                f"keeping the current index"
+            )
+
+        old_name = self.collection.name
+        side_manifest = staging.manifest.path
+        staging.manifest.path = self.manifest.path
+        staging.manifest.save()
+        side_manifest.unlink(missing_ok=True)
+        self.collection = staging.collection
+        self.manifest = staging.manifest
+        self.kb_version += 1
+        logger.info(f"Switched live index to {self.collection.name} ({count} chunks)")
+
+        self._drop_collection(old_name)
+
+    def reload(self) -> None:
+        """Pick up index changes made by another process.
+
+        Re-reads the manifest, reopens the live collection (it may have been
+        replaced by a rebuild or recreated by a clear) and bumps ``kb_version``
+        so cached answers are dropped.
+        """
+        self.manifest = IndexManifest(self.manifest.path)
+        self.collection = self.client.get_or_create_collection(
+            name=self.manifest.collection,
+            metadata={"hnsw:space": "cosine"},
+        )
+        self.kb_version += 1
+        logger.info(f"Reloaded index {self.collection.name} after a change by another worker")
+
+    def discard_index(self, staging: "RAGSystem") -> None:
+        """Delete a staging collection that will not be promoted."""
+        self.discard_staging(staging.collection.name)
+
+    def discard_staging(self, name: str) -> None:
+        """Delete a staging collection and its side manifest by name."""
+        if name != self.collection.name:
+            self._drop_collection(name)
+            self.manifest.path.with_name(f"manifest.{name}.json").unlink(missing_ok=True)
+
+    def _drop_collection(self, name: str) -> None:
+        """Delete a collection, logging instead of failing."""
+        try:
+            self.client.delete_collection(name=name)
+            logger.info(f"Deleted collection {name}")
+        except Exception as e:
+            logger.warning(f"Could not delete collection {name}: {e}")
+
     def clear(self) -> None:
         """Clear all data from vector store."""
         # Delete and recreate collection
-        self.client.delete_collection(name="knowledge_base")
+        name = self.collection.name
+        self.client.delete_collection(name=name)
         self.collection = self.client.get_or_create_collection(
-            name="knowledge_base",
+            name=name,
             metadata={"hnsw:space": "cosine"},
         )
+        self.kb_version += 1
+        self.manifest.clear()
+        self.manifest.save()
         logger.info("Cleared vector store")
 
     def get_collection_stats(self) -> dict:
         """Get vector store statistics."""
         count = self.collection.count()
-        return {"total_chunks": count}
+        duplicates = self.manifest.duplicates
+        return {
+            "total_chunks": count,
+            "collapsed_duplicates": duplicates.collapsed() if duplicates is not None else 0,
+        }
+
+    def close(self) -> None:
+        """Release the Chroma client (PersistentClient writes through, so nothing to flush)."""
+        self.collection = None
+        self.client = None
+        logger.info("RAG system closed")
+
+
+# Process-lifetime instance, managed by init_rag_system() / close_rag_system()
+_rag_system: Optional[RAGSystem] = None
+
+
+def init_rag_system(query_cache: Optional[QueryEmbeddingCache] = None) -> RAGSystem:
+    """Create the shared RAG system (call once at startup).
+
+    The query cache's on-disk store doubles as the chunk embedding store.
+    """
+    global _rag_system
+    if _rag_system is None:
+        query_cache = query_cache or get_query_cache()
+        _rag_system = RAGSystem(
+            query_cache=query_cache,
+            embedding_store=query_cache.store if query_cache else None,
+        )
+        logger.info(f"RAG system ready ({_rag_system.get_collection_stats()['total_chunks']} chunks)")
+    return _rag_system
+
+
+def close_rag_system() -> None:
+    """Tear down the shared RAG system (call once at shutdown)."""
+    global _rag_system
+    if _rag_system is not None:
+        _rag_system.close()
+        _rag_system = None
 
 
 def get_rag_system() -> RAGSystem:
-    """Get RAG system instance."""
-    return RAGSystem()
+    """Get the shared RAG system instance, initializing it on first use."""
+    return _rag_system or init_rag_system()
@@ -0,0 +1,169 @@
+"""Resilience primitives for provider calls: retry delays, circuit breaker, latency tracking."""
+
+import logging
+import random
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+import httpx
+
+from app.config import Config
+
+logger = logging.getLogger(__name__)
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling a provider that is currently failing."""
+
+
+def is_retryable_status(status_code: int) -> bool:
+    """Whether a response status is worth retrying (rate limited or server error)."""
+    return status_code == 429 or status_code >= 500
+
+
+def retry_after_seconds(response: httpx.Response) -> Optional[float]:
+    """Delay requested by a ``Retry-After`` header (seconds or HTTP date), if any."""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt: int, base: float = Config.OR_RETRY_BASE_DELAY, cap: float = Config.OR_RETRY_MAX_DELAY) -> float:
+    """Exponential backoff with full jitter for the given retry attempt (0-based)."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class CircuitBreaker:
+    """Fail fast while a provider is unhealthy.
+
+    After ``failure_threshold`` consecutive failures the breaker opens and
+    calls raise ``CircuitOpenError`` without being sent. After
+    ``reset_timeout`` seconds one trial call is let through (half-open): if
+    it succeeds the breaker closes, otherwise it opens again.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = Config.OR_BREAKER_FAILURES,
+        reset_timeout: float = Config.OR_BREAKER_RESET,
+    ):
+        """Initialize closed."""
+        self.failure_threshold = max(failure_threshold, 1)
+        self.reset_timeout = reset_timeout
+        self.state = STATE_CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._trial_at: Optional[float] = None
+
+        self.times_opened = 0
+        self.rejected = 0
+
+    def check(self) -> None:
+        """Raise CircuitOpenError unless a call may be sent now."""
+        if self.state == STATE_CLOSED:
+            return
+        now = time.monotonic()
+        if self.state == STATE_OPEN and now - self._opened_at >= self.reset_timeout:
+            self.state = STATE_HALF_OPEN
+            self._trial_at = None
+        # One trial at a time; a trial that never reported back is replaced after reset_timeout
+        if self.state == STATE_HALF_OPEN and (self._trial_at is None or now - self._trial_at >= self.reset_timeout):
+            self._trial_at = now
+            return
+        self.rejected += 1
+        raise CircuitOpenError("OpenRouter circuit breaker is open")
+
+    def record_success(self) -> None:
+        """A call succeeded."""
+        if self.state != STATE_CLOSED:
+            logger.info("OpenRouter circuit breaker closed")
+        self.state = STATE_CLOSED
+        self.failures = 0
+
+    def record_failure(self) -> None:
+        """A call failed (server error or transport error)."""
+        self.failures += 1
+        if self.state == STATE_HALF_OPEN or (
+            self.state == STATE_CLOSED and self.failures >= self.failure_threshold
+        ):
+            self.state = STATE_OPEN
+            self._opened_at = time.monotonic()
+            self.times_opened += 1
+            logger.warning(f"OpenRouter circuit breaker opened after {self.failures} failures")
+
+    def stats(self) -> dict:
+        """Breaker state and counters."""
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "times_opened": self.times_opened,
+            "rejected": self.rejected,
+        }
+
+
+class LatencyTracker:
+    """Recent successful call latencies, for choosing when to hedge."""
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        """Keep the last ``window`` latencies; percentiles need ``min_samples``."""
+        self.samples: deque[float] = deque(maxlen=window)
+        self.min_samples = min_samples
+
+    def record(self, seconds: float) -> None:
+        """Add a latency sample."""
+        self.samples.append(seconds)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        """Latency at the given percentile, or None without enough samples."""
+        if len(self.samples) < self.min_samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(int(len(ordered) * pct / 100), len(ordered) - 1)]
+
+
+# Process-wide state shared by every OpenRouterClient, like the HTTP pool
+_breaker = CircuitBreaker()
+_latency: dict[str, LatencyTracker] = {}
+_counters = {"retries": 0, "hedges": 0, "hedge_wins": 0}
+
+
+def get_circuit_breaker() -> CircuitBreaker:
+    """The shared OpenRouter circuit breaker."""
+    return _breaker
+
+
+def get_latency_tracker(endpoint: str) -> LatencyTracker:
+    """Latency tracker for an endpoint ("chat/completions", "embeddings")."""
+    return _latency.setdefault(endpoint, LatencyTracker())
+
+
+def count(event: str) -> None:
+    """Count a retry, hedge or hedge win."""
+    _counters[event] += 1
+
+
+def resilience_stats() -> dict:
+    """Breaker state, retry/hedge counters and p95 latency per endpoint."""
+    return {
+        **_breaker.stats(),
+        **_counters,
+        "p95_seconds": {
+            endpoint: round(p95, 2)
+            for endpoint, tracker in _latency.items()
+            if (p95 := tracker.percentile(95)) is not None
+        },
+    }
@@ -0,0 +1,207 @@
+"""Sanitizing of LLM answers before they reach users.
+
+All patterns are compiled once. Leakage detection and cleanup share a single
+left-to-right scan, and ``AnswerSanitizer`` runs that scan incrementally over
+the chunks of a streamed answer, stopping at the first sign of leakage.
+"""
+
+import logging
+import re
+import unicodedata
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+_LEAK_EXTENSIONS = ("pdf", "md", "txt", "doc", "docx")
+_LEAK_HEADERS = ("Sources:", "References:")
+
+# Strong source leakage: a sources header or an internal filename
+_LEAK_RE = re.compile(
+    "|".join(_LEAK_HEADERS) + r"|(?i:\b[\w-]+\.(?:" + "|".join(_LEAK_EXTENSIONS) + r")\b)"
+)
+
+# Characters where anything other than plain text can start; everything else
+# is skipped by the regex engine without returning to Python
+_TRIGGER_RE = re.compile(r"[SR.\[*_\t\n\r\x0b\x0c\x1c-\x1f\x80-\U0010ffff]")
+_EXTENSION_RE = re.compile(r"\.(?i:" + "|".join(_LEAK_EXTENSIONS) + r")\b")
+_WORD_CHAR_RE = re.compile(r"\w")
+_BRACKET_RE = re.compile(r"\[.*?\]")
+_NON_ASCII_RE = re.compile(r"[^\x00-\x7f]+")
+_WHITESPACE_RE = re.compile(r"\s+")
+_SPACES_RE = re.compile(r" {2,}")
+
+# Style violations: emphasis markers, or symbol/control characters (emojis)
+_STYLE_ALLOWED = frozenset("\n\t")
+_STYLE_ASCII = "".join(
+    c for c in map(chr, range(128)) if unicodedata.category(c)[0] in ("S", "C") and c not in _STYLE_ALLOWED
+)
+_STYLE_RE = re.compile(rf"\*\*|__|[{re.escape(_STYLE_ASCII)}]|[^\x00-\x7f]")
+
+
+class AnswerSanitizer:
+    """Incremental sanitizer for one answer.
+
+    ``feed`` takes the next chunk of raw answer text and returns the cleaned
+    text that is now safe to show; ``finish`` returns the rest. Text is held
+    back only while it could still change meaning (an unfinished word or an
+    unclosed ``[``). Once leakage is found, ``leaked`` is set and nothing more
+    is returned.
+
+    The cleaned result is identical to cleaning the whole answer at once:
+    emphasis markers, bracket citations and non-ASCII characters removed,
+    whitespace collapsed to single spaces and stripped.
+    """
+
+    def __init__(self):
+        """Start an empty answer."""
+        self.leaked = False
+        self._pending = ""
+        self._parts: list[str] = []
+        self._started = False
+        self._space = False
+
+    @property
+    def text(self) -> str:
+        """Cleaned text produced so far."""
+        return "".join(self._parts)
+
+    def feed(self, chunk: str) -> str:
+        """Add raw text; returns newly cleaned text ("" if held back or leaked)."""
+        if self.leaked:
+            return ""
+        pending = self._pending = self._pending + chunk
+        # Cut at the last whitespace, unless it is inside a "[" that is (or may yet be) a citation
+        cut = max(pending.rfind(" "), pending.rfind("\n"), pending.rfind("\t"))
+        if cut > 0 and pending[cut] != "\n":
+            line_start = pending.rfind("\n", 0, cut) + 1
+            bracket = pending.find("[", max(pending.rfind("]", line_start, cut) + 1, line_start), cut)
+            if bracket != -1:
+                cut = bracket
+        if cut <= 0:
+            return ""
+        settled, self._pending = pending[:cut], pending[cut:]
+        return self._scan(settled)
+
+    def finish(self) -> str:
+        """Clean whatever is still held back."""
+        if self.leaked:
+            return ""
+        settled, self._pending = self._pending, ""
+        return self._scan(settled)
+
+    def _scan(self, text: str) -> str:
+        """Check and clean settled text in one pass."""
+        out: list[str] = []
+        start = pos = 0
+        while True:
+            trigger = _TRIGGER_RE.search(text, pos)
+            if trigger is None:
+                break
+            pos = trigger.start()
+            char = text[pos]
+            end = None  # end of a span to drop
+            space = False
+            if char == "." and _EXTENSION_RE.match(text, pos):
+                # A filename needs a word character before the dot (hyphens may follow it)
+                stem = pos - 1
+                while stem >= 0 and text[stem] == "-":
+                    stem -= 1
+                if stem >= 0 and _WORD_CHAR_RE.match(text, stem):
+                    return self._leak()
+            elif char in "SR" and text.startswith(_LEAK_HEADERS, pos):
+                return self._leak()
+            elif char == "[":
+                bracket = _BRACKET_RE.match(text, pos)
+                if bracket:
+                    # Citations are removed, but a filename inside one still counts as leakage
+                    if _LEAK_RE.search(bracket.group()):
+                        return self._leak()
+                    end = bracket.end()
+            elif char in "*_":
+                if text.startswith(char * 2, pos):
+                    end = pos + 2
+            elif char > "\x7f":
+                end = _NON_ASCII_RE.match(text, pos).end()
+            elif char not in "SR.":
+                end = _WHITESPACE_RE.match(text, pos).end()
+                space = True
+
+            if end is None:
+                pos += 1
+                continue
+            self._emit(text[start:pos], out)
+            self._space = self._space or space
+            start = pos = end
+        self._emit(text[start:], out)
+        cleaned = "".join(out)
+        self._parts.append(cleaned)
+        return cleaned
+
+    def _leak(self) -> str:
+        """Stop at source leakage."""
+        logger.warning("Strong source leakage pattern detected - returning empty string to force escalation")
+        self.leaked = True
+        return ""
+
+    def _emit(self, segment: str, out: list[str]) -> None:
+        """Append plain text (whitespace in it is only spaces), collapsing the spaces."""
+        if not segment:
+            return
+        if "  " in segment:
+            segment = _SPACES_RE.sub(" ", segment)
+        if segment[0] == " ":
+            self._space = True
+            segment = segment[1:]
+        trailing = segment.endswith(" ")
+        if trailing:
+            segment = segment[:-1]
+        if segment:
+            if self._space and self._started:
+                out.append(" ")
+            out.append(segment)
+            self._started = True
+            self._space = trailing
+        elif trailing:
+            self._space = True
+
+
+def sanitize_user_answer(text: str) -> str:
+    """
+    Sanitize LLM output to remove citations, sources, and formatting markers.
+    Only escalates (returns empty) on strong source leakage patterns.
+
+    Returns:
+        - Cleaned text if safe
+        - Empty string if strong source leakage detected (triggers escalation)
+    """
+    sanitizer = AnswerSanitizer()
+    sanitizer.feed(text)
+    sanitizer.finish()
+    return "" if sanitizer.leaked else sanitizer.text
+
+
+def normalize_answer_style(text: str) -> Optional[str]:
+    """
+    Enforce support-style output: no bold, no emojis, clean formatting.
+
+    Returns:
+        - Cleaned text if compliant
+        - None if violations detected (should escalate)
+    """
+    has_bold = False
+    has_emoji = False
+    for match in _STYLE_RE.finditer(text):
+        token = match.group()
+        if token in ("**", "__"):
+            has_bold = True
+        elif token.isascii() or unicodedata.category(token)[0] in ("S", "C"):
+            has_emoji = True
+        if has_bold and has_emoji:
+            break
+
+    # If strong violations, escalate
+    if has_bold or has_emoji:
+        logger.warning(f"Style violation detected (bold={has_bold}, emoji={has_emoji}), escalating")
+        return None
+
+    return text
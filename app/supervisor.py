@@ -0,0 +1,181 @@
+"""Run the bot as several worker processes behind one webhook port.
+
+``python -m app.supervisor --workers 4`` starts the log service (with
+``LOG_BACKEND=service``) and N bot workers that share ``WEBHOOK_PORT``
+(the kernel spreads connections across them). Worker 0 also runs the
+ingest job queue and registers the webhook. Workers that exit unexpectedly
+are restarted with backoff; SIGINT/SIGTERM stops everything, the log
+service last so the workers' final log batches are written.
+"""
+
+import argparse
+import logging
+import os
+import signal
+import subprocess
+import sys
+import time
+from typing import Optional
+
+import httpx
+
+from app.chunking import check_tokenizer
+from app.config import Config
+from app.logservice import log_service_url
+
+logger = logging.getLogger(__name__)
+
+STOP_TIMEOUT = 30  # seconds to wait for a child to exit before killing it
+MAX_RESTART_DELAY = 30
+STABLE_AFTER = 60  # seconds of uptime after which a crash counts as the first again
+
+
+class _Child:
+    """A supervised process and its restart state."""
+
+    __slots__ = ("name", "module", "env", "process", "restarts", "start_at", "started")
+
+    def __init__(self, name: str, module: str, env: dict[str, str]):
+        self.name = name
+        self.module = module
+        self.env = env
+        self.process: Optional[subprocess.Popen] = None
+        self.restarts = 0
+        self.start_at = 0.0
+        self.started = 0.0
+
+    def start(self) -> None:
+        """Launch the process."""
+        self.started = time.monotonic()
+        # Own session: a terminal Ctrl+C reaches only the supervisor, which stops children in order
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", self.module],
+            env={**os.environ, **self.env},
+            start_new_session=True,
+        )
+        logger.info(f"Started {self.name} (pid {self.process.pid})")
+
+
+def check_config(workers: int) -> None:
+    """Refuse settings that cannot work with several processes."""
+    Config.validate()
+    check_tokenizer()
+    if workers < 2:
+        return
+    if Config.BOT_MODE != "webhook":
+        raise ValueError("Several workers need BOT_MODE=webhook (only one process may poll Telegram)")
+    if Config.CHROMA_MODE != "http":
+        raise ValueError("Several workers need CHROMA_MODE=http (the embedded store is single-process)")
+    if Config.EVENTS_BACKEND == "local":
+        raise ValueError("Several workers need EVENTS_BACKEND=redis or file to share index changes")
+    if Config.LOG_BACKEND != "service":
+        logger.warning("LOG_BACKEND=local: every worker writes interaction logs to SQLite itself")
+    if Config.FSM_STORAGE == "memory":
+        logger.warning("FSM_STORAGE=memory: conversation state is not shared between workers")
+
+
+def wait_for_log_service(child: _Child, timeout: float = 15) -> None:
+    """Block until the log service answers its health check."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if child.process.poll() is not None:
+            raise RuntimeError("Log service exited during startup")
+        try:
+            if httpx.get(f"{log_service_url()}/health", timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Log service not reachable at {log_service_url()}")
+
+
+def stop(children: list[_Child]) -> None:
+    """Terminate children and wait for them."""
+    for child in children:
+        if child.process is not None and child.process.poll() is None:
+            child.process.terminate()
+    deadline = time.monotonic() + STOP_TIMEOUT
+    for child in children:
+        if child.process is not None:
+            try:
+                child.process.wait(timeout=max(deadline - time.monotonic(), 0))
+            except subprocess.TimeoutExpired:
+                logger.warning(f"{child.name} did not stop in {STOP_TIMEOUT}s, killing it")
+                child.process.kill()
+                child.process.wait()
+
+
+def supervise(workers: int) -> None:
+    """Start the log service and workers, restart crashed ones, stop all on SIGINT/SIGTERM."""
+    check_config(workers)
+
+    stopping = False
+
+    def request_stop(signum: int, _frame) -> None:
+        nonlocal stopping
+        stopping = True
+        logger.info(f"Received signal {signum}, stopping workers...")
+
+    signal.signal(signal.SIGINT, request_stop)
+    signal.signal(signal.SIGTERM, request_stop)
+
+    log_service = None
+    if Config.LOG_BACKEND == "service":
+        log_service = _Child("log service", "app.logservice", {})
+        log_service.start()
+        wait_for_log_service(log_service)
+
+    bots = [
+        _Child(
+            f"worker {worker_id}",
+            "app.main",
+            {
+                "WORKER_ID": str(worker_id),
+                "JOB_WORKER": "true" if worker_id == 0 else "false",
+                "WEBHOOK_REUSE_PORT": "true" if workers > 1 else os.getenv("WEBHOOK_REUSE_PORT", "false"),
+            },
+        )
+        for worker_id in range(workers)
+    ]
+    for child in bots:
+        child.start()
+    supervised = bots + ([log_service] if log_service else [])
+
+    while not stopping:
+        time.sleep(0.5)
+        now = time.monotonic()
+        for child in supervised:
+            if child.process is None:
+                if now >= child.start_at and not stopping:
+                    child.start()
+                continue
+            code = child.process.poll()
+            if code is None:
+                continue
+            child.restarts = 1 if now - child.started > STABLE_AFTER else child.restarts + 1
+            delay = min(2 ** min(child.restarts, 5), MAX_RESTART_DELAY)
+            logger.error(f"{child.name} exited with code {code}, restarting in {delay}s")
+            child.process = None
+            child.start_at = now + delay
+
+    # Workers first, so their last log batches still reach the log service
+    stop(bots)
+    if log_service is not None:
+        stop([log_service])
+    logger.info("All workers stopped")
+
+
+def main() -> None:
+    """Command-line entry point."""
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    )
+    parser = argparse.ArgumentParser(description="Run the bot as several worker processes.")
+    parser.add_argument("--workers", type=int, default=Config.WORKERS, help="number of bot worker processes")
+    args = parser.parse_args()
+    supervise(args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Webhook delivery: aiogram updates served by an embedded aiohttp server."""
+
+import asyncio
+import logging
+import signal
+from typing import Any, Awaitable, Callable
+
+from aiogram import BaseMiddleware, Bot, Dispatcher
+from aiogram.types import TelegramObject
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from aiohttp import web
+
+from app.config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class ConcurrencyLimit(BaseMiddleware):
+    """Process at most ``limit`` updates at a time; the rest wait their turn."""
+
+    def __init__(self, limit: int):
+        """Initialize with all slots free."""
+        self.limit = max(limit, 1)
+        self._semaphore = asyncio.Semaphore(self.limit)
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        async with self._semaphore:
+            return await handler(event, data)
+
+
+def build_webhook_app(
+    dispatcher: Dispatcher,
+    bot: Bot,
+    secret_token: str = Config.WEBHOOK_SECRET,
+    concurrency: int = Config.WEBHOOK_CONCURRENCY,
+    path: str = Config.WEBHOOK_PATH,
+) -> web.Application:
+    """Create the aiohttp application that feeds webhook updates to the dispatcher.
+
+    Requests without the matching ``X-Telegram-Bot-Api-Secret-Token`` header
+    are refused. Each update is acknowledged at once and handled in the
+    background, at most ``concurrency`` at a time. The dispatcher's startup
+    and shutdown hooks run with the application's.
+    """
+    dispatcher.update.outer_middleware(ConcurrencyLimit(concurrency))
+
+    app = web.Application()
+    # Dispatcher shutdown hooks first: the request handler's closes the bot session
+    setup_application(app, dispatcher, bot=bot)
+    SimpleRequestHandler(
+        dispatcher=dispatcher,
+        bot=bot,
+        secret_token=secret_token or None,
+        handle_in_background=True,
+    ).register(app, path=path)
+
+    # With several workers, the first one registers the webhook for all
+    if Config.WEBHOOK_URL and Config.WORKER_ID == 0:
+        async def register_webhook(_: web.Application) -> None:
+            await bot.set_webhook(
+                url=Config.WEBHOOK_URL,
+                secret_token=secret_token or None,
+                max_connections=Config.WEBHOOK_MAX_CONNECTIONS,
+                allowed_updates=dispatcher.resolve_used_update_types(),
+            )
+            logger.info(f"Webhook registered at {Config.WEBHOOK_URL}")
+
+        app.on_startup.append(register_webhook)
+    return app
+
+
+async def run_webhook(dispatcher: Dispatcher, bot: Bot) -> None:
+    """Serve webhook updates until SIGINT/SIGTERM (or cancellation)."""
+    app = build_webhook_app(dispatcher, bot)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, Config.WEBHOOK_HOST, Config.WEBHOOK_PORT, reuse_port=Config.WEBHOOK_REUSE_PORT or None)
+    await site.start()
+    logger.info(
+        f"Webhook server listening on {Config.WEBHOOK_HOST}:{Config.WEBHOOK_PORT}{Config.WEBHOOK_PATH} "
+        f"(concurrency={Config.WEBHOOK_CONCURRENCY})"
+    )
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:  # Windows
+            pass
+    try:
+        await stop.wait()
+        logger.info("Stopping webhook server...")
+    finally:
+        await runner.cleanup()
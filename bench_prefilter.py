@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""Microbenchmark: compiled keyword pre-filter vs the original substring scans."""
+
+import sys
+import timeit
+from pathlib import Path
+
+# Add app to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.prefilter import SENSITIVE, SOURCE_REQUEST, KeywordMatcher, get_prefilter
+
+MESSAGES = [
+    "How long does KYC verification take on Coinbase?",
+    "I get a syntax error when I paste my wallet address",
+    "What documents do I need to open an account?",
+    "My selfie keeps getting rejected, what should I do? " * 5,
+    "Can I forge my documents?",
+    "Show me the sources",
+    "Is it legal to use a VPN with Kraken?",
+    "The app says my proof of address is older than three months, but the utility bill "
+    "is from last week. I tried uploading it as a PDF and as a photo and both failed. "
+    "What format do they accept and how big can the file be?",
+]
+
+
+def legacy_is_source_request(text: str) -> bool:
+    """Original implementation, kept for comparison."""
+    keywords = [
+        "sources", "references", "links", "documentation", "docs",
+        "where did you get", "source", "cite", "citation",
+    ]
+    text_lower = text.lower()
+    return any(keyword in text_lower for keyword in keywords)
+
+
+def legacy_is_sensitive_topic(text: str) -> bool:
+    """Original implementation, kept for comparison."""
+    keywords = [
+        "forging", "forge", "fake", "faking", "fake doc", "fake identity",
+        "evading", "evade", "sanctions", "bypass", "bypassing", "circumvent",
+        "laundering", "money launder", "aml", "kyc bypass", "skip kyc",
+        "tax", "legal advice", "lawyer", "attorney", "law", "crypto law",
+        "illegal", "legality", "legal question", "is it legal"
+    ]
+    text_lower = text.lower()
+    return any(keyword in text_lower for keyword in keywords)
+
+
+def legacy(text: str) -> tuple[bool, bool]:
+    """Both original checks, as the handler ran them."""
+    return legacy_is_sensitive_topic(text), legacy_is_source_request(text)
+
+
+def compiled(text: str) -> tuple[bool, bool]:
+    """Both checks from one classification pass."""
+    categories = get_prefilter().classify(text)
+    return SENSITIVE in categories, SOURCE_REQUEST in categories
+
+
+def per_message(func, number: int = 20000) -> float:
+    """Best-of-5 time per message in microseconds."""
+    rounds = number // len(MESSAGES)
+    seconds = min(timeit.repeat(lambda: [func(m) for m in MESSAGES], number=rounds, repeat=5))
+    return seconds / (rounds * len(MESSAGES)) * 1e6
+
+
+def scaling(sizes=(50, 200, 1000)) -> None:
+    """Time both approaches as the keyword list grows (synthetic keywords)."""
+    print(f"\n{'keywords':<10}{'linear':>12}{'compiled':>12}{'speedup':>10}")
+    for size in sizes:
+        keywords = [f"kw{i}" if i % 3 else f"kw{i} phrase" for i in range(size)]
+        matcher = KeywordMatcher({"test": keywords})
+
+        def linear(text: str) -> bool:
+            text_lower = text.lower()
+            return any(keyword in text_lower for keyword in keywords)
+
+        linear_us = per_message(linear, 5000)
+        compiled_us = per_message(matcher.match, 5000)
+        print(f"{size:<10}{linear_us:>9.2f} µs{compiled_us:>9.2f} µs{linear_us / compiled_us:>9.2f}x")
+
+
+def main() -> None:
+    """Time both implementations and list the messages they disagree on."""
+    get_prefilter()  # compile outside the timing
+
+    print("=" * 60)
+    print("PRE-FILTER MICROBENCHMARK")
+    print("=" * 60)
+    results = {}
+    for name, func in (("legacy", legacy), ("compiled", compiled)):
+        results[name] = per_message(func)
+        print(f"{name:<10}{results[name]:8.2f} µs/message")
+    print(f"speedup   {results['legacy'] / results['compiled']:8.2f}x")
+    scaling()
+
+    print("\nDifferences (sensitive, source_request):")
+    for message in MESSAGES:
+        if legacy(message) != compiled(message):
+            print(f"- {message[:60]!r}: legacy={legacy(message)} compiled={compiled(message)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""Throughput benchmark for webhook mode: POST synthetic updates, count updates per second.
+
+The webhook app is built exactly as in production (secret-token check,
+background handling, concurrency limit) around the real handlers router.
+Outgoing Bot API calls go to a local fake Telegram server with a
+configurable latency, so no token or network is needed. The synthetic
+updates are ``/help`` commands, which exercise routing and a reply without
+touching the knowledge base or the LLM.
+"""
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from aiohttp import ClientSession, web
+
+# Add app to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from aiogram import Bot, Dispatcher
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+
+from app.handlers import router
+from app.webhook import build_webhook_app
+
+TOKEN = "123456:BENCHMARK"
+SECRET = "bench-secret"
+
+
+class FakeTelegram:
+    """Bot API stand-in answering every method with a canned message."""
+
+    def __init__(self, latency: float):
+        """Initialize with a per-call latency in seconds."""
+        self.latency = latency
+        self.calls = 0
+        self.done = asyncio.Event()
+        self.expected = 0
+
+    async def handle(self, request: web.Request) -> web.Response:
+        """Any /bot<token>/<method> call."""
+        await request.read()
+        await asyncio.sleep(self.latency)
+        self.calls += 1
+        if self.calls >= self.expected:
+            self.done.set()
+        return web.json_response({
+            "ok": True,
+            "result": {
+                "message_id": self.calls,
+                "date": int(time.time()),
+                "chat": {"id": 1, "type": "private"},
+                "text": "ok",
+            },
+        })
+
+
+def make_update(update_id: int) -> dict:
+    """A private-chat /help message from a distinct user."""
+    user_id = 100000 + update_id
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": user_id, "type": "private"},
+            "from": {"id": user_id, "is_bot": False, "first_name": "Bench"},
+            "text": "/help",
+            "entities": [{"type": "bot_command", "offset": 0, "length": 5}],
+        },
+    }
+
+
+async def serve(app: web.Application) -> tuple[web.AppRunner, str]:
+    """Start an app on a free local port; returns the runner and base URL."""
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}"
+
+
+async def bench(updates: int, clients: int, concurrency: int, api_latency: float) -> None:
+    """Send the updates and report acceptance and processing rates."""
+    telegram = FakeTelegram(api_latency)
+    telegram.expected = updates
+    telegram_app = web.Application()
+    telegram_app.router.add_post("/bot{token}/{method}", telegram.handle)
+    telegram_runner, telegram_url = await serve(telegram_app)
+
+    session = AiohttpSession(api=TelegramAPIServer.from_base(telegram_url))
+    bot = Bot(token=TOKEN, session=session)
+    dispatcher = Dispatcher()
+    dispatcher.include_router(router)
+    webhook_runner, webhook_url = await serve(build_webhook_app(dispatcher, bot, SECRET, concurrency))
+    url = f"{webhook_url}/webhook"
+
+    latencies: list[float] = []
+    queue: asyncio.Queue[int] = asyncio.Queue()
+    for update_id in range(1, updates + 1):
+        queue.put_nowait(update_id)
+
+    async with ClientSession() as http:
+        async with http.post(url, json=make_update(0)) as response:
+            print(f"Without secret token: HTTP {response.status}")
+
+        async def client() -> None:
+            headers = {"X-Telegram-Bot-Api-Secret-Token": SECRET}
+            while not queue.empty():
+                update_id = queue.get_nowait()
+                sent = time.perf_counter()
+                async with http.post(url, json=make_update(update_id), headers=headers) as response:
+                    await response.read()
+                    if response.status != 200:
+                        raise RuntimeError(f"Webhook answered HTTP {response.status}")
+                latencies.append(time.perf_counter() - sent)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(client() for _ in range(clients)))
+        accepted = time.perf_counter() - started
+        await asyncio.wait_for(telegram.done.wait(), timeout=300)
+        processed = time.perf_counter() - started
+
+    await webhook_runner.cleanup()
+    await telegram_runner.cleanup()
+
+    latencies.sort()
+    print(f"Updates: {updates}, clients: {clients}, concurrency: {concurrency}, API latency: {api_latency * 1000:.0f} ms")
+    print(f"Accepted:  {updates / accepted:8.0f} updates/s ({accepted:.2f}s)")
+    print(f"Processed: {updates / processed:8.0f} updates/s ({processed:.2f}s)")
+    print(
+        f"POST latency: p50 {statistics.median(latencies) * 1000:.1f} ms, "
+        f"p99 {latencies[int(len(latencies) * 0.99) - 1] * 1000:.1f} ms"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--updates", type=int, default=2000, help="synthetic updates to send")
+    parser.add_argument("--clients", type=int, default=40, help="parallel POSTers (like Telegram's max_connections)")
+    parser.add_argument("--concurrency", type=int, default=64, help="WEBHOOK_CONCURRENCY")
+    parser.add_argument("--api-latency", type=float, default=0.05, help="seconds per fake Bot API call")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("WEBHOOK THROUGHPUT BENCHMARK")
+    print("=" * 60)
+    asyncio.run(bench(args.updates, args.clients, args.concurrency, args.api_latency))
+
+
+if __name__ == "__main__":
+    main()
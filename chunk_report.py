@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""Compare chunkers on the documents in DOCS_DIR (chunk counts and token totals)."""
+
+import sys
+from pathlib import Path
+
+# Add app to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.chunking import compare_chunkers, tokenizer_name
+from app.config import Config
+from app.extract import SUPPORTED_EXTENSIONS, extract_text_file, iter_pdf_pages
+
+
+def iter_pages(docs_dir: Path):
+    """Yield the text of every page of every supported document."""
+    for file_path in sorted(docs_dir.iterdir()):
+        if not file_path.is_file() or file_path.suffix.lower() not in SUPPORTED_EXTENSIONS:
+            continue
+        if file_path.suffix.lower() == ".pdf":
+            for _, text in iter_pdf_pages(file_path):
+                yield text
+        else:
+            yield extract_text_file(file_path)
+
+
+def main() -> None:
+    """Print the comparison table."""
+    docs_dir = Path(sys.argv[1]) if len(sys.argv) > 1 else Config.DOCS_DIR
+    if not docs_dir.exists():
+        print(f"Docs directory not found: {docs_dir}")
+        sys.exit(1)
+
+    report = compare_chunkers(iter_pages(docs_dir))
+
+    print("=" * 60)
+    print(f"CHUNKER COMPARISON ({docs_dir}, tokenizer: {tokenizer_name()})")
+    print("=" * 60)
+    print(f"{'chunker':<10}{'chunks':>10}{'tokens':>12}{'max/chunk':>12}{'overhead':>12}")
+    for name, stats in report.items():
+        print(
+            f"{name:<10}{stats['chunks']:>10}{stats['chunk_tokens']:>12}"
+            f"{stats['max_chunk_tokens']:>12}{stats['overhead']:>11.1%}"
+        )
+    source_tokens = next(iter(report.values()))["source_tokens"]
+    print(f"\nSource text: {source_tokens} tokens")
+    print(f"Active chunker (RAG_CHUNKER): {Config.RAG_CHUNKER}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""Local stand-in for the OpenRouter API with injectable failures and latency.
+
+Serves ``/api/v1/embeddings`` and ``/api/v1/chat/completions`` (plain and
+streamed). Point the bot at it with
+``OPENROUTER_BASE_URL=http://127.0.0.1:8089/api/v1``, or run
+``python fake_openrouter.py --selftest`` to exercise the client's retries,
+circuit breaker and hedging against it.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Optional
+
+from aiohttp import web
+
+# Add app to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+ANSWER = "You need a valid ID document and a proof of address issued in the last three months."
+
+
+class FakeOpenRouter:
+    """Fake API whose fault settings can be changed while it runs."""
+
+    def __init__(
+        self,
+        error_rate: float = 0.0,
+        error_status: int = 503,
+        retry_after: Optional[float] = None,
+        latency: float = 0.0,
+        slow_rate: float = 0.0,
+        slow_latency: float = 2.0,
+        dimensions: int = 8,
+    ):
+        """Initialize the fault settings."""
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.retry_after = retry_after
+        self.latency = latency
+        self.slow_rate = slow_rate
+        self.slow_latency = slow_latency
+        self.dimensions = dimensions
+        self.requests = 0
+        self.errors = 0
+
+    def app(self) -> web.Application:
+        """aiohttp application serving the fake endpoints."""
+        app = web.Application()
+        app.router.add_post("/api/v1/embeddings", self.embeddings)
+        app.router.add_post("/api/v1/chat/completions", self.chat)
+        return app
+
+    async def _fault(self) -> Optional[web.Response]:
+        """Apply the configured latency; returns an error response if this request should fail."""
+        self.requests += 1
+        await asyncio.sleep(self.slow_latency if random.random() < self.slow_rate else self.latency)
+        if random.random() >= self.error_rate:
+            return None
+        self.errors += 1
+        headers = {"Retry-After": f"{self.retry_after:g}"} if self.retry_after is not None else {}
+        return web.json_response(
+            {"error": {"code": self.error_status, "message": "Injected failure"}},
+            status=self.error_status,
+            headers=headers,
+        )
+
+    def _embedding(self, text: str) -> list[float]:
+        """Deterministic embedding derived from the text."""
+        digest = hashlib.sha256(text.encode()).digest()
+        return [byte / 255 for byte in digest[: self.dimensions]]
+
+    async def embeddings(self, request: web.Request) -> web.Response:
+        """POST /embeddings."""
+        body = await request.json()
+        if (error := await self._fault()) is not None:
+            return error
+        inputs = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        return web.json_response({
+            "data": [
+                {"index": index, "embedding": self._embedding(text)}
+                for index, text in enumerate(inputs)
+            ],
+            "model": body.get("model"),
+        })
+
+    async def chat(self, request: web.Request) -> web.StreamResponse:
+        """POST /chat/completions, as server-sent events if ``stream`` is set."""
+        body = await request.json()
+        if (error := await self._fault()) is not None:
+            return error
+        if not body.get("stream"):
+            return web.json_response({"choices": [{"message": {"role": "assistant", "content": ANSWER}}]})
+
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        await response.write(b": OPENROUTER PROCESSING\n\n")
+        for word in ANSWER.split(" "):
+            event = {"choices": [{"delta": {"content": word + " "}}]}
+            await response.write(f"data: {json.dumps(event)}\n\n".encode())
+            await asyncio.sleep(0.01)
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
+
+
+async def start(fake: FakeOpenRouter, host: str, port: int) -> tuple[web.AppRunner, str]:
+    """Start the server; returns the runner and the API base URL."""
+    runner = web.AppRunner(fake.app())
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    bound_port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://{host}:{bound_port}/api/v1"
+
+
+async def selftest() -> None:
+    """Run the client through outages, rate limiting and slow responses."""
+    # Fast settings, fixed before the app modules read them
+    os.environ.setdefault("OR_RETRY_BASE_DELAY", "0.05")
+    os.environ.setdefault("OR_RETRY_MAX_DELAY", "1")
+    os.environ.setdefault("OR_BREAKER_RESET", "1")
+    os.environ.setdefault("OR_HEDGE_MIN_DELAY", "0.05")
+
+    logging.basicConfig(level=logging.WARNING, format="    %(message)s")
+
+    import httpx
+
+    from app.config import Config
+    from app.openrouter import OpenRouterClient
+    from app.resilience import CircuitOpenError, resilience_stats
+
+    fake = FakeOpenRouter(latency=0.01)
+    runner, base_url = await start(fake, "127.0.0.1", 0)
+    http = httpx.AsyncClient()
+    client = OpenRouterClient(api_key="test", base_url=base_url, http_client=http)
+    messages = [{"role": "user", "content": "What do I need for KYC?"}]
+
+    async def run(title: str, calls: int, call) -> None:
+        fake.requests = fake.errors = 0
+        before = resilience_stats()
+        failed = 0
+        started = time.monotonic()
+        for _ in range(calls):
+            try:
+                await call()
+            except (httpx.HTTPError, CircuitOpenError):
+                failed += 1
+        after = resilience_stats()
+        print(
+            f"{title:<34}{calls:>4} calls {failed:>4} failed {fake.requests:>5} sent "
+            f"{after['retries'] - before['retries']:>4} retries "
+            f"{after['hedges'] - before['hedges']:>3} hedges ({after['hedge_wins'] - before['hedge_wins']} won) "
+            f"breaker {after['state']:<9} {time.monotonic() - started:6.2f}s"
+        )
+
+    async def stream() -> None:
+        async for _ in client.chat_stream(messages):
+            pass
+
+    try:
+        print("=" * 60)
+        print("OPENROUTER RESILIENCE SELFTEST")
+        print("=" * 60)
+        await run("healthy embeddings", 50, lambda: client.embed("kyc documents"))
+
+        fake.error_rate = 0.3
+        await run("30% HTTP 503, embeddings", 50, lambda: client.embed("kyc documents"))
+        await run("30% HTTP 503, chat", 20, lambda: client.chat(messages))
+        await run("30% HTTP 503, streamed chat", 20, stream)
+
+        fake.error_status, fake.retry_after = 429, 0.1
+        await run("30% HTTP 429 + Retry-After 0.1s", 20, lambda: client.embed("kyc documents"))
+        fake.retry_after = 30
+        await run("30% HTTP 429 + Retry-After 30s", 20, lambda: client.embed("kyc documents"))
+
+        fake.error_status, fake.retry_after, fake.error_rate = 500, None, 1.0
+        await run("outage (100% HTTP 500)", 20, lambda: client.embed("kyc documents"))
+        fake.error_rate = 0.0
+        await asyncio.sleep(Config.OR_BREAKER_RESET)
+        await run("recovered after breaker reset", 20, lambda: client.embed("kyc documents"))
+
+        fake.slow_rate, fake.slow_latency = 0.1, 1.0
+        await run("10% slow (1s), no hedging", 50, lambda: client.embed("kyc documents"))
+        Config.OR_HEDGE = True
+        await run("10% slow (1s), hedging", 50, lambda: client.embed("kyc documents"))
+
+        print(f"\nFinal stats: {resilience_stats()}")
+    finally:
+        await http.aclose()
+        await runner.cleanup()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests that fail")
+    parser.add_argument("--error-status", type=int, default=503, help="status of failed requests")
+    parser.add_argument("--retry-after", type=float, help="Retry-After seconds sent with failures")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every request")
+    parser.add_argument("--slow-rate", type=float, default=0.0, help="fraction of requests that are slow")
+    parser.add_argument("--slow-latency", type=float, default=2.0, help="seconds a slow request takes")
+    parser.add_argument("--selftest", action="store_true", help="run the client against the fake and exit")
+    args = parser.parse_args()
+
+    if args.selftest:
+        asyncio.run(selftest())
+        return
+
+    fake = FakeOpenRouter(
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        retry_after=args.retry_after,
+        latency=args.latency,
+        slow_rate=args.slow_rate,
+        slow_latency=args.slow_latency,
+    )
+    print(f"Fake OpenRouter on http://{args.host}:{args.port}/api/v1")
+    web.run_app(fake.app(), host=args.host, port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""Tests for admission control: concurrency bound, fair rotation and load shedding."""
+
+import asyncio
+import sys
+from pathlib import Path
+
+# Add app to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.admission import REJECT_DEADLINE, REJECT_QUEUE_FULL, AdmissionController, AdmissionRejected
+
+
+async def hold(controller: AdmissionController, user_id: int, release: asyncio.Event, log: list) -> None:
+    """Take a slot, note the user, and keep the slot until ``release`` is set."""
+    async with controller.slot(user_id):
+        log.append(user_id)
+        await release.wait()
+
+
+async def settle() -> None:
+    """Let queued tasks run up to their next wait."""
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_concurrency_is_bounded():
+    """No more than max_concurrent requests run at once, and every request is served."""
+
+    async def run() -> None:
+        controller = AdmissionController(max_concurrent=2, max_queue=10, max_wait=5)
+        running = peak = 0
+
+        async def request(user_id: int) -> None:
+            nonlocal running, peak
+            async with controller.slot(user_id):
+                running += 1
+                peak = max(peak, running)
+                await asyncio.sleep(0.01)
+                running -= 1
+
+        await asyncio.gather(*(request(user_id) for user_id in range(8)))
+        assert peak == 2, f"{peak} requests ran at once"
+        stats = controller.stats()
+        assert stats["admitted"] == 8 and stats["active"] == 0 and stats["queue_depth"] == 0
+
+    asyncio.run(run())
+
+
+def test_users_are_served_in_turn():
+    """A user with many queued questions cannot starve users who asked later."""
+
+    async def run() -> None:
+        controller = AdmissionController(max_concurrent=1, max_queue=10, max_wait=5)
+        order: list[int] = []
+        blocker = asyncio.Event()
+        first = asyncio.create_task(hold(controller, 0, blocker, order))
+        await settle()
+
+        done = asyncio.Event()
+        done.set()
+        tasks = [asyncio.create_task(hold(controller, 1, done, order)) for _ in range(3)]
+        await settle()
+        tasks += [asyncio.create_task(hold(controller, user_id, done, order)) for user_id in (2, 3)]
+        await settle()
+        assert controller.stats()["queue_depth"] == 5
+
+        blocker.set()
+        await asyncio.gather(first, *tasks)
+        assert order == [0, 1, 2, 3, 1, 1], f"served in order {order}"
+
+    asyncio.run(run())
+
+
+def test_full_queue_sheds():
+    """Requests beyond max_queue are rejected immediately."""
+
+    async def run() -> None:
+        controller = AdmissionController(max_concurrent=1, max_queue=2, max_wait=5)
+        release = asyncio.Event()
+        log: list[int] = []
+        tasks = [asyncio.create_task(hold(controller, user_id, release, log)) for user_id in range(3)]
+        await settle()
+        try:
+            async with controller.slot(99):
+                raise AssertionError("admitted past a full queue")
+        except AdmissionRejected as e:
+            assert e.reason == REJECT_QUEUE_FULL
+        release.set()
+        await asyncio.gather(*tasks)
+        assert controller.stats()["rejected_queue_full"] == 1 and log == [0, 1, 2]
+
+    asyncio.run(run())
+
+
+def test_expected_wait_sheds_up_front():
+    """A request whose expected wait exceeds max_wait is rejected without queueing."""
+
+    async def run() -> None:
+        controller = AdmissionController(max_concurrent=1, max_queue=10, max_wait=2.5)
+        controller._service_time = 1.0  # as if recent requests took a second each
+        release = asyncio.Event()
+        log: list[int] = []
+        tasks = [asyncio.create_task(hold(controller, user_id, release, log)) for user_id in (0, 1, 2)]
+        await settle()
+        # Users 1 and 2 wait; a third waiting user would be third in line
+        assert controller.expected_wait(3) == 3.0
+        try:
+            async with controller.slot(3):
+                raise AssertionError("admitted despite a long expected wait")
+        except AdmissionRejected as e:
+            assert e.reason == REJECT_DEADLINE
+        assert controller.stats()["queue_depth"] == 2
+        release.set()
+        await asyncio.gather(*tasks)
+
+    asyncio.run(run())
+
+
+def test_timeout_and_cancel_release_their_place():
+    """Waiters that time out or are cancelled leave the queue and never leak a slot."""
+
+    async def run() -> None:
+        controller = AdmissionController(max_concurrent=1, max_queue=10, max_wait=0.05)
+        release = asyncio.Event()
+        log: list[int] = []
+        blocker = asyncio.create_task(hold(controller, 0, release, log))
+        await settle()
+
+        try:
+            async with controller.slot(1):
+                raise AssertionError("admitted while the slot was held")
+        except AdmissionRejected as e:
+            assert e.reason == REJECT_DEADLINE
+
+        controller.max_wait = 5
+        cancelled = asyncio.create_task(hold(controller, 2, release, log))
+        await settle()
+        cancelled.cancel()
+        await asyncio.gather(cancelled, return_exceptions=True)
+        assert controller.stats()["queue_depth"] == 0
+
+        release.set()
+        await blocker
+        async with controller.slot(3):
+            assert controller.active == 1
+        stats = controller.stats()
+        assert stats["active"] == 0 and stats["rejected_deadline"] == 1 and log == [0]
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"✅ {name}")
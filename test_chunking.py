@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""Tests for the token-aware chunker: size limits and structure."""
+
+import sys
+from pathlib import Path
+
+# Add app to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.chunking import chunk_text_tokens, count_tokens
+
+
+def test_long_word_is_split_to_the_limit():
+    """A run without whitespace (base64, a URL) is cut so no chunk exceeds max_tokens."""
+    word = "aB3+" * 1250
+    chunks = chunk_text_tokens(f"Intro sentence here. {word} Trailing words.", max_tokens=64, overlap_tokens=16)
+    assert max(count_tokens(chunk) for chunk in chunks) <= 64, "chunk over the token limit"
+    assert word in "".join(chunk.replace(" ", "") for chunk in chunks), "text lost while splitting"
+
+
+def test_pieces_of_different_blocks_are_not_joined_inline():
+    """Continuations of two oversized paragraphs stay separate paragraphs."""
+    first = " ".join(f"alpha{i}." for i in range(60))
+    second = " ".join(f"beta{i}." for i in range(60))
+    for chunk in chunk_text_tokens(f"{first}\n\n{second}", max_tokens=64, overlap_tokens=0):
+        if "alpha" in chunk and "beta" in chunk:
+            assert "\n\nbeta" in chunk, f"blocks merged inline: {chunk!r}"
+
+
+def test_headings_start_chunks():
+    """Every heading begins a chunk, and small sections are kept whole."""
+    text = "# KYC\n\nBring a passport.\n\n# Deposits\n\n- Bank transfer\n- Card"
+    assert chunk_text_tokens(text, max_tokens=64, overlap_tokens=0) == [
+        "# KYC\n\nBring a passport.",
+        "# Deposits\n\n- Bank transfer\n- Card",
+    ]
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"✅ {name}")
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""Tests for single-flight coalescing of identical questions."""
+
+import asyncio
+import sys
+from pathlib import Path
+
+# Add app to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.coalesce import SingleFlight, question_key
+from app.progress import ReplyFanout
+
+
+class Reply:
+    """Collects streamed text like a StreamingReply."""
+
+    def __init__(self):
+        """Start empty."""
+        self.text = ""
+
+    def append(self, text: str) -> None:
+        """Add streamed text."""
+        self.text += text
+
+
+def test_question_key():
+    """Questions that normalize alike share a key, but only for the same knowledge base version."""
+    assert question_key("What documents do I need?", 1) == question_key("  what documents do I need?  ", 1)
+    assert question_key("What documents do I need?", 1) != question_key("What documents do I need?", 2)
+    assert question_key("What documents do I need?", 1) != question_key("How long does KYC take?", 1)
+
+
+def test_concurrent_callers_share_one_computation():
+    """Callers with the same key get one computation, and late joiners see the earlier stream."""
+
+    async def run() -> None:
+        flights = SingleFlight()
+        release = asyncio.Event()
+        calls = 0
+
+        async def compute(fanout: ReplyFanout) -> str:
+            nonlocal calls
+            calls += 1
+            fanout.append("Bring your ")
+            await release.wait()
+            fanout.append("passport.")
+            return "answer"
+
+        first = Reply()
+        leader = asyncio.create_task(flights.run("q", compute, first))
+        await asyncio.sleep(0)
+        late = [Reply() for _ in range(3)]
+        followers = [asyncio.create_task(flights.run("q", compute, reply)) for reply in late]
+        other = asyncio.create_task(flights.run("other", compute))
+        await asyncio.sleep(0)
+        assert flights.stats()["in_flight"] == 2
+
+        release.set()
+        results = await asyncio.gather(leader, *followers, other)
+        assert results == ["answer"] * 5
+        assert calls == 2, f"{calls} computations for two keys"
+        assert first.text == "Bring your passport."
+        assert all(reply.text == "Bring your passport." for reply in late), "late replies missed earlier text"
+        stats = flights.stats()
+        assert stats["computed"] == 2 and stats["coalesced"] == 3 and stats["in_flight"] == 0
+
+    asyncio.run(run())
+
+
+def test_errors_are_shared_and_not_cached():
+    """Every waiter gets the exception, and the next call computes again."""
+
+    async def run() -> None:
+        flights = SingleFlight()
+        release = asyncio.Event()
+        calls = 0
+
+        async def failing(fanout: ReplyFanout) -> str:
+            nonlocal calls
+            calls += 1
+            await release.wait()
+            raise RuntimeError("provider down")
+
+        tasks = [asyncio.create_task(flights.run("q", failing)) for _ in range(3)]
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        assert all(isinstance(r, RuntimeError) for r in results) and calls == 1
+
+        async def succeeding(fanout: ReplyFanout) -> str:
+            return "recovered"
+
+        assert await flights.run("q", succeeding) == "recovered"
+
+    asyncio.run(run())
+
+
+def test_cancelled_caller_does_not_cancel_others():
+    """A caller that goes away leaves the computation running for the rest."""
+
+    async def run() -> None:
+        flights = SingleFlight()
+        release = asyncio.Event()
+
+        async def compute(fanout: ReplyFanout) -> str:
+            await release.wait()
+            return "answer"
+
+        leader = asyncio.create_task(flights.run("q", compute))
+        follower = asyncio.create_task(flights.run("q", compute))
+        await asyncio.sleep(0)
+        leader.cancel()
+        await asyncio.gather(leader, return_exceptions=True)
+        release.set()
+        assert await follower == "answer"
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"✅ {name}")
@@ -11,7 +11,7 @@ sys.path.insert(0, str(Path(__file__).parent))
 from app.config import Config
 from app.db import get_db
 from app.ingest import ingest_document, reindex_all_documents
-from app.prompts import is_source_request, is_sensitive_topic
+from app.prefilter import is_source_request, is_sensitive_topic
 from app.rag import get_rag_system
 
 
@@ -26,6 +26,7 @@ async def test_confidentiality():
     Config.ensure_dirs()
     db = get_db()
     rag = get_rag_system()
+    failures = 0
 
     # Test 1: Sensitive topic detection
     print("\n✓ Test 1: Sensitive Topic Detection")
@@ -42,6 +43,7 @@ async def test_confidentiality():
     for query, should_be_sensitive in test_queries:
         result = is_sensitive_topic(query)
         status = "✅" if result == should_be_sensitive else "❌"
+        failures += result != should_be_sensitive
         print(f"{status} '{query}' → sensitive={result} (expected={should_be_sensitive})")
 
     # Test 2: Source request detection
@@ -52,13 +54,30 @@ async def test_confidentiality():
         ("What document is this from?", True),
         ("Can you send me the policy?", True),
         ("What is this based on?", True),
+        ("What's your reference for that?", True),
+        ("Which document did you take that from?", True),
         ("What documents do I need?", False),
         ("How do I upload my ID?", False),
     ]
+    # Ordinary onboarding questions that mention links, references or documents
+    source_queries += [
+        (query, False)
+        for query in (
+            "How do I link my bank account?",
+            "I need to link my debit card",
+            "Can you send me the link to download the app?",
+            "What reference number do I put on the wire transfer?",
+            "Where do I find the reference code for my deposit?",
+            "Is there a doc checklist?",
+            "Which document can I use as proof of address?",
+            "What policy applies to withdrawals?",
+        )
+    ]
 
     for query, should_be_source in source_queries:
         result = is_source_request(query)
         status = "✅" if result == should_be_source else "❌"
+        failures += result != should_be_source
         print(f"{status} '{query}' → source_request={result} (expected={should_be_source})")
 
     # Test 3: Database schema
@@ -77,6 +96,7 @@ async def test_confidentiality():
     if expected_cols == actual_cols:
         print(f"✅ Logs table has correct columns: {sorted(actual_cols)}")
     else:
+        failures += 1
         print(f"❌ Missing columns: {expected_cols - actual_cols}")
         print(f"❌ Extra columns: {actual_cols - expected_cols}")
 
@@ -100,6 +120,10 @@ async def test_confidentiality():
     print(f"✅ Vector store initialized: {stats['total_chunks']} chunks loaded")
 
     print("\n" + "=" * 60)
+    if failures:
+        print(f"❌ {failures} CONFIDENTIALITY CHECK(S) FAILED")
+        print("=" * 60)
+        sys.exit(1)
     print("✅ ALL CONFIDENTIALITY TESTS PASSED")
     print("=" * 60)
 
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""Tests for duplicate chunk collapsing and resumed index rebuilds."""
+
+import asyncio
+import hashlib
+import sys
+import tempfile
+from pathlib import Path
+
+# Add app to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.config import Config
+from app.dedup import DuplicateIndex, lsh_bands, minhash, shingles
+from app.ingest import reindex_all_documents
+from app.ingest_pipeline import IngestCheckpoint, close_extract_pool
+from app.manifest import hash_text
+from app.rag import RAGSystem
+
+WORDS = (
+    "account verification requires a valid passport or national identity card together with "
+    "a recent utility bill showing the same address and a selfie holding the document"
+).split()
+
+
+def paragraph(seed: int, length: int = 120) -> str:
+    """Deterministic filler text; different seeds give unrelated paragraphs."""
+    return " ".join(WORDS[(i * (seed + 3) + seed) % len(WORDS)] + str((i * seed) % 7) for i in range(length))
+
+
+class FakeEmbedder:
+    """Stands in for the OpenRouter client: deterministic embeddings, counted."""
+
+    def __init__(self):
+        """Initialize the counter."""
+        self.texts = 0
+
+    async def embed_batch(self, texts: list[str], model=None) -> list[list[float]]:
+        """One vector per text, derived from its hash."""
+        self.texts += len(texts)
+        return [[b / 255 for b in hashlib.sha256(text.encode()).digest()[:16]] for text in texts]
+
+
+class InterruptedCheckpoint(IngestCheckpoint):
+    """Checkpoint that stalls, like a process being killed, once given files are recorded."""
+
+    def __init__(self, stop_after: set[str]):
+        """Initialize with the files that must be recorded before stalling."""
+        super().__init__()
+        self.stop_after = stop_after
+        self.stalled = asyncio.Event()
+
+    async def record(self, filename: str, chunks: dict[str, str]) -> None:
+        await super().record(filename, chunks)
+        if self.stop_after <= self.written.keys():
+            self.stalled.set()
+            await asyncio.Event().wait()
+
+
+def use_temp_dirs(root: Path) -> None:
+    """Point the vector store and docs directory at a scratch directory."""
+    Config.CHROMA_PERSIST_DIR = root / "chroma"
+    Config.DOCS_DIR = root / "docs"
+    Config.DOCS_DIR.mkdir(parents=True)
+    Config.INGEST_DEDUP = True
+    Config.INGEST_EXTRACT_WORKERS = 1
+
+
+def new_rag(embedder: FakeEmbedder) -> RAGSystem:
+    """RAG system on the scratch store with the fake embedder."""
+    rag = RAGSystem()
+    rag.or_client = embedder
+    rag.query_batcher = None
+    return rag
+
+
+def test_duplicate_index():
+    """Exact and near-duplicates join a group; rehome, release and rollback keep it consistent."""
+    text = paragraph(1)
+    near = text.replace(WORDS[3] + "3", "changed", 1)
+    other = paragraph(2)
+    index = DuplicateIndex()
+    index.create("a1", hash_text(text), lsh_bands(minhash(shingles(text))), "a.txt", 1)
+
+    def stored_texts(ids: list[str]) -> dict[str, str]:
+        return {i: text for i in ids if i == "a1"}
+
+    assert index.find(text, hash_text(text), stored_texts)[0] == "a1", "exact duplicate not found"
+    assert near != text
+    assert index.find(near, hash_text(near), stored_texts)[0] == "a1", "near-duplicate not found"
+    assert index.find(other, hash_text(other), stored_texts)[0] is None, "unrelated text collapsed"
+
+    index.add("a1", "b1", "b.txt", 2)
+    assert index.collapsed() == 1
+    assert index.first_source("a1") == ("a.txt", 1)
+
+    # a1 gets new text: its group moves to b1
+    assert index.rehome("a1") == "b1"
+    assert index.stored_id("b1") == "b1" and not index.is_stored("a1")
+    assert index.find(text, hash_text(text), lambda ids: {})[0] == "b1"
+
+    index.begin()
+    index.release("a1")
+    index.release("b1")
+    assert not index.groups
+    index.rollback()
+    assert index.is_stored("b1") and index.stored_id("a1") == "b1", "rollback did not restore the group"
+
+    index.release("a1")
+    assert index.release("b1") == "b1"
+    assert not index.groups and index.stored_id("b1") == "b1"
+
+
+def test_write_collapses_and_rehomes():
+    """Duplicates are stored once; editing the stored chunk moves the group to another member."""
+    with tempfile.TemporaryDirectory() as tmp:
+        use_temp_dirs(Path(tmp))
+        rag = new_rag(FakeEmbedder())
+        text, edited = paragraph(1), paragraph(2)
+
+        asyncio.run(rag.add_chunks([
+            {"chunk_id": "a1", "text": text, "filename": "a.txt", "page": 1},
+            {"chunk_id": "b1", "text": text, "filename": "b.txt", "page": 3},
+        ]))
+        assert rag.collection.count() == 1
+        stored = rag.collection.get(ids=["a1"], include=["metadatas"])["metadatas"][0]
+        assert '"b.txt"' in stored["sources"] and '"a.txt"' in stored["sources"]
+
+        asyncio.run(rag.add_chunks([{"chunk_id": "a1", "text": edited, "filename": "a.txt", "page": 1}]))
+        records = rag.collection.get(ids=["a1", "b1"], include=["documents", "metadatas"])
+        documents = dict(zip(records["ids"], records["documents"]))
+        assert documents == {"a1": edited, "b1": text}, "group was not rehomed to b1"
+        assert rag.collection.count() == 2
+
+        rag.delete_chunks(["b1"])
+        assert rag.collection.get(ids=["b1"])["ids"] == []
+        assert rag.collection.count() == 1
+
+
+def test_resumed_rebuild_keeps_duplicate_groups():
+    """A full rebuild interrupted after writing duplicates resumes and passes validation."""
+    with tempfile.TemporaryDirectory() as tmp:
+        use_temp_dirs(Path(tmp))
+        shared = "\n\n".join(paragraph(seed) for seed in (1, 2, 3))
+        (Config.DOCS_DIR / "a.txt").write_text(shared)
+        (Config.DOCS_DIR / "b.txt").write_text(shared)
+        (Config.DOCS_DIR / "c.txt").write_text("\n\n".join(paragraph(seed) for seed in (4, 5)))
+
+        async def interrupted() -> IngestCheckpoint:
+            checkpoint = InterruptedCheckpoint({"a.txt", "b.txt"})
+            task = asyncio.create_task(
+                reindex_all_documents(new_rag(FakeEmbedder()), full=True, checkpoint=checkpoint)
+            )
+            await asyncio.wait_for(checkpoint.stalled.wait(), timeout=60)
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            return IngestCheckpoint(checkpoint.written, checkpoint.staging)
+
+        async def resumed(checkpoint: IngestCheckpoint) -> tuple[RAGSystem, FakeEmbedder]:
+            # A fresh RAG system, as after a restart: nothing survives in memory
+            embedder = FakeEmbedder()
+            rag = new_rag(embedder)
+            await reindex_all_documents(rag, full=True, checkpoint=checkpoint)
+            return rag, embedder
+
+        try:
+            checkpoint = asyncio.run(interrupted())
+            written = {c for chunks in checkpoint.written.values() for c in chunks}
+            rag, embedder = asyncio.run(resumed(checkpoint))
+        finally:
+            close_extract_pool()
+
+        total = sum(len(rag.manifest.chunks(name)) for name in ("a.txt", "b.txt", "c.txt"))
+        shared_chunks = len(rag.manifest.chunks("a.txt"))
+        assert rag.collection.name == checkpoint.staging, "rebuild was not promoted"
+        assert rag.collection.count() == rag.manifest.stored_count() == total - shared_chunks
+        assert rag.get_collection_stats()["collapsed_duplicates"] == shared_chunks
+        assert embedder.texts == total - len(written), "checkpointed chunks were embedded again"
+        metadatas = rag.collection.get(include=["metadatas"])["metadatas"]
+        assert sum('"b.txt"' in m.get("sources", "") for m in metadatas) == shared_chunks
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"✅ {name}")
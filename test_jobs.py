@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""Tests for persistent jobs: a job interrupted by a restart resumes from its checkpoint."""
+
+import asyncio
+import sys
+import tempfile
+from pathlib import Path
+
+# Add app to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.db import Database
+from app.jobs import JOB_INGEST, JOB_REINDEX, JobCheckpoint
+
+
+def test_interrupted_job_resumes_from_checkpoint():
+    """A running job is queued again after a restart with its staging collection and written chunks."""
+
+    async def run(db_path: Path) -> None:
+        db = Database(db_path)
+        job_id = await db.create_job(JOB_REINDEX, {"full": True}, telegram_id=1, chat_id=1)
+        job = await db.claim_next_job()
+        assert job["id"] == job_id and job["status"] == "running"
+        checkpoint = JobCheckpoint(db, job, await db.get_job_checkpoints(job_id))
+        await checkpoint.set_staging("knowledge_base_v1")
+        await checkpoint.record("a.txt", {"a1": "h1", "a2": "h2"})
+        await checkpoint.record("b.txt", {"b1": "h3"})
+        await db.close()  # the process dies here
+
+        db = Database(db_path)
+        assert await db.requeue_running_jobs() == 1
+        job = await db.claim_next_job()
+        assert job["id"] == job_id and job["payload"] == {"full": True}
+        checkpoint = JobCheckpoint(db, job, await db.get_job_checkpoints(job_id))
+        assert checkpoint.staging == "knowledge_base_v1"
+        assert checkpoint.chunks("a.txt") == {"a1": "h1", "a2": "h2"}
+        assert checkpoint.chunks("b.txt") == {"b1": "h3"}
+
+        await db.finish_job(job_id, "done", result={"total_files": 2})
+        assert await db.get_job_checkpoints(job_id) == {}
+        assert await db.requeue_running_jobs() == 0
+        assert await db.claim_next_job() is None
+        await db.close()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(run(Path(tmp) / "bot.db"))
+
+
+def test_jobs_run_in_order_and_cancel_only_when_queued():
+    """Jobs are claimed oldest first; only queued jobs can be cancelled from the table."""
+
+    async def run(db_path: Path) -> None:
+        db = Database(db_path)
+        first = await db.create_job(JOB_INGEST, {"path": "a.txt"}, telegram_id=1, chat_id=1)
+        second = await db.create_job(JOB_INGEST, {"path": "b.txt"}, telegram_id=1, chat_id=1)
+        third = await db.create_job(JOB_REINDEX, {}, telegram_id=1, chat_id=1)
+        assert (await db.claim_next_job())["id"] == first
+        assert not await db.cancel_queued_job(first)
+        assert await db.cancel_queued_job(second)
+        assert (await db.claim_next_job())["id"] == third
+        assert (await db.get_job(second))["status"] == "cancelled"
+        await db.close()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(run(Path(tmp) / "bot.db"))
+
+
+def test_concurrent_claimers_never_share_a_job():
+    """Processes sharing the database each claim a job at most once between them."""
+
+    async def run(db_path: Path) -> None:
+        dbs = [Database(db_path) for _ in range(4)]
+        created = [await dbs[0].create_job(JOB_INGEST, {}, telegram_id=1, chat_id=1) for _ in range(40)]
+
+        async def claim_all(db: Database) -> list[int]:
+            claimed = []
+            while (job := await db.claim_next_job()) is not None:
+                claimed.append(job["id"])
+            return claimed
+
+        claims = [job_id for ids in await asyncio.gather(*(claim_all(db) for db in dbs)) for job_id in ids]
+        assert sorted(claims) == created, "a job was claimed twice or not at all"
+        for db in dbs:
+            await db.close()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(run(Path(tmp) / "bot.db"))
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"✅ {name}")
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""Tests for the answer sanitizer: known cases, and streamed vs whole-answer equivalence."""
+
+import random
+import re
+import sys
+from pathlib import Path
+
+# Add app to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.sanitizer import AnswerSanitizer, sanitize_user_answer
+
+# Pieces the fuzzer builds answers from: prose, markup, citations, leaks and odd whitespace
+FRAGMENTS = [
+    "You need", " a valid ID", " and proof of address.", "KYC", " ", "  ", "\n", "\n\n", "\t",
+    "**", "__", "_", "*", "[1]", "[see", " policy]", "[", "]", "é", "✅", "—", " upload a pdf",
+    "the doc", "Sources", ":", "Sources:", "References:", "guide", ".pdf", "kyc-rules.md", "file.TXT",
+    "-", ".", "R", "S", "notes.docx", "[kyc.pdf]",
+]
+
+
+def legacy_sanitize(text: str) -> str:
+    """The sanitizer before the single-pass engine, with its unescaped extension dot fixed."""
+    has_sources_header = "Sources:" in text or "References:" in text
+    has_internal_filename = any(
+        re.search(rf"\b[\w-]+{re.escape(ext)}\b", text, re.IGNORECASE)
+        for ext in [".pdf", ".md", ".txt", ".doc", ".docx"]
+    )
+    if has_sources_header or has_internal_filename:
+        return ""
+    cleaned = text.replace("**", "").replace("__", "")
+    cleaned = re.sub(r"\[.*?\]", "", cleaned)
+    cleaned = "".join(char for char in cleaned if ord(char) < 128 or char in ("\n", "\t"))
+    return re.sub(r"\s+", " ", cleaned).strip()
+
+
+def streamed(text: str, rng: random.Random) -> str:
+    """Sanitize text fed in random chunks, as a streamed answer arrives."""
+    sanitizer = AnswerSanitizer()
+    out, pos = [], 0
+    while pos < len(text):
+        size = rng.randint(1, 12)
+        out.append(sanitizer.feed(text[pos:pos + size]))
+        pos += size
+    out.append(sanitizer.finish())
+    assert "".join(out) == sanitizer.text or sanitizer.leaked
+    return "" if sanitizer.leaked else sanitizer.text
+
+
+def test_known_answers():
+    """Citations, emphasis and non-ASCII are removed; headers and filenames escalate."""
+    assert sanitize_user_answer("You need **two** documents [1].\n\nUpload them  here ✅") == (
+        "You need two documents . Upload them here"
+    )
+    assert sanitize_user_answer("Please upload a pdf of the doc.") == "Please upload a pdf of the doc."
+    assert sanitize_user_answer("See kyc-rules.pdf for details.") == ""
+    assert sanitize_user_answer("Answer.\nSources: internal") == ""
+    assert sanitize_user_answer("As stated [policy.md], yes.") == ""
+
+
+def test_streaming_matches_whole_answer():
+    """Any chunking of an answer gives the same result as sanitizing it at once."""
+    rng = random.Random(17)
+    for _ in range(3000):
+        text = "".join(rng.choice(FRAGMENTS) for _ in range(rng.randint(0, 30)))
+        whole = sanitize_user_answer(text)
+        assert streamed(text, rng) == whole, f"streamed result differs for {text!r}"
+        if "_**_" not in text:  # the old code removed "**" first, then the "__" that left
+            assert whole == legacy_sanitize(text), f"differs from the previous sanitizer for {text!r}"
+
+
+def test_stream_stops_at_leak():
+    """Nothing more is returned once a leak is seen."""
+    sanitizer = AnswerSanitizer()
+    assert sanitizer.feed("Your ID is fine. ") == "Your ID is fine."
+    sanitizer.feed("See guide.pdf ")
+    assert sanitizer.leaked
+    assert sanitizer.feed("and more text ") == "" and sanitizer.finish() == ""
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"✅ {name}")